@@ -0,0 +1,94 @@
+"""
+JSONL batch runner for pre-generating story catalogs.
+Reads {user_input, age, tone} requests, streams results to JSONL as they finish and
+resumes from the output file, so a long run can be restarted without redoing work.
+"""
+import json
+from typing import Any, Dict, Iterator, Set
+
+from story_engine import generate_stories
+
+
+def read_requests(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily read batch requests from a JSONL file.
+
+    Blank lines are skipped. Requests without an ``id`` get their 0-based line
+    position among non-blank lines, which keeps ids stable across resumed runs.
+    A line that is not a JSON object is yielded as ``{"id", "error"}`` so the
+    batch reports it as a failed item instead of stopping.
+    """
+    with open(path, "r", encoding="utf-8") as handle:
+        index = 0
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as exc:
+                request = {"error": f"Invalid JSON on line {line_number}: {exc}"}
+            if not isinstance(request, dict):
+                request = {"error": f"Line {line_number} is not a JSON object"}
+            request["id"] = str(request.get("id") or request.get("request_id") or index)
+            index += 1
+            yield request
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """Collect ids already written successfully to ``output_path`` (the checkpoint)."""
+    done: Set[str] = set()
+    try:
+        with open(output_path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written last line from an interrupted run.
+                if record.get("status") == "ok":
+                    done.add(str(record.get("id")))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    concurrency: int = 8,
+    retries: int = 2,
+    max_iterations: int = 3,
+    resume: bool = True,
+) -> Dict[str, int]:
+    """
+    Generate every request in ``input_path`` and append results to ``output_path``.
+
+    Args:
+        input_path: JSONL file of requests
+        output_path: JSONL file receiving one result per line
+        concurrency: Stories generated at once
+        retries: Extra attempts per failing item
+        max_iterations: Default revise-loop limit per story
+        resume: Skip requests already completed in ``output_path``
+
+    Returns:
+        Counts of ok, failed and skipped items
+    """
+    skip = completed_ids(output_path) if resume else set()
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+
+    def pending() -> Iterator[Dict[str, Any]]:
+        for request in read_requests(input_path):
+            if str(request["id"]) in skip:
+                counts["skipped"] += 1
+                continue
+            yield request
+
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+        for record in generate_stories(
+            pending(), concurrency=concurrency, retries=retries, max_iterations=max_iterations
+        ):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            counts["ok" if record["status"] == "ok" else "error"] += 1
+            print(f"[{record['status']}] {record['id']}: {record['user_input'][:40]!r}")
+    return counts
@@ -0,0 +1,159 @@
+"""
+Cold-start benchmark: import time of the entry-point modules and first graph build.
+
+Usage:
+    python -m benchmarks.bench_import [--runs 5] [--top 10] [--json]
+                                      [--output results.json] [--baseline results.json]
+
+Each module is imported in a fresh interpreter under ``python -X importtime``;
+the report gives the cumulative import time (best of ``--runs``) and the slowest
+imported packages, so an eager ``import langchain_openai`` creeping back into
+story_engine shows up by name. ``cold_start_ms`` is import plus the first graph
+compile in one process (what the first request of a new process waits for), of
+which ``graph_build_ms`` is the compile (paid once per process). ``--baseline``
+compares against a previous ``--output`` file and exits 1 when a timing
+regresses by more than ``--tolerance``.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MODULES = ["story_engine", "jobs.job_manager", "storage.story_store", "batch_runner"]
+COLD_START_SNIPPET = (
+    "import time; started = time.perf_counter(); import story_engine; imported = time.perf_counter(); "
+    "story_engine._get_graph(); print((imported - started) * 1000, (time.perf_counter() - started) * 1000)"
+)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(args):
+    env = {**os.environ, "STORY_LLM_PROVIDER": "fake", "STORY_METRICS_PATH": ""}
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def parse_importtime(stderr: str):
+    """
+    Parse ``-X importtime`` output.
+
+    Returns:
+        Dict of module name -> (self microseconds, cumulative microseconds)
+    """
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if own.isdigit():
+            timings[name] = (int(own), int(cumulative))
+    return timings
+
+
+def startup_modules():
+    """Modules the bare interpreter imports (site, encodings, ...), left out of the slowest list."""
+    return set(parse_importtime(_run(["-X", "importtime", "-c", "pass"]).stderr))
+
+
+def bench_module(module: str, runs: int, top: int, startup):
+    best = None
+    for _ in range(runs):
+        timings = parse_importtime(_run(["-X", "importtime", "-c", f"import {module}"]).stderr)
+        if best is None or timings[module][1] < best[module][1]:
+            best = timings
+    # Top-level packages by cumulative time, so the report names the heavy dependency.
+    packages = {}
+    for name, (_, cumulative) in best.items():
+        if "." not in name and name != module and name not in startup:
+            packages[name] = cumulative
+    slowest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return {
+        "import_ms": round(best[module][1] / 1000, 1),
+        "modules": len(best),
+        "slowest": {name: round(us / 1000, 1) for name, us in slowest},
+    }
+
+
+def bench_cold_start(runs: int):
+    samples = [[float(value) for value in _run(["-c", COLD_START_SNIPPET]).stdout.split()] for _ in range(runs)]
+    imported, total = min(samples, key=lambda sample: sample[1])
+    return {"cold_start_ms": round(total, 1), "graph_build_ms": round(total - imported, 1)}
+
+
+def run(runs: int, top: int):
+    startup = startup_modules()
+    results = {module: bench_module(module, runs, top, startup) for module in MODULES}
+    results.update(bench_cold_start(runs))
+    return results
+
+
+def compare(current, baseline, tolerance: float):
+    """
+    Compare import and cold-start timings against a baseline run (the graph-build
+    share alone is not compared; moving imports into it is the point).
+
+    Returns:
+        List of (metric, baseline, current, relative change, regressed) rows
+    """
+    def timings(results):
+        flat = {f"{module}.import_ms": row["import_ms"] for module, row in results.items() if isinstance(row, dict)}
+        flat["cold_start_ms"] = results["cold_start_ms"]
+        return flat
+
+    rows = []
+    before_flat = timings(baseline)
+    for metric, value in timings(current).items():
+        if metric not in before_flat:
+            continue
+        before = before_flat[metric]
+        change = (value - before) / before if before else 0.0
+        rows.append((metric, before, value, change, change > tolerance))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module (best is kept)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages listed per module")
+    parser.add_argument("--json", action="store_true", help="Emit JSON instead of a table")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    results = {"benchmark": "import", "results": run(args.runs, args.top)}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+    rows = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as handle:
+            rows = compare(results["results"], json.load(handle)["results"], args.tolerance)
+        results["comparison"] = [
+            {"metric": m, "baseline": b, "current": c, "change": round(ch, 4), "regressed": r}
+            for m, b, c, ch, r in rows
+        ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for module in MODULES:
+            row = results["results"][module]
+            slowest = ", ".join(f"{name} {ms}" for name, ms in row["slowest"].items())
+            print(f"{module:<22} {row['import_ms']:>8} ms  {row['modules']:>5} modules  slowest: {slowest}")
+        for metric in ("cold_start_ms", "graph_build_ms"):
+            print(f"{metric:<22} {results['results'][metric]:>8} ms")
+        if rows:
+            print(f"\n{'metric':<36} {'baseline':>10} {'current':>10} {'change':>8}")
+            for metric, before, value, change, regressed in rows:
+                flag = "  REGRESSED" if regressed else ""
+                print(f"{metric:<36} {before:>10} {value:>10} {change:>+8.1%}{flag}")
+    if any(row[4] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
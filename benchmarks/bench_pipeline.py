@@ -0,0 +1,192 @@
+"""
+End-to-end pipeline benchmark on the offline fake provider (no API calls).
+
+Usage:
+    python -m benchmarks.bench_pipeline [--stories 20] [--concurrency 1,8,32] [--latency 0.05]
+                                        [--json] [--output results.json] [--baseline results.json]
+
+Measures single-story latency and orchestration overhead (wall time not spent
+inside LLM calls), throughput at each concurrency level, the iterations-to-pass
+distribution and why the revise loop stopped, peak traced memory per in-flight story and structured-output parse
+outcomes for the refiner and judge. ``--output`` writes the
+results as JSON; ``--baseline`` compares against a previous file and exits 1 when
+a metric regresses by more than ``--tolerance``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+# Provider settings are read at import time, so configure them before importing the engine.
+os.environ["STORY_LLM_PROVIDER"] = "fake"
+os.environ.setdefault("STORY_LLM_CACHE", "off")
+# The client-side rate limiter would cap throughput and hide the concurrency being measured.
+os.environ.setdefault("STORY_LLM_RATE_LIMIT_RPM", "0")
+os.environ.setdefault("STORY_LLM_RATE_LIMIT_TPM", "0")
+os.environ.setdefault("STORY_METRICS_PATH", "")
+
+TOPICS = [
+    "a dragon who is scared of the dark", "a sleepy owl", "a brave snail", "a lost kite",
+    "a robot learning to share", "a moon that forgot to rise", "a bunny baking cookies",
+    "a turtle's first race", "a cloud that wanted to rain lemonade", "a shy firefly",
+]
+# Metrics where a larger value is an improvement; all others are lower-is-better.
+HIGHER_IS_BETTER = {"stories_per_second"}
+
+
+def _requests(count: int):
+    return [
+        {"id": f"bench-{i}", "user_input": TOPICS[i % len(TOPICS)] + f" #{i}", "age": 5 + i % 6, "tone": "warm"}
+        for i in range(count)
+    ]
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))] if ordered else 0.0
+
+
+def bench_single(stories: int):
+    from story_engine import generate_story
+
+    latencies, overheads, iterations, stop_reasons = [], [], Counter(), Counter()
+    for request in _requests(stories):
+        state, _ = generate_story(request["user_input"], request["age"], request["tone"])
+        trace = state.trace
+        llm_seconds = sum(call["seconds"] for call in trace["llm_calls"])
+        latencies.append(trace["total_seconds"])
+        overheads.append(trace["total_seconds"] - llm_seconds)
+        iterations[state.iteration_count] += 1
+        stop_reasons[state.stop_reason] += 1
+    return {
+        "latency_p50_ms": round(_percentile(latencies, 0.5) * 1000, 2),
+        "latency_p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+        "overhead_p50_ms": round(_percentile(overheads, 0.5) * 1000, 3),
+        "overhead_p95_ms": round(_percentile(overheads, 0.95) * 1000, 3),
+    }, iterations, stop_reasons
+
+
+async def _run_batch(requests, concurrency):
+    from story_engine import agenerate_stories
+
+    return [record async for record in agenerate_stories(requests, concurrency=concurrency, retries=0)]
+
+
+def bench_throughput(concurrency: int, stories_per_worker: int):
+    requests = _requests(concurrency * stories_per_worker)
+    started = time.perf_counter()
+    records = asyncio.run(_run_batch(requests, concurrency))
+    elapsed = time.perf_counter() - started
+    return {
+        "stories_per_second": round(len(records) / elapsed, 2),
+        "errors": sum(1 for record in records if record["status"] != "ok"),
+    }
+
+
+def bench_memory(concurrency: int):
+    tracemalloc.start()
+    asyncio.run(_run_batch(_requests(concurrency), concurrency))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_kib_per_story": round(peak / 1024 / concurrency, 1)}
+
+
+def run(stories: int, concurrency_levels, stories_per_worker: int):
+    single, iterations, stop_reasons = bench_single(stories)
+    results = {"single": single, "throughput": {}, "memory": {}}
+    for level in concurrency_levels:
+        results["throughput"][str(level)] = bench_throughput(level, stories_per_worker)
+        results["memory"][str(level)] = bench_memory(level)
+    results["iterations"] = {str(k): iterations[k] for k in sorted(iterations)}
+    results["iterations_mean"] = round(sum(k * v for k, v in iterations.items()) / max(1, stories), 2)
+    results["stop_reasons"] = dict(stop_reasons.most_common())
+    from utils.json_parser import get_parse_stats
+
+    results["parsing"] = {
+        node: {"failure_rate": round(stats["failure_rate"], 4), "retries_avoided": stats["retries_avoided"]}
+        for node, stats in get_parse_stats().items()
+    }
+    return results
+
+
+def _flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline, tolerance: float):
+    """
+    Compare flattened metrics against a baseline run.
+
+    Returns:
+        List of (metric, baseline, current, relative change, regressed) rows
+    """
+    rows = []
+    base_flat = _flatten(baseline)
+    for metric, value in _flatten(current).items():
+        if metric not in base_flat or metric.startswith(("iterations", "stop_reasons", "parsing")) or metric.endswith("errors"):
+            continue
+        before = base_flat[metric]
+        change = (value - before) / before if before else 0.0
+        worse = -change if metric.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change
+        rows.append((metric, before, value, change, worse > tolerance))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stories", type=int, default=20, help="Sequential stories for latency/iterations")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--stories-per-worker", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=None, help="Fake provider latency per call (seconds)")
+    parser.add_argument("--json", action="store_true", help="Emit JSON instead of a table")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    if args.latency is not None:
+        # The engine is imported lazily by the bench functions, after this is set.
+        os.environ["STORY_FAKE_LLM_LATENCY"] = str(args.latency)
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    results = {"benchmark": "pipeline", "results": run(args.stories, levels, args.stories_per_worker)}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+    rows = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as handle:
+            rows = compare(results["results"], json.load(handle)["results"], args.tolerance)
+        results["comparison"] = [
+            {"metric": m, "baseline": b, "current": c, "change": round(ch, 4), "regressed": r}
+            for m, b, c, ch, r in rows
+        ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for metric, value in _flatten(results["results"]).items():
+            print(f"{metric:<36} {value:>12}")
+        if rows:
+            print(f"\n{'metric':<36} {'baseline':>12} {'current':>12} {'change':>8}")
+            for metric, before, value, change, regressed in rows:
+                flag = "  REGRESSED" if regressed else ""
+                print(f"{metric:<36} {before:>12} {value:>12} {change:>+8.1%}{flag}")
+    if any(row[4] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
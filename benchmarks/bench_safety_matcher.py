@@ -0,0 +1,88 @@
+"""
+Micro-benchmark: compiled TermMatcher vs the original per-term substring loop.
+
+Usage:
+    python -m benchmarks.bench_safety_matcher [--repeat 200] [--json]
+
+The synthetic stories contain "diet" and "skills", so the legacy hit count shows
+its substring false positives ("die", "kill") that the matcher avoids.
+"""
+import argparse
+import json
+import random
+import timeit
+
+from utils.config import BANNED_TERMS
+from utils.term_matcher import TermMatcher
+
+WORDS = (
+    "the little dragon felt sleepy and warm under a soft blanket while the moon "
+    "hummed a quiet song and her friend practiced new skills before a healthy diet "
+    "of berries cookies stars lanterns owls whispered goodnight to the garden"
+).split()
+
+
+def legacy_found_terms(story: str, terms):
+    """The original safety_check loop: one substring scan per term."""
+    story_lower = story.lower()
+    return [term for term in terms if term.lower() in story_lower]
+
+
+def make_story(words: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def make_blocklist(size: int, seed: int = 11):
+    """BANNED_TERMS padded with synthetic words and two-word phrases."""
+    rng = random.Random(seed)
+    terms = list(BANNED_TERMS)
+    while len(terms) < size:
+        word = "".join(rng.choice("bcdfghjklmnprstvwz") + rng.choice("aeiou") for _ in range(3))
+        terms.append(word if rng.random() < 0.7 else f"{word} {rng.choice(WORDS)}")
+    return terms[:size]
+
+
+def run(repeat: int):
+    results = []
+    for terms_count in (len(BANNED_TERMS), 1000, 5000):
+        terms = make_blocklist(terms_count)
+        build_ms = timeit.timeit(lambda: TermMatcher(terms), number=1) * 1000
+        matcher = TermMatcher(terms)
+        for words in (300, 3000):
+            story = make_story(words)
+            legacy = timeit.timeit(lambda: legacy_found_terms(story, terms), number=repeat) / repeat
+            compiled = timeit.timeit(lambda: matcher.found_terms(story), number=repeat) / repeat
+            results.append({
+                "terms": terms_count,
+                "story_words": words,
+                "legacy_us": round(legacy * 1e6, 2),
+                "matcher_us": round(compiled * 1e6, 2),
+                "speedup": round(legacy / compiled, 2) if compiled else None,
+                "matcher_build_ms": round(build_ms, 2),
+                "legacy_hits": len(legacy_found_terms(story, terms)),
+                "matcher_hits": len(matcher.found_terms(story)),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Emit JSON instead of a table")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    if args.json:
+        print(json.dumps({"benchmark": "safety_matcher", "results": results}, indent=2))
+        return
+    print(f"{'terms':>6} {'words':>6} {'legacy us':>10} {'matcher us':>11} {'speedup':>8} {'hits (legacy/matcher)':>22}")
+    for row in results:
+        print(
+            f"{row['terms']:>6} {row['story_words']:>6} {row['legacy_us']:>10} {row['matcher_us']:>11} "
+            f"{row['speedup']:>8} {row['legacy_hits']:>10}/{row['matcher_hits']:<11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Micro-benchmark: slotted StoryState dataclass vs the original Pydantic model.
+
+Usage:
+    python -m benchmarks.bench_state [--repeat 2000] [--versions 20] [--json]
+
+Per transition, LangGraph rebuilds the state from its channel values
+(``schema(**values)``) before calling the node, and fan-out branches copy the
+state with one field changed. Per session, the history holds one state per
+story version. Both are measured for the legacy model (defined below, as it was
+in graph/state.py) and the current dataclass, using the same typical payload.
+"""
+import argparse
+import json
+import operator
+import timeit
+import tracemalloc
+from typing import Annotated, Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from graph.state import StoryState
+
+
+class LegacyStoryState(BaseModel):
+    """The Pydantic StoryState this module replaced."""
+    user_input: str = ""
+    age: int = 7
+    tone: Optional[str] = None
+    refined_brief: Optional[Dict[str, Any]] = None
+    story: Optional[str] = None
+    judge_result: Optional[Dict[str, Any]] = None
+    safety_notes: Optional[str] = None
+    pre_judge_notes: Optional[str] = None
+    iteration_count: int = 0
+    max_iterations: int = 3
+    final_story: Optional[str] = None
+    feedback_request: Optional[str] = None
+    drafts: int = 1
+    draft_index: int = 0
+    candidates: Annotated[List[Dict[str, Any]], operator.add] = []
+    trace: Optional[Dict[str, Any]] = None
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+def make_values() -> Dict[str, Any]:
+    """Channel values as they look after a judged first draft."""
+    paragraph = "The little dragon yawned, and the moon hummed a quiet song over the hills. " * 5
+    brief = {
+        "topic": "a dragon who is scared of the dark", "age": 7, "tone": "warm",
+        "length_words": "250–400", "vocabulary_level": "simple, concrete, grade 2–3",
+        "forbidden": ["violence", "scary imagery", "adult themes"], "moral": "Courage can be quiet.",
+        "setting": "a sleepy mountain village", "main_characters": ["Ember", "Grandma Owl"],
+        "plot_beats": ["Setup", "Challenge", "Helpful action", "Resolution", "Gentle moral"],
+        "must": ["gentle ending"], "should": ["repetition"], "can": ["a lullaby"],
+    }
+    judge = {
+        "overall": 7.5,
+        "dimensions": [{"name": name, "score": 7.5, "reason": "Mostly there."} for name in
+                       ("age_fit", "clarity", "engagement", "safety", "moral", "structure")],
+        "edit_instructions": "Shorten the middle and add a calmer final paragraph.",
+    }
+    return {
+        "user_input": "a dragon who is scared of the dark", "age": 7, "tone": "warm",
+        "refined_brief": brief, "story": "\n\n".join([paragraph] * 5), "judge_result": judge,
+        "iteration_count": 1, "max_iterations": 3,
+    }
+
+
+def _per_call_us(fn, repeat: int) -> float:
+    return round(timeit.timeit(fn, number=repeat) / repeat * 1e6, 2)
+
+
+def bench_transitions(repeat: int) -> Dict[str, Dict[str, float]]:
+    values = make_values()
+    legacy = LegacyStoryState(**values)
+    lean = StoryState(**values)
+    return {
+        "rebuild_us": {
+            "legacy": _per_call_us(lambda: LegacyStoryState(**values), repeat),
+            "lean": _per_call_us(lambda: StoryState(**values), repeat),
+        },
+        "branch_copy_us": {
+            "legacy": _per_call_us(lambda: legacy.model_copy(update={"draft_index": 1}), repeat),
+            "lean": _per_call_us(lambda: lean.replace(draft_index=1), repeat),
+        },
+        "serialize_us": {
+            "legacy": _per_call_us(lambda: legacy.model_dump_json(exclude={"candidates"}), repeat),
+            "lean": _per_call_us(lambda: lean.to_json(exclude=("candidates",)), repeat),
+        },
+    }
+
+
+def _session_kib(build, versions: int) -> float:
+    """Traced memory for ``versions`` states, each one revision of the previous (new story, shared brief)."""
+    values = make_values()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    history = []
+    for version in range(versions):
+        story = values["story"] + f"\n\nVersion {version}."
+        history.append(build(values, story, history[-1] if history else None))
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round((after - before) / 1024, 1)
+
+
+def bench_session(versions: int) -> Dict[str, float]:
+    def legacy(values, story, previous):
+        # Pydantic revalidation copies the brief and judge dicts into every version.
+        source = previous.model_dump() if previous else values
+        return LegacyStoryState(**{**source, "story": story})
+
+    def lean(values, story, previous):
+        return previous.replace(story=story) if previous else StoryState(**{**values, "story": story})
+
+    return {"legacy": _session_kib(legacy, versions), "lean": _session_kib(lean, versions)}
+
+
+def run(repeat: int, versions: int):
+    return {"transitions": bench_transitions(repeat), f"session_kib_{versions}_versions": bench_session(versions)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--versions", type=int, default=20, help="Story versions held per session")
+    parser.add_argument("--json", action="store_true", help="Emit JSON instead of a table")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.versions)
+    if args.json:
+        print(json.dumps({"benchmark": "state", "results": results}, indent=2))
+        return
+    rows = [(name, row) for name, row in results["transitions"].items()]
+    rows += [(name, row) for name, row in results.items() if name != "transitions"]
+    print(f"{'metric':<26} {'legacy':>10} {'lean':>10} {'ratio':>7}")
+    for name, row in rows:
+        ratio = row["legacy"] / row["lean"] if row["lean"] else float("inf")
+        print(f"{name:<26} {row['legacy']:>10} {row['lean']:>10} {ratio:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Offline builder for the precomputed brief index (storage/brief_index.py).
+Runs the prompt refiner's LLM path once per theme x age band x tone and stores the
+briefs locally; themes already indexed are skipped, so an interrupted build resumes.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional
+
+from graph.state import StoryState
+from nodes.prompt_refiner import refine_with_llm
+from storage.brief_index import get_brief_index, read_themes, topic_key
+from utils.config import JUDGE_AGE_BANDS, PRESET_TONES
+
+
+def build_briefs(
+    themes_path: str,
+    tones: Optional[Iterable[str]] = None,
+    concurrency: int = 4,
+    rebuild: bool = False,
+) -> Dict[str, int]:
+    """
+    Refine every theme for each age band and tone and store the briefs.
+
+    Each band is refined at its youngest age, so the vocabulary suits the whole band.
+
+    Args:
+        themes_path: Text file of themes (see read_themes)
+        tones: Tone preferences to build for ("" = no preference); defaults to
+            no preference plus the Streamlit PRESET_TONES
+        concurrency: Refiner calls run at once
+        rebuild: Refine again even when a brief is already stored
+
+    Returns:
+        Counts of built, failed and skipped briefs
+    """
+    index = get_brief_index(create=True)
+    tones = list(tones or ["", *PRESET_TONES])
+    counts = {"built": 0, "error": 0, "skipped": 0}
+    jobs: List = []
+    for theme in dict.fromkeys(read_themes(themes_path)):
+        if not topic_key(theme):
+            print(f"[skipped] {theme!r}: no content words")
+            counts["skipped"] += 1
+            continue
+        for band in JUDGE_AGE_BANDS:
+            for tone in tones:
+                if not rebuild and index.has(theme, band, tone):
+                    counts["skipped"] += 1
+                    continue
+                jobs.append((theme, band, tone))
+
+    def refine(theme: str, band, tone: str) -> Dict:
+        return refine_with_llm(StoryState(user_input=theme, age=band[0], tone=tone or None))
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(refine, *job): job for job in jobs}
+        for future in as_completed(futures):
+            theme, band, tone = futures[future]
+            label = f"{theme!r} ages {band[0]}-{band[1]}" + (f" tone {tone!r}" if tone else "")
+            try:
+                index.put(theme, band, tone, future.result())
+            except Exception as exc:
+                counts["error"] += 1
+                print(f"[error] {label}: {exc}")
+                continue
+            counts["built"] += 1
+            print(f"[ok] {label}")
+    return counts
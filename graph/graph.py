@@ -2,22 +2,70 @@
 LangGraph StateGraph definition for bedtime story generator.
 Reference: https://docs.langchain.com/oss/python/langgraph/overview
 """
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
 from graph.state import StoryState
-from nodes.prompt_refiner import prompt_refiner_node
-from nodes.storyteller import storyteller_node
-from nodes.judge import judge_node
+from nodes.prompt_refiner import prompt_refiner_node, aprompt_refiner_node
+from nodes.storyteller import storyteller_node, astoryteller_node
+from nodes.judge import judge_node, ajudge_node
+from nodes.pre_judge import pre_judge_node
+from nodes.drafts import draft_candidate_node, adraft_candidate_node, select_best_draft_node
 from nodes.safety_check import safety_check_node
+from nodes.progress import progress_node
 from nodes.finalize import finalize_node
-from utils.config import OVERALL_THRESHOLD, DIMENSION_THRESHOLD, MAX_ITERATIONS
+from utils.config import MAX_DRAFTS
+from utils.telemetry import timed_node
+
+
+def route_entry(state: StoryState) -> str:
+    """
+    Entry routing for LangGraph.
+
+    Feedback revisions arrive with the previous refined_brief already in state, so
+    they skip the prompt refiner and go straight to the storyteller.
+
+    Args:
+        state: Initial StoryState
+
+    Returns:
+        "write" when a brief is supplied, otherwise "refine"
+    """
+    if state.refined_brief:
+        return "write"
+    return "refine"
+
+
+def route_drafts(state: StoryState):
+    """
+    Routing after the prompt refiner.
+
+    With drafts > 1, fans out one draft_candidate branch per draft (LangGraph Send);
+    the branches write and judge concurrently and select_best keeps the winner.
+
+    Args:
+        state: StoryState with refined_brief
+
+    Returns:
+        "storyteller" for a single draft, otherwise a list of Send objects
+    """
+    drafts = min(state.drafts, MAX_DRAFTS)
+    if drafts <= 1:
+        return "storyteller"
+    return [
+        Send("draft_candidate", state.replace(draft_index=index))
+        for index in range(drafts)
+    ]
 
 
 def check_scores(state: StoryState) -> str:
     """
-    Conditional function for LangGraph routing.
+    Conditional function for LangGraph routing after the progress node.
     
-    Stop condition: overall >= 8.0 AND all dimensions >= 7.0 AND safety_notes is None
-    Continue condition: (overall < 8.0 OR any dim < 7.0 OR safety_notes not None) AND iteration_count < max_iterations
+    Stop condition: the quality gate passed (overall >= 8.0 AND all dimensions >= 7.0
+    AND safety_notes is None), iteration_count >= max_iterations, or the score
+    trajectory stalled or regressed (see utils.scoring.stop_reason)
+    Continue condition: progress_node left stop_reason unset
     
     Args:
         state: Current StoryState
@@ -25,32 +73,30 @@ def check_scores(state: StoryState) -> str:
     Returns:
         "revise" or "end" string for LangGraph routing
     """
-    # Check iteration limit
-    if state.iteration_count >= state.max_iterations:
-        return "end"
-    
-    # Check if judge_result exists
-    if not state.judge_result:
-        return "end"  # No judge result, end
-    
-    # Check overall score
-    overall = state.judge_result.get("overall", 0.0)
-    if overall < OVERALL_THRESHOLD:
-        return "revise"
-    
-    # Check all dimensions
-    dimensions = state.judge_result.get("dimensions", [])
-    for dim in dimensions:
-        score = dim.get("score", 0.0)
-        if score < DIMENSION_THRESHOLD:
-            return "revise"
-    
-    # Check safety notes
-    if state.safety_notes is not None and state.safety_notes != "":
-        return "revise"
-    
-    # All conditions met, end
-    return "end"
+    return "end" if state.stop_reason else "revise"
+
+
+def route_pre_judge(state: StoryState) -> str:
+    """
+    Routing after the local pre-judge gate.
+
+    Drafts that passed go to the LLM judge; drafts that failed hard already carry
+    synthesized scores and edit instructions and go straight to progress tracking.
+
+    Args:
+        state: StoryState after pre_judge
+
+    Returns:
+        "judge" or "progress"
+    """
+    if not state.pre_judge_notes:
+        return "judge"
+    return "progress"
+
+
+def _llm_node(name: str, func, afunc) -> RunnableLambda:
+    """Pair a sync node with its async variant so one graph serves invoke and ainvoke."""
+    return RunnableLambda(timed_node(name, func), afunc=timed_node(name, afunc), name=name)
 
 
 def build_graph():
@@ -65,21 +111,47 @@ def build_graph():
     graph = StateGraph(StoryState)
     
     # Add nodes
-    graph.add_node("prompt_refiner", prompt_refiner_node)
-    graph.add_node("storyteller", storyteller_node)
-    graph.add_node("judge", judge_node)
-    graph.add_node("safety_check", safety_check_node)
-    graph.add_node("finalize", finalize_node)
+    graph.add_node("prompt_refiner", _llm_node("prompt_refiner", prompt_refiner_node, aprompt_refiner_node))
+    graph.add_node("storyteller", _llm_node("storyteller", storyteller_node, astoryteller_node))
+    graph.add_node("pre_judge", timed_node("pre_judge", pre_judge_node))
+    graph.add_node("judge", _llm_node("judge", judge_node, ajudge_node))
+    graph.add_node("safety_check", timed_node("safety_check", safety_check_node))
+    graph.add_node("draft_candidate", _llm_node("draft_candidate", draft_candidate_node, adraft_candidate_node))
+    graph.add_node("select_best", timed_node("select_best", select_best_draft_node))
+    graph.add_node("progress", timed_node("progress", progress_node))
+    graph.add_node("finalize", timed_node("finalize", finalize_node))
     
     # Add edges
-    graph.add_edge(START, "prompt_refiner")
-    graph.add_edge("prompt_refiner", "storyteller")
-    graph.add_edge("storyteller", "judge")
+    # Entry: reuse a supplied brief instead of paying for another refiner call
+    graph.add_conditional_edges(
+        START,
+        route_entry,
+        {
+            "refine": "prompt_refiner",
+            "write": "storyteller"
+        }
+    )
+    # Single draft, or best-of-N fan-out of parallel draft branches
+    graph.add_conditional_edges("prompt_refiner", route_drafts, ["storyteller", "draft_candidate"])
+    graph.add_edge("draft_candidate", "select_best")
+    graph.add_edge("storyteller", "pre_judge")
+    # Cheap local gate: obviously failing drafts skip the LLM judge
+    graph.add_conditional_edges(
+        "pre_judge",
+        route_pre_judge,
+        {
+            "judge": "judge",
+            "progress": "progress"
+        }
+    )
     graph.add_edge("judge", "safety_check")
+    graph.add_edge("safety_check", "progress")
+    # Best-of-N drafts were already judged and safety-checked in their branches
+    graph.add_edge("select_best", "progress")
     
-    # Conditional edge (LangGraph feature)
+    # Conditional edge (LangGraph feature): score history and best draft are updated first
     graph.add_conditional_edges(
-        "safety_check",
+        "progress",
         check_scores,  # Function that returns "revise" or "end"
         {
             "revise": "storyteller",
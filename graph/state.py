@@ -1,12 +1,23 @@
 """
-State definition for LangGraph StoryState using Pydantic.
+State definition for LangGraph StoryState.
 Reference: https://docs.langchain.com/oss/python/langgraph/overview
+
+StoryState is a slotted dataclass rather than a Pydantic model: LangGraph rebuilds
+the state object before every node, and a plain dataclass does that without
+re-validating or copying the story text, brief and judge dicts. Node updates
+keep those payloads by reference, so treat them as immutable and return new
+values instead of mutating them in place.
 """
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+import dataclasses
+import operator
+from dataclasses import dataclass, field
+from typing import Annotated, Any, Dict, Iterable, List, Optional
+
+from pydantic_core import from_json, to_json
 
 
-class StoryState(BaseModel):
+@dataclass(slots=True)
+class StoryState:
     """State schema for the bedtime story generator workflow."""
     user_input: str = ""  # Raw user input
     age: int = 7  # Target age (5-10)
@@ -15,10 +26,40 @@ class StoryState(BaseModel):
     story: Optional[str] = None  # Generated story text
     judge_result: Optional[Dict[str, Any]] = None  # JSON from Judge
     safety_notes: Optional[str] = None  # Safety warnings (None if passes)
+    pre_judge_notes: Optional[str] = None  # Local pre-judge failures (None if the draft may be judged)
     iteration_count: int = 0  # Current iteration number
     max_iterations: int = 3  # Maximum iterations (default 3, configurable 2-3)
     final_story: Optional[str] = None  # Final story output
     feedback_request: Optional[str] = None  # User-provided revision instructions
-    
-    class Config:
-        arbitrary_types_allowed = True
+    drafts: int = 1  # Parallel first drafts to generate and judge (best-of-N)
+    draft_index: int = 0  # Which fan-out branch this state belongs to
+    candidates: Annotated[List[Dict[str, Any]], operator.add] = field(default_factory=list)  # Judged drafts gathered from branches
+    score_history: Annotated[List[Dict[str, Any]], operator.add] = field(default_factory=list)  # One entry per judged draft
+    best_draft: Optional[Dict[str, Any]] = None  # Best-scoring draft so far (story, judge_result, safety_notes, iteration)
+    stop_reason: Optional[str] = None  # Why the revise loop ended (None while revising)
+    trace: Optional[Dict[str, Any]] = None  # Per-node timings, LLM tokens and cost (set by story_engine)
+
+    def replace(self, **changes: Any) -> "StoryState":
+        """Shallow copy with ``changes`` applied (payloads are shared, not copied)."""
+        return type(self)(**{**self.to_dict(), **changes})
+
+    def to_dict(self, exclude: Iterable[str] = ()) -> Dict[str, Any]:
+        """Field values as a shallow dict (no deep copy, unlike dataclasses.asdict)."""
+        skip = set(exclude)
+        return {name: getattr(self, name) for name in STATE_FIELDS if name not in skip}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StoryState":
+        """Build a state from a dict, ignoring keys that are not state fields."""
+        return cls(**{name: value for name, value in data.items() if name in STATE_FIELDS})
+
+    def to_json(self, exclude: Iterable[str] = ()) -> str:
+        # pydantic_core's serializer is several times faster than json.dumps on the story payloads.
+        return to_json(self.to_dict(exclude)).decode("utf-8")
+
+    @classmethod
+    def from_json(cls, data: str) -> "StoryState":
+        return cls.from_dict(from_json(data))
+
+
+STATE_FIELDS = tuple(f.name for f in dataclasses.fields(StoryState))
@@ -0,0 +1 @@
+# Background job queue and workers
@@ -0,0 +1,554 @@
+"""
+Background story-generation jobs.
+``submit`` enqueues a request and returns a job id right away; a bounded pool of
+worker threads runs the graph (via stream_story) and writes status and partial
+draft text back to the queue, so callers poll instead of blocking. Admission
+control rejects new jobs once the queue is full. Finished jobs are dropped once
+collected (``forget``) or after a retention period, and running jobs hold a lease
+their worker renews, so a job orphaned by a dead process is failed, not left running.
+
+Queue backends: in-process (default) or SQLite, which lets several server
+processes on one host share a queue and poll each other's jobs.
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from storage.story_store import state_from_json, state_to_json
+from utils.config import (
+    JOB_BACKEND,
+    JOB_DB_PATH,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_QUEUE_DEPTH,
+    JOB_PROGRESS_INTERVAL,
+    JOB_RETENTION_SECONDS,
+    JOB_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class QueueFullError(RuntimeError):
+    """Raised by submit when the queue is at its admission limit."""
+
+
+class JobQueue(ABC):
+    """Base queue interface. Jobs are dicts; ``request`` holds generate_story kwargs."""
+
+    @abstractmethod
+    def put(self, job: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job and mark it running (None after ``timeout``)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update(self, job_id: str, **fields: Any) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, job_id: str) -> None:
+        """Drop a job record (e.g. once the caller has collected its result)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def queued_before(self, created_at: float) -> int:
+        """Number of queued jobs created before ``created_at`` (those ahead of a job in line)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def heartbeat(self, job_ids: List[str]) -> None:
+        """Renew the lease of running jobs whose worker is still alive."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def fail_stale(self, lease_seconds: float) -> int:
+        """Mark running jobs without a heartbeat for ``lease_seconds`` as failed; returns how many."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def purge_finished(self, before: float) -> int:
+        """Delete done and failed jobs that finished before ``before``; returns how many."""
+        raise NotImplementedError
+
+
+class MemoryJobQueue(JobQueue):
+    """In-process queue; job records live in a dict for polling, with running per-status counts."""
+
+    def __init__(self) -> None:
+        self._pending: "queue.Queue[str]" = queue.Queue()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._queued: Dict[str, float] = {}  # Queued job id -> created_at, oldest first
+        self._counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        self._lock = threading.Lock()
+
+    def _set_status(self, job: Dict[str, Any], status: str) -> None:
+        self._counts[job["status"]] -= 1
+        self._counts[status] += 1
+        if job["status"] == QUEUED:
+            self._queued.pop(job["id"], None)
+        job["status"] = status
+
+    def put(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+            self._counts[job["status"]] += 1
+            if job["status"] == QUEUED:
+                self._queued[job["id"]] = job["created_at"]
+        self._pending.put(job["id"])
+
+    def claim(self, timeout: float) -> Optional[Dict[str, Any]]:
+        try:
+            job_id = self._pending.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            self._set_status(job, RUNNING)
+            job["started_at"] = time.time()
+            return dict(job)
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if "status" in fields:
+                self._set_status(job, fields.pop("status"))
+            job.update(fields)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is not None:
+                self._counts[job["status"]] -= 1
+                self._queued.pop(job_id, None)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def queued_before(self, created_at: float) -> int:
+        with self._lock:
+            return sum(1 for queued_at in self._queued.values() if queued_at < created_at)
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        pass  # Jobs live and die with this process; there is no other worker to take over.
+
+    def fail_stale(self, lease_seconds: float) -> int:
+        return 0
+
+    def purge_finished(self, before: float) -> int:
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["status"] in (DONE, FAILED) and (job["finished_at"] or 0.0) < before
+            ]
+            for job_id in expired:
+                self._counts[self._jobs.pop(job_id)["status"]] -= 1
+        return len(expired)
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Queue in a SQLite file; workers claim rows with an atomic status update.
+
+    Running rows carry a ``heartbeat_at`` lease renewed by their worker, so rows
+    left RUNNING by a process that died can be failed by any other process.
+    """
+
+    _COLUMNS = ("id", "status", "created_at", "started_at", "finished_at", "heartbeat_at", "request",
+                "message", "partial", "story", "state", "error")
+
+    def __init__(self, path: str, poll_seconds: float = 0.2):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, started_at REAL, "
+            "finished_at REAL, heartbeat_at REAL, request TEXT NOT NULL, message TEXT, partial TEXT, story TEXT, "
+            "state TEXT, error TEXT)"
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "heartbeat_at" not in columns:
+            # Queue files created before leases existed.
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+
+    @staticmethod
+    def _encode_request(request: Dict[str, Any]) -> str:
+        request = dict(request)
+        if request.get("previous_state") is not None:
+            request["previous_state"] = state_to_json(request["previous_state"])
+        return json.dumps(request)
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        request = json.loads(job["request"])
+        if request.get("previous_state"):
+            request["previous_state"] = state_from_json(request["previous_state"])
+        job["request"] = request
+        job["state"] = state_from_json(job["state"]) if job["state"] else None
+        return job
+
+    def put(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, created_at, request, message) VALUES (?, ?, ?, ?, ?)",
+                (job["id"], job["status"], job["created_at"], self._encode_request(job["request"]), job.get("message")),
+            )
+
+    def claim(self, timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._conn.execute(
+                        "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                    ).fetchone()
+                    if row is not None:
+                        now = time.time()
+                        self._conn.execute(
+                            "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                            (RUNNING, now, now, row["id"]),
+                        )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            if row is not None:
+                job = self._decode(row)
+                job["status"] = RUNNING
+                return job
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_seconds)
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if "state" in fields and fields["state"] is not None:
+            fields["state"] = state_to_json(fields["state"])
+        columns = [name for name in fields if name in self._COLUMNS]
+        if not columns:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in columns)} WHERE id = ?",
+                (*(fields[name] for name in columns), job_id),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._decode(row) if row else None
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def counts(self) -> Dict[str, int]:
+        # One index range per status; finished rows are bounded by purge_finished.
+        with self._lock:
+            return {
+                status: self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+                for status in (QUEUED, RUNNING, DONE, FAILED)
+            }
+
+    def queued_before(self, created_at: float) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?", (QUEUED, created_at)
+            ).fetchone()[0]
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?",
+                [(time.time(), job_id, RUNNING) for job_id in job_ids],
+            )
+
+    def fail_stale(self, lease_seconds: float) -> int:
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, message = ?, error = ? "
+                "WHERE status = ? AND COALESCE(heartbeat_at, started_at, created_at) < ?",
+                (FAILED, now, "Generation failed.", "The worker running this job stopped responding.",
+                 RUNNING, now - lease_seconds),
+            ).rowcount
+
+    def purge_finished(self, before: float) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (DONE, FAILED, before)
+            ).rowcount
+
+
+class JobManager:
+    """
+    Bounded worker pool over a JobQueue.
+
+    Args:
+        job_queue: Queue backend
+        workers: Worker threads (maximum concurrent generations in this process)
+        max_queue_depth: Queued jobs allowed before submit raises QueueFullError
+        retention_seconds: Finished jobs are deleted this long after they finish
+        lease_seconds: Running jobs without a heartbeat for this long are failed
+    """
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        workers: int = 4,
+        max_queue_depth: int = 32,
+        retention_seconds: float = 600.0,
+        lease_seconds: float = 120.0,
+    ):
+        self.queue = job_queue
+        self.workers = workers
+        self.max_queue_depth = max_queue_depth
+        self.retention_seconds = retention_seconds
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._running: Set[str] = set()
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.purged = 0
+        self.stale_failed = 0
+        self._wait_seconds: Deque[float] = deque(maxlen=1000)
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"story-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        self._threads.append(threading.Thread(target=self._maintain, name="story-jobs-maintenance", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, **request: Any) -> str:
+        """
+        Enqueue a generation request.
+
+        Args:
+            **request: generate_story keyword arguments (user_input, age, tone, ...)
+
+        Returns:
+            Job id to poll with status()
+
+        Raises:
+            QueueFullError: When max_queue_depth jobs are already waiting
+        """
+        with self._lock:
+            if self.queue.counts()[QUEUED] >= self.max_queue_depth:
+                self.rejected += 1
+                raise QueueFullError(f"story queue is full ({self.max_queue_depth} jobs waiting)")
+            self.submitted += 1
+            job_id = uuid.uuid4().hex
+            self.queue.put({
+                "id": job_id,
+                "status": QUEUED,
+                "created_at": time.time(),
+                "request": request,
+                "message": "Waiting for a free storyteller…",
+                "started_at": None,
+                "finished_at": None,
+                "partial": None,
+                "story": None,
+                "state": None,
+                "error": None,
+            })
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Current job record: ``status`` (queued/running/done/failed), ``message``,
+        ``partial`` draft text while running, ``story``/``state`` when done and
+        ``error`` when failed.
+        """
+        job = self.queue.get(job_id)
+        if job is not None and job["status"] == QUEUED:
+            job["queue_position"] = self.queue.queued_before(job["created_at"]) + 1
+        return job
+
+    def forget(self, job_id: str) -> None:
+        """Drop a finished job once its result has been collected."""
+        self.queue.delete(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, running jobs and admission counters."""
+        counts = self.queue.counts()
+        with self._lock:
+            waits = sorted(self._wait_seconds)
+            return {
+                "queued": counts[QUEUED],
+                "running": counts[RUNNING],
+                "workers": self.workers,
+                "max_queue_depth": self.max_queue_depth,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+                "purged": self.purged,
+                "stale_failed": self.stale_failed,
+                "queue_wait_p50_seconds": waits[len(waits) // 2] if waits else 0.0,
+                "queue_wait_max_seconds": waits[-1] if waits else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop workers after their current job."""
+        self._stop.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _worker(self) -> None:
+        while not self._stop.is_set():
+            job = self.queue.claim(timeout=0.5)
+            if job is None:
+                continue
+            with self._lock:
+                self._wait_seconds.append(time.time() - job["created_at"])
+                self._running.add(job["id"])
+            try:
+                self._run(job)
+                with self._lock:
+                    self.completed += 1
+            except Exception as exc:
+                self.queue.update(
+                    job["id"], status=FAILED, finished_at=time.time(),
+                    error=f"{type(exc).__name__}: {exc}", message="Generation failed.",
+                )
+                with self._lock:
+                    self.failed += 1
+            finally:
+                with self._lock:
+                    self._running.discard(job["id"])
+
+    def _maintain(self) -> None:
+        """Renew this process's leases, fail orphaned jobs and purge expired finished ones."""
+        interval = max(0.5, min(5.0, self.lease_seconds / 4))
+        while not self._stop.wait(interval):
+            try:
+                with self._lock:
+                    running = list(self._running)
+                self.queue.heartbeat(running)
+                stale = self.queue.fail_stale(self.lease_seconds)
+                purged = self.queue.purge_finished(time.time() - self.retention_seconds)
+                with self._lock:
+                    self.stale_failed += stale
+                    self.purged += purged
+            except Exception:
+                logger.exception("Job queue maintenance failed")
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        # Imported here so the job module stays importable without building the graph.
+        from story_engine import stream_story
+
+        job_id = job["id"]
+        text, last_write = "", 0.0
+        self.queue.update(job_id, message="Writing your story…", partial="")
+        for event in stream_story(**job["request"]):
+            kind = event["event"]
+            if kind == "token":
+                text += event["text"]
+                now = time.monotonic()
+                if now - last_write >= JOB_PROGRESS_INTERVAL:
+                    self.queue.update(job_id, partial=text)
+                    last_write = now
+            elif kind == "revision_started":
+                text = ""
+                self.queue.update(job_id, partial=text, message=f"Polishing the story (pass {event['iteration'] + 1})…")
+            elif kind == "judge" and event.get("overall") is not None:
+                self.queue.update(job_id, partial=text, message=f"Reviewed: {event['overall']}/10")
+            elif kind == "draft":
+                text = event["story"] or text
+                self.queue.update(job_id, partial=text)
+            elif kind == "final":
+                self.queue.update(
+                    job_id, status=DONE, finished_at=time.time(), message="Done.",
+                    story=event["story"], state=event["state"], partial=event["story"],
+                )
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """
+    Return the process-wide job manager configured by ``STORY_JOB_BACKEND``.
+
+    Returns:
+        JobManager with ``STORY_JOB_WORKERS`` worker threads
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            if JOB_BACKEND == "sqlite":
+                job_queue: JobQueue = SQLiteJobQueue(JOB_DB_PATH)
+            elif JOB_BACKEND == "memory":
+                job_queue = MemoryJobQueue()
+            else:
+                raise ValueError(f"Unknown STORY_JOB_BACKEND: {JOB_BACKEND!r} (use memory or sqlite)")
+            _manager = JobManager(
+                job_queue,
+                workers=JOB_WORKERS,
+                max_queue_depth=JOB_MAX_QUEUE_DEPTH,
+                retention_seconds=JOB_RETENTION_SECONDS,
+                lease_seconds=JOB_LEASE_SECONDS,
+            )
+        return _manager
+
+
+def jobs_idle() -> bool:
+    """True when this process has no job manager yet or its queue has nothing queued or running."""
+    with _manager_lock:
+        manager = _manager
+    if manager is None:
+        return True
+    counts = manager.queue.counts()
+    return not counts[QUEUED] and not counts[RUNNING]
+
+
+def get_job_stats() -> Dict[str, Any]:
+    """Queue-depth and admission metrics for the process-wide job manager."""
+    return get_job_manager().stats()
@@ -0,0 +1,506 @@
+"""
+Warm pool of ready stories per (age, tone) bucket.
+
+For ages 5–10 and each tone in PRESET_TONES, the pool keeps one passed story for
+each of the WARM_POOL_SIZE most popular themes (the first lines of the themes
+file). A background refiller tops buckets up one story at a time, only while the
+job queue is idle and within a rolling 24-hour budget (estimated USD cost and a
+story count). A fresh request whose age and tone match a bucket and whose topic
+matches a ready story's theme takes that story instantly; the refiller then
+writes a replacement. Stories older than WARM_POOL_MAX_AGE_SECONDS are dropped
+and regenerated.
+
+The pool lives in SQLite, so several server processes on one host share it;
+taking a story is a single DELETE, so two requests never get the same one.
+"""
+import array
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from graph.state import StoryState
+from storage.brief_index import read_themes, topic_key
+from storage.story_store import state_from_json, state_to_json
+from utils.config import (
+    PRESET_TONES,
+    WARM_POOL_DAILY_BUDGET_USD,
+    WARM_POOL_DAILY_MAX_STORIES,
+    WARM_POOL_ENABLED,
+    WARM_POOL_IDLE_SECONDS,
+    WARM_POOL_MAX_AGE_SECONDS,
+    WARM_POOL_PATH,
+    WARM_POOL_SIZE,
+    WARM_POOL_THEMES_PATH,
+    WARM_POOL_THRESHOLD,
+)
+from utils.embeddings import HashedNgramVectorizer, cosine
+from utils.scoring import passes_quality_gate
+
+logger = logging.getLogger(__name__)
+
+POOL_AGES = range(5, 11)
+_POOL_TONES = {(tone or "").strip().lower() for tone in PRESET_TONES}
+_DAY_SECONDS = 86400.0
+FAILURE_COOLDOWN_SECONDS = 60.0  # First pause for a slot whose refill failed; doubles per failure
+MAX_FAILURE_COOLDOWN_SECONDS = 6 * 3600.0
+
+
+def _tone_key(tone: Optional[str]) -> str:
+    return (tone or "").strip().lower()
+
+
+def pool_themes(path: str, limit: int) -> List[str]:
+    """
+    The first ``limit`` themes of a themes file with distinct topic keys.
+
+    Args:
+        path: Themes file, most popular first (see storage.brief_index.read_themes)
+        limit: Themes to keep
+
+    Returns:
+        Theme strings (empty when the file is missing)
+    """
+    themes: Dict[str, str] = {}
+    try:
+        for theme in read_themes(path):
+            themes.setdefault(topic_key(theme), theme)
+            if len(themes) >= limit:
+                break
+    except FileNotFoundError:
+        logger.warning("Warm pool themes file %s not found", path)
+    themes.pop("", None)
+    return list(themes.values())
+
+
+class WarmPool:
+    """
+    SQLite table of ready stories keyed by (age, tone, theme), plus a spend ledger.
+
+    Args:
+        path: SQLite file
+        threshold: Minimum topic similarity for a request to take a theme's story
+        max_age_seconds: Ready stories older than this are not served
+    """
+
+    def __init__(self, path: str, threshold: float = 0.92, max_age_seconds: float = 7 * _DAY_SECONDS):
+        self.path = path
+        self.threshold = threshold
+        self.max_age_seconds = max_age_seconds
+        self.vectorizer = HashedNgramVectorizer()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS warm_pool ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, age INTEGER NOT NULL, "
+            "tone TEXT NOT NULL, theme TEXT NOT NULL, theme_key TEXT NOT NULL, vector BLOB NOT NULL, "
+            "story TEXT NOT NULL, state TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_warm_pool_bucket ON warm_pool(age, tone, theme_key)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS warm_pool_spend (created_at REAL NOT NULL, cost_usd REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def add(self, age: int, tone: str, theme: str, story: str, state: StoryState) -> None:
+        """Add a passed story to its bucket."""
+        key = topic_key(theme)
+        vector = array.array("f", self.vectorizer.embed(key)).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO warm_pool (created_at, age, tone, theme, theme_key, vector, story, state) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), int(age), _tone_key(tone), theme, key, vector, story, state_to_json(state)),
+            )
+            self._conn.commit()
+
+    def take(self, topic: str, age: int, tone: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Remove and return the ready story best matching a request.
+
+        Args:
+            topic: Requested topic
+            age: Target age
+            tone: Tone preference
+
+        Returns:
+            Record with theme, story, state (StoryState), similarity and
+            age_seconds, or None when no fresh story matches
+        """
+        key = topic_key(topic)
+        if not key:
+            return None
+        vector = None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, created_at, theme, theme_key, vector FROM warm_pool "
+                "WHERE age = ? AND tone = ? AND created_at >= ?",
+                (int(age), _tone_key(tone), time.time() - self.max_age_seconds),
+            ).fetchall()
+            candidates = []
+            for row_id, created_at, theme, row_key, blob in rows:
+                if row_key == key:
+                    similarity = 1.0
+                else:
+                    vector = vector or self.vectorizer.embed(key)
+                    similarity = cosine(vector, array.array("f", blob).tolist())
+                if similarity >= self.threshold:
+                    # Best match first; the oldest story of a theme goes first.
+                    candidates.append((-similarity, created_at, row_id, theme))
+            for negative_similarity, created_at, row_id, theme in sorted(candidates):
+                row = self._conn.execute("SELECT story, state FROM warm_pool WHERE id = ?", (row_id,)).fetchone()
+                if row is None:
+                    continue
+                taken = self._conn.execute("DELETE FROM warm_pool WHERE id = ?", (row_id,)).rowcount
+                self._conn.commit()
+                # Another process may have taken it between the SELECT and the DELETE.
+                if taken != 1:
+                    continue
+                return {
+                    "theme": theme,
+                    "story": row[0],
+                    "state": state_from_json(row[1]),
+                    "similarity": -negative_similarity,
+                    "age_seconds": time.time() - created_at,
+                }
+        return None
+
+    def counts(self) -> Dict[Tuple[int, str, str], int]:
+        """Fresh ready stories per (age, tone, theme key)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT age, tone, theme_key, COUNT(*) FROM warm_pool WHERE created_at >= ? "
+                "GROUP BY age, tone, theme_key",
+                (time.time() - self.max_age_seconds,),
+            ).fetchall()
+        return {(age, tone, key): count for age, tone, key, count in rows}
+
+    def deficits(self, tones: List[str], themes: List[str]) -> List[Tuple[int, str, str]]:
+        """
+        (age, tone, theme) slots without a fresh story, emptiest bucket first and,
+        within a bucket, most popular theme first.
+        """
+        counts = self.counts()
+        missing = []
+        for age in POOL_AGES:
+            for tone in tones:
+                slots = [theme for theme in themes if not counts.get((age, _tone_key(tone), topic_key(theme)))]
+                ready = len(themes) - len(slots)
+                missing.extend((ready, rank, age, tone, theme) for rank, theme in enumerate(slots))
+        return [(age, tone, theme) for _, _, age, tone, theme in sorted(missing)]
+
+    def evict_stale(self) -> int:
+        """Delete stories older than max_age_seconds; returns how many."""
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM warm_pool WHERE created_at < ?", (time.time() - self.max_age_seconds,)
+            ).rowcount
+            self._conn.execute("DELETE FROM warm_pool_spend WHERE created_at < ?", (time.time() - _DAY_SECONDS,))
+            self._conn.commit()
+        return removed
+
+    def record_spend(self, cost_usd: float) -> None:
+        """Log one refill generation (passed or not) against the rolling budget."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO warm_pool_spend (created_at, cost_usd) VALUES (?, ?)", (time.time(), cost_usd)
+            )
+            self._conn.commit()
+
+    def spend_24h(self) -> Tuple[float, int]:
+        """(estimated USD, generations) spent on refills in the last 24 hours, across processes."""
+        with self._lock:
+            cost, count = self._conn.execute(
+                "SELECT COALESCE(SUM(cost_usd), 0), COUNT(*) FROM warm_pool_spend WHERE created_at >= ?",
+                (time.time() - _DAY_SECONDS,),
+            ).fetchone()
+        return float(cost), int(count)
+
+    def oldest_age_seconds(self) -> float:
+        """Age of the oldest ready story (0 when the pool is empty)."""
+        with self._lock:
+            oldest = self._conn.execute("SELECT MIN(created_at) FROM warm_pool").fetchone()[0]
+        return time.time() - oldest if oldest is not None else 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM warm_pool")
+            self._conn.commit()
+
+
+class WarmPoolStats:
+    """Pool hit rate, served-story staleness and refill counters for this process (thread-safe)."""
+
+    def __init__(self, window: int = 1000) -> None:
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.generated = 0
+        self.failed = 0
+        self.stale_evicted = 0
+        self.budget_blocked = 0
+        self._served_ages: deque = deque(maxlen=window)
+
+    def record_lookup(self, age_seconds: Optional[float]) -> None:
+        with self._lock:
+            self.lookups += 1
+            if age_seconds is not None:
+                self.hits += 1
+                self._served_ages.append(age_seconds)
+
+    def record_refill(self, passed: bool) -> None:
+        with self._lock:
+            if passed:
+                self.generated += 1
+            else:
+                self.failed += 1
+
+    def record_evicted(self, count: int) -> None:
+        with self._lock:
+            self.stale_evicted += count
+
+    def record_budget_blocked(self) -> None:
+        with self._lock:
+            self.budget_blocked += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            ages = sorted(self._served_ages)
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "misses": self.lookups - self.hits,
+                "hit_rate": (self.hits / self.lookups) if self.lookups else 0.0,
+                "served_age_p50_seconds": ages[len(ages) // 2] if ages else 0.0,
+                "served_age_max_seconds": ages[-1] if ages else 0.0,
+                "refills_passed": self.generated,
+                "refills_failed": self.failed,
+                "stale_evicted": self.stale_evicted,
+                "budget_blocked": self.budget_blocked,
+            }
+
+
+class WarmPoolRefiller:
+    """
+    Background thread that generates one missing pool story at a time.
+
+    Args:
+        pool: WarmPool to fill
+        themes: Themes kept ready per bucket, most popular first
+        tones: Tones with a bucket per age
+        is_idle: Returns True when foreground generation leaves room for a refill
+        interval: Seconds between checks
+        daily_budget_usd: Estimated refill spend allowed per rolling 24 hours (0 = no cost cap)
+        daily_max_stories: Refill generations allowed per rolling 24 hours
+        failure_cooldown: Seconds a slot is skipped after a failed refill, doubled per
+            consecutive failure up to MAX_FAILURE_COOLDOWN_SECONDS
+    """
+
+    def __init__(
+        self,
+        pool: WarmPool,
+        themes: List[str],
+        tones: List[str],
+        is_idle: Callable[[], bool],
+        interval: float = 5.0,
+        daily_budget_usd: float = 2.0,
+        daily_max_stories: int = 200,
+        failure_cooldown: float = FAILURE_COOLDOWN_SECONDS,
+    ):
+        self.pool = pool
+        self.themes = themes
+        self.tones = tones
+        self.is_idle = is_idle
+        self.interval = interval
+        self.daily_budget_usd = daily_budget_usd
+        self.daily_max_stories = daily_max_stories
+        self.failure_cooldown = failure_cooldown
+        # (age, tone, theme) -> (consecutive failures, monotonic time it may be retried)
+        self._failures: Dict[Tuple[int, str, str], Tuple[int, float]] = {}
+        self._failures_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="warm-pool-refiller", daemon=True)
+        self._thread.start()
+
+    def budget_left(self) -> bool:
+        cost, count = self.pool.spend_24h()
+        if count >= self.daily_max_stories:
+            return False
+        return not self.daily_budget_usd or cost < self.daily_budget_usd
+
+    def cooling_down(self) -> List[Tuple[int, str, str]]:
+        """Slots skipped for now because their recent refills failed."""
+        now = time.monotonic()
+        with self._failures_lock:
+            return [slot for slot, (_, retry_at) in self._failures.items() if retry_at > now]
+
+    def _record_result(self, slot: Tuple[int, str, str], passed: bool) -> None:
+        with self._failures_lock:
+            if passed:
+                self._failures.pop(slot, None)
+                return
+            failures = self._failures.get(slot, (0, 0.0))[0] + 1
+            cooldown = min(MAX_FAILURE_COOLDOWN_SECONDS, self.failure_cooldown * 2 ** (failures - 1))
+            self._failures[slot] = (failures, time.monotonic() + cooldown)
+
+    def refill_once(self) -> bool:
+        """
+        Generate the highest-priority missing story if the queue is idle and budget remains.
+
+        Slots whose recent refills failed (quality gate or an error) are skipped until
+        their cooldown ends, so one bad theme cannot spend the whole daily budget.
+
+        Returns:
+            True when a passing story was added to the pool
+        """
+        WARM_POOL_STATS.record_evicted(self.pool.evict_stale())
+        if not self.is_idle():
+            return False
+        cooling = set(self.cooling_down())
+        slots = [slot for slot in self.pool.deficits(self.tones, self.themes) if slot not in cooling]
+        if not slots:
+            return False
+        if not self.budget_left():
+            WARM_POOL_STATS.record_budget_blocked()
+            return False
+        # Imported here so the pool module stays importable without building the graph.
+        from story_engine import generate_story
+
+        age, tone, theme = slots[0]
+        cost = 0.0
+        try:
+            state, story = generate_story(theme, age, tone, reuse=False, serve_ready=False)
+            cost = (state.trace or {}).get("cost_usd", 0.0)
+            passed = bool(story) and passes_quality_gate(state.judge_result, state.safety_notes)
+            if passed:
+                self.pool.add(age, tone, theme, story, state)
+        except Exception:
+            logger.exception("Warm pool refill failed for %r (age %s, tone %r)", theme, age, tone)
+            passed = False
+        self.pool.record_spend(cost)
+        self._record_result((age, tone, theme), passed)
+        WARM_POOL_STATS.record_refill(passed)
+        return passed
+
+    def stop(self, wait: bool = True) -> None:
+        self._stop.set()
+        if wait:
+            self._thread.join()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                generated = self.refill_once()
+            except Exception:
+                logger.exception("Warm pool refiller check failed")
+                generated = False
+            # Keep going right away after a passing refill; wait after a failure or when there is nothing to do.
+            if not generated:
+                self._stop.wait(self.interval)
+
+
+WARM_POOL_STATS = WarmPoolStats()
+_pool: Optional[WarmPool] = None
+_refiller: Optional[WarmPoolRefiller] = None
+_pool_lock = threading.Lock()
+
+
+def get_warm_pool() -> WarmPool:
+    """Return the process-wide warm pool at ``STORY_WARM_POOL_PATH``."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WarmPool(WARM_POOL_PATH, threshold=WARM_POOL_THRESHOLD, max_age_seconds=WARM_POOL_MAX_AGE_SECONDS)
+        return _pool
+
+
+def set_warm_pool(pool: Optional[WarmPool]) -> None:
+    """Install a custom warm pool (e.g. a temporary file in tests)."""
+    global _pool
+    with _pool_lock:
+        _pool = pool
+
+
+def start_warm_pool_refiller() -> Optional[WarmPoolRefiller]:
+    """
+    Start this process's refiller (once) when ``STORY_WARM_POOL=on``.
+
+    Refills run only while the process-wide job queue has nothing queued or running.
+
+    Returns:
+        The refiller, or None when the warm pool is off
+    """
+    from jobs.job_manager import jobs_idle
+
+    global _refiller
+    if not WARM_POOL_ENABLED:
+        return None
+    pool = get_warm_pool()
+    with _pool_lock:
+        if _refiller is None:
+            _refiller = WarmPoolRefiller(
+                pool,
+                themes=pool_themes(WARM_POOL_THEMES_PATH, WARM_POOL_SIZE),
+                tones=list(PRESET_TONES),
+                is_idle=jobs_idle,
+                interval=WARM_POOL_IDLE_SECONDS,
+                daily_budget_usd=WARM_POOL_DAILY_BUDGET_USD,
+                daily_max_stories=WARM_POOL_DAILY_MAX_STORIES,
+            )
+        return _refiller
+
+
+def take_pooled_story(user_input: str, age: int, tone: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Serve a fresh request from the warm pool when ``STORY_WARM_POOL=on``.
+
+    Only requests for a pooled bucket (ages 5–10, a PRESET_TONES tone) count
+    towards the hit rate.
+
+    Returns:
+        Pool record (see WarmPool.take), or None
+    """
+    if not WARM_POOL_ENABLED or age not in POOL_AGES or _tone_key(tone) not in _POOL_TONES:
+        return None
+    record = get_warm_pool().take(user_input, age, tone)
+    WARM_POOL_STATS.record_lookup(record["age_seconds"] if record else None)
+    return record
+
+
+def get_warm_pool_stats() -> Dict[str, Any]:
+    """
+    Report pool hit rate and staleness.
+
+    Returns:
+        This process's lookups, hit rate, served-story age (p50/max) and refill
+        counters, plus the shared pool's ready stories, capacity, oldest story age
+        and refill spend over the last 24 hours
+    """
+    snapshot = WARM_POOL_STATS.snapshot()
+    if not WARM_POOL_ENABLED:
+        return dict(snapshot, enabled=False)
+    pool = get_warm_pool()
+    cost, count = pool.spend_24h()
+    themes = pool_themes(WARM_POOL_THEMES_PATH, WARM_POOL_SIZE)
+    capacity = len(POOL_AGES) * len(PRESET_TONES) * len(themes)
+    ready = capacity - len(pool.deficits(list(PRESET_TONES), themes))
+    return dict(
+        snapshot,
+        enabled=True,
+        ready=ready,
+        capacity=capacity,
+        fill_ratio=(ready / capacity) if capacity else 0.0,
+        oldest_ready_age_seconds=pool.oldest_age_seconds(),
+        refill_spend_24h_usd=cost,
+        refills_24h=count,
+        refill_budget_usd=WARM_POOL_DAILY_BUDGET_USD,
+        refill_max_stories=WARM_POOL_DAILY_MAX_STORIES,
+        slots_cooling_down=len(_refiller.cooling_down()) if _refiller is not None else 0,
+    )
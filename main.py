@@ -2,12 +2,7 @@
 Bedtime Story Generator using LangGraph.
 Main entry point for the story generation workflow.
 """
-from dotenv import load_dotenv
-
-from story_engine import generate_story
-
-# Load environment variables (story_engine also loads, but this keeps CLI standalone-friendly).
-load_dotenv()
+import argparse
 
 """
 Before submitting the assignment, describe here in a few sentences what you would have built next if you spent 2 more hours on this project:
@@ -21,9 +16,72 @@ If I had 2 more hours, I would:
 6. Implement story templates: Pre-defined story structures for common themes (friendship, adventure, etc.)
 """
 
+# Early-stop reasons from the revise loop (see utils.scoring.stop_reason).
+EARLY_STOP_MESSAGES = {
+    "regressed": "Score dropped",
+    "no_gain": "Score stopped improving",
+    "unreachable": "Target score out of reach",
+}
+
+
+def run_batch_command(args: argparse.Namespace) -> None:
+    """Run the `batch` subcommand: generate every JSONL request and stream results to JSONL."""
+    from batch_runner import run_batch
+
+    counts = run_batch(
+        input_path=args.input,
+        output_path=args.output,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        max_iterations=args.max_iterations,
+        resume=not args.no_resume,
+    )
+    print(f"\nBatch finished: {counts['ok']} ok, {counts['error']} failed, {counts['skipped']} skipped (already done)")
+
+
+def run_build_briefs_command(args: argparse.Namespace) -> None:
+    """Run the `build-briefs` subcommand: precompute refiner briefs for common themes."""
+    from brief_builder import build_briefs
+
+    counts = build_briefs(
+        themes_path=args.themes,
+        tones=args.tone,
+        concurrency=args.concurrency,
+        rebuild=args.rebuild,
+    )
+    print(f"\nBrief index: {counts['built']} built, {counts['error']} failed, {counts['skipped']} skipped (already indexed)")
+
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Bedtime story generator")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser("batch", help="Generate stories for a JSONL file of {user_input, age, tone} requests")
+    batch.add_argument("input", help="Input JSONL file")
+    batch.add_argument("-o", "--output", default="stories.jsonl", help="Output JSONL file (also the resume checkpoint)")
+    batch.add_argument("-c", "--concurrency", type=int, default=8, help="Stories generated at once")
+    batch.add_argument("--retries", type=int, default=2, help="Extra attempts per failing item")
+    batch.add_argument("--max-iterations", type=int, default=3, help="Revise-loop limit per story")
+    batch.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of skipping finished items")
+
+    briefs = subparsers.add_parser("build-briefs", help="Precompute refiner briefs for common themes (one per line)")
+    briefs.add_argument("themes", nargs="?", default="brief_themes.txt", help="Themes file")
+    briefs.add_argument("--tone", action="append", help="Tone to build for (repeatable; default: no preference plus PRESET_TONES)")
+    briefs.add_argument("-c", "--concurrency", type=int, default=4, help="Refiner calls run at once")
+    briefs.add_argument("--rebuild", action="store_true", help="Refine again even when a brief is already indexed")
+    return parser
+
+
+def main(argv=None):
     """Main function to run the bedtime story generator."""
+    args = build_parser().parse_args(argv)
+    if args.command == "batch":
+        run_batch_command(args)
+        return
+    if args.command == "build-briefs":
+        run_build_briefs_command(args)
+        return
+
     # Get user input
     user_input = input("What kind of story do you want to hear? ")
     age_input = input("What age is this story for? (5-10, default 7): ").strip()
@@ -40,21 +98,45 @@ def main():
     tone_input = input("Preferred tone (optional, e.g., 'cozy bedtime', 'gentle humor'): ").strip()
     tone = tone_input if tone_input else None
     
-    print("\nGenerating your story...")
-    final_state, final_story = generate_story(
+    print("\nGenerating your story...\n")
+    # Imported after the prompts so `--help` and the batch command skip the graph imports.
+    from story_engine import stream_story
+
+    final_state, final_story, last_draft = None, None, None
+    # Stream draft text as it is written so the first words appear right away.
+    for event in stream_story(
         user_input=user_input,
         age=age,
         tone=tone,
         max_iterations=3
-    )
-    
+    ):
+        kind = event["event"]
+        if kind == "token":
+            print(event["text"], end="", flush=True)
+        elif kind == "revision_started":
+            print(f"\n\n--- Revising draft (iteration {event['iteration'] + 1}) ---\n", flush=True)
+        elif kind == "draft":
+            last_draft = event["story"]
+        elif kind == "pre_judge":
+            print(f"\n\n[Pre-check failed, skipping judge: {event['notes']}]", flush=True)
+        elif kind == "judge" and event.get("overall") is not None:
+            print(f"\n\n[Judge score: {event['overall']}]", flush=True)
+        elif kind == "stopped" and event["reason"] in EARLY_STOP_MESSAGES:
+            print(f"\n[{EARLY_STOP_MESSAGES[event['reason']]}, stopping early with the best draft]", flush=True)
+        elif kind == "final":
+            final_state, final_story = event["state"], event["story"]
+
     if final_story:
         print("\n" + "="*60)
-        print("YOUR BEDTIME STORY")
+        # The last streamed draft is usually the final story; only reprint when it differs.
+        if final_story.strip() != (last_draft or "").strip():
+            print("YOUR BEDTIME STORY")
+            print("="*60)
+            print(final_story)
+        else:
+            print("YOUR BEDTIME STORY is the final draft above.")
         print("="*60)
-        print(final_story)
-        print("="*60)
-        
+
         # Print iteration info if available
         if final_state.iteration_count > 0:
             print(f"\nGenerated in {final_state.iteration_count} iteration(s)")
@@ -0,0 +1,79 @@
+"""
+Speculative parallel drafts for LangGraph.
+Each candidate branch writes one draft from the refined brief and judges it; the
+selector keeps only the best-scoring draft for the normal revise loop.
+"""
+from graph.state import StoryState
+from nodes.storyteller import write_story, awrite_story
+from nodes.judge import score_story, ascore_story
+from nodes.safety_check import find_safety_issues
+from nodes.pre_judge import pre_judge_story, target_age
+from utils.config import PRE_JUDGE_ENABLED
+from utils.scoring import draft_rank
+from typing import Dict
+
+
+def _candidate(state: StoryState, story: str) -> StoryState:
+    # The judge reads the story (and the brief's age) from state.
+    return state.replace(story=story)
+
+
+def _pre_judge(state: StoryState, story: str):
+    # Drafts that fail the local gate are ranked on the synthesized result, no judge call.
+    return pre_judge_story(story, target_age(state)) if PRE_JUDGE_ENABLED else None
+
+
+def draft_candidate_node(state: StoryState) -> Dict:
+    """
+    Writes and judges one candidate draft (one fan-out branch).
+
+    Args:
+        state: StoryState sent to this branch (draft_index identifies it)
+
+    Returns:
+        Dictionary appending one entry to candidates
+    """
+    story = write_story(state)
+    judge_result = _pre_judge(state, story) or score_story(_candidate(state, story))
+    return {"candidates": [{
+        "index": state.draft_index,
+        "story": story,
+        "judge_result": judge_result,
+        "safety_notes": find_safety_issues(story),
+    }]}
+
+
+async def adraft_candidate_node(state: StoryState) -> Dict:
+    """
+    Async variant of draft_candidate_node.
+    """
+    story = await awrite_story(state)
+    judge_result = _pre_judge(state, story) or await ascore_story(_candidate(state, story))
+    return {"candidates": [{
+        "index": state.draft_index,
+        "story": story,
+        "judge_result": judge_result,
+        "safety_notes": find_safety_issues(story),
+    }]}
+
+
+def select_best_draft_node(state: StoryState) -> Dict:
+    """
+    Keeps the best candidate: gate-passing first, then safest and highest scoring.
+
+    Args:
+        state: Current StoryState with all candidates gathered
+
+    Returns:
+        Dictionary with story, judge_result, safety_notes and iteration_count updates
+    """
+    if not state.candidates:
+        raise ValueError("no draft candidates to select from")
+
+    best = max(state.candidates, key=lambda c: draft_rank(c["judge_result"], c["safety_notes"]))
+    return {
+        "story": best["story"],
+        "judge_result": best["judge_result"],
+        "safety_notes": best["safety_notes"],
+        "iteration_count": state.iteration_count + 1,
+    }
@@ -8,12 +8,23 @@ from typing import Dict
 def finalize_node(state: StoryState) -> Dict:
     """
     Sets final_story when workflow completes.
-    
+
+    The best-scoring draft wins over the last one: when a revision regressed,
+    the earlier draft and its verdict are restored.
+
     Args:
         state: Current StoryState
-        
+
     Returns:
-        Dictionary with final_story update
+        Dictionary with final_story (plus story, judge_result and safety_notes
+        when an earlier draft is kept)
     """
-    return {"final_story": state.story}
-
+    best = state.best_draft
+    if not best or best["story"] == state.story:
+        return {"final_story": state.story}
+    return {
+        "final_story": best["story"],
+        "story": best["story"],
+        "judge_result": best["judge_result"],
+        "safety_notes": best["safety_notes"],
+    }
@@ -4,64 +4,167 @@ Evaluates story on 6 dimensions and returns STRICT JSON only (no Chain-of-Though
 """
 from langchain_core.messages import SystemMessage, HumanMessage
 from graph.state import StoryState
-from utils.prompts import JUDGE_SYSTEM
-from utils.json_parser import parse_strict_json
+from utils.prompts import JUDGE_SYSTEM, JUDGE_CALIBRATION_EXAMPLES, compose_judge_system
+from utils.json_parser import parse_structured
 from utils.llm_factory import get_llm
-from typing import Dict
+from utils.llm_calls import invoke_llm, ainvoke_llm
+from utils.schemas import JudgeResult
+from utils.config import JUDGE_AGE_BANDS, JUDGE_CALIBRATION, STRUCTURED_OUTPUT
+from typing import Dict, List, Tuple
+import functools
+import logging
 
+logger = logging.getLogger(__name__)
 
-def judge_node(state: StoryState) -> Dict:
-    """
-    Judges story quality on 6 dimensions.
-    
-    Args:
-        state: Current StoryState
-        
-    Returns:
-        Dictionary with judge_result and updated iteration_count
-    """
-    if not state.story:
-        raise ValueError("story is required for judging")
-    
+
+def _judge_age(state: StoryState) -> int:
     # Get age from refined_brief or default
     age = 7
     if state.refined_brief:
         age = state.refined_brief.get("age", 7)
-    
-    # Initialize LLM (flexible: Gemini or OpenAI)
-    llm = get_llm(temperature=0.1)  # Lower temperature for evaluation
-    
-    # Build user prompt
-    user_prompt = f"""Please evaluate the following story for ages {age} and return JSON per the schema.
+    return age
+
+
+def _build_user_prompt(state: StoryState) -> str:
+    """Build the judge user prompt for the current story."""
+    if not state.story:
+        raise ValueError("story is required for judging")
+
+    return f"""Please evaluate the following story for ages {_judge_age(state)} and return JSON per the schema.
 
 {state.story}"""
-    
-    # Call LLM
-    messages = [
-        SystemMessage(content=JUDGE_SYSTEM),
+
+
+@functools.lru_cache(maxsize=None)
+def _band_system(band: Tuple[int, int]) -> str:
+    # Keep examples whose age range spans the whole band.
+    low, high = band
+    return compose_judge_system(
+        example for youngest, oldest, example in JUDGE_CALIBRATION_EXAMPLES
+        if youngest <= low and oldest >= high
+    )
+
+
+def judge_system(age) -> str:
+    """
+    System prompt for judging a story written for ``age``.
+
+    With ``STORY_JUDGE_CALIBRATION=age_band`` only the calibration examples for
+    the age's band are included. Either way the prompt is identical for every
+    call in the same band, so the provider can reuse its cached prefix.
+
+    Args:
+        age: Target age from the brief
+
+    Returns:
+        Judge system prompt
+    """
+    if JUDGE_CALIBRATION != "age_band":
+        return JUDGE_SYSTEM
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return JUDGE_SYSTEM
+    for band in JUDGE_AGE_BANDS:
+        if band[0] <= age <= band[1]:
+            return _band_system(band)
+    return JUDGE_SYSTEM
+
+
+def _validate(content: str) -> Dict:
+    return parse_structured(content, JudgeResult)
+
+
+def _messages(state: StoryState, user_prompt: str) -> List:
+    # Static system prompt first, per-story text last: keeps the cacheable prefix intact.
+    return [
+        SystemMessage(content=judge_system(_judge_age(state))),
         HumanMessage(content=user_prompt)
     ]
-    response = llm.invoke(messages)
-    print(f"judge DEBUG: Judge response: {response.content}")
-    
-    # Parse JSON response
+
+
+def score_story(state: StoryState) -> Dict:
+    """
+    Calls the LLM judge on state.story and returns the parsed judge JSON.
+
+    Args:
+        state: StoryState holding the story (and optionally the brief's age)
+
+    Returns:
+        Judge result dictionary
+    """
+    user_prompt = _build_user_prompt(state)
+
+    # Initialize LLM (flexible: Gemini or OpenAI)
+    llm = get_llm(temperature=0.1, json_mode=STRUCTURED_OUTPUT)  # Lower temperature for evaluation
+
+    # Call LLM
+    response = invoke_llm(llm, _messages(state, user_prompt), "judge", validate=_validate)
+    logger.debug("Judge response: %s", response.content)
+
+    # Parse JSON response against the judge schema
     try:
-        judge_result = parse_strict_json(response.content)
-        print(f"judge DEBUG: Judge result: {judge_result}")
-    except (ValueError, Exception) as e:
+        judge_result = parse_structured(response.content, JudgeResult, node="judge")
+        logger.debug("Judge result: %s", judge_result)
+    except ValueError:
         # If parsing fails, retry once with stricter prompt
         retry_prompt = user_prompt + "\n\nReturn STRICT JSON only."
-        retry_response = llm.invoke([
-            SystemMessage(content=JUDGE_SYSTEM),
-            HumanMessage(content=retry_prompt)
-        ])
-        judge_result = parse_strict_json(retry_response.content)
-    
-    # Update iteration count
-    iteration_count = state.iteration_count + 1
-    
+        retry_response = invoke_llm(
+            llm, _messages(state, retry_prompt), "judge", validate=_validate, retry=True
+        )
+        judge_result = parse_structured(retry_response.content, JudgeResult, node="judge")
+
+    return judge_result
+
+
+async def ascore_story(state: StoryState) -> Dict:
+    """
+    Async variant of score_story using ``ainvoke`` under the global LLM limiter.
+    """
+    user_prompt = _build_user_prompt(state)
+    llm = get_llm(temperature=0.1, json_mode=STRUCTURED_OUTPUT)
+
+    response = await ainvoke_llm(llm, _messages(state, user_prompt), "judge", validate=_validate)
+
+    try:
+        judge_result = parse_structured(response.content, JudgeResult, node="judge")
+    except ValueError:
+        retry_prompt = user_prompt + "\n\nReturn STRICT JSON only."
+        retry_response = await ainvoke_llm(
+            llm, _messages(state, retry_prompt), "judge", validate=_validate, retry=True
+        )
+        judge_result = parse_structured(retry_response.content, JudgeResult, node="judge")
+
+    return judge_result
+
+
+def judge_node(state: StoryState) -> Dict:
+    """
+    Judges story quality on 6 dimensions.
+
+    Args:
+        state: Current StoryState
+
+    Returns:
+        Dictionary with judge_result and updated iteration_count
+    """
     return {
-        "judge_result": judge_result,
-        "iteration_count": iteration_count
+        "judge_result": score_story(state),
+        "iteration_count": state.iteration_count + 1
     }
 
+
+async def ajudge_node(state: StoryState) -> Dict:
+    """
+    Async variant of judge_node.
+
+    Args:
+        state: Current StoryState
+
+    Returns:
+        Dictionary with judge_result and updated iteration_count
+    """
+    return {
+        "judge_result": await ascore_story(state),
+        "iteration_count": state.iteration_count + 1
+    }
@@ -0,0 +1,113 @@
+"""
+Pre-judge node for LangGraph.
+Cheap local checks (no LLM) that run before the judge: word count, banned terms,
+readability for the brief's age and paragraph length. A draft that fails hard
+gets synthesized edit instructions and goes straight back to the storyteller,
+so the LLM judge only scores drafts that have a chance of passing.
+"""
+from graph.state import StoryState
+from nodes.safety_check import BANNED_MATCHER, find_safety_issues
+from utils.config import (
+    MIN_WORDS,
+    MAX_WORDS,
+    TARGET_WORDS_MIN,
+    TARGET_WORDS_MAX,
+    PRE_JUDGE_ENABLED,
+    PRE_JUDGE_GRADE_SLACK,
+    PRE_JUDGE_MAX_PARAGRAPH_WORDS,
+)
+from utils.readability import paragraphs, readability_stats
+from typing import Any, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def target_age(state: StoryState) -> int:
+    """Age from the refined brief, falling back to the requested age."""
+    if state.refined_brief:
+        try:
+            return int(state.refined_brief.get("age", state.age))
+        except (TypeError, ValueError):
+            pass
+    return state.age
+
+
+def pre_judge_story(story: str, age: int) -> Optional[Dict[str, Any]]:
+    """
+    Runs the local hard checks on a draft.
+
+    Args:
+        story: Story text
+        age: Target reader age
+
+    Returns:
+        A judge-shaped result (failing dimensions, overall, edit_instructions and
+        ``pre_judge: True``) when the draft fails hard, otherwise None
+    """
+    dimensions = []
+    instructions = []
+
+    word_count = len(story.split())
+    if word_count < MIN_WORDS:
+        dimensions.append({"name": "Length-fit", "score": 4.0, "reason": f"Only {word_count} words."})
+        instructions.append(f"Lengthen the story by about {TARGET_WORDS_MIN - word_count} words with gentle sensory details.")
+    elif word_count > MAX_WORDS:
+        dimensions.append({"name": "Length-fit", "score": 4.0, "reason": f"{word_count} words, over the limit."})
+        instructions.append(f"Shorten the story by about {word_count - TARGET_WORDS_MAX} words.")
+
+    found_terms = BANNED_MATCHER.found_terms(story)
+    if found_terms:
+        dimensions.append({"name": "Safety/Positivity", "score": 3.0, "reason": "Contains banned terms."})
+        instructions.append(f"Remove or replace these words and anything related: {', '.join(found_terms)}.")
+
+    stats = readability_stats(story)
+    max_grade = (age - 5) + PRE_JUDGE_GRADE_SLACK
+    if stats["fk_grade"] > max_grade:
+        dimensions.append({
+            "name": "Age-fit",
+            "score": 5.0,
+            "reason": f"Reading grade {stats['fk_grade']:.1f} is too hard for age {age}.",
+        })
+        instructions.append(f"Use shorter sentences (about 8–12 words) and simple everyday words for a {age}-year-old.")
+
+    longest = max((len(p.split()) for p in paragraphs(story)), default=0)
+    if longest > PRE_JUDGE_MAX_PARAGRAPH_WORDS:
+        dimensions.append({"name": "Clarity", "score": 5.0, "reason": f"A paragraph runs {longest} words."})
+        instructions.append(f"Split paragraphs longer than {PRE_JUDGE_MAX_PARAGRAPH_WORDS} words into short paragraphs of 2–4 sentences.")
+
+    if not dimensions:
+        return None
+    return {
+        "overall": min(dim["score"] for dim in dimensions),
+        "dimensions": dimensions,
+        "edit_instructions": " ".join(instructions),
+        "pre_judge": True,
+    }
+
+
+def pre_judge_node(state: StoryState) -> Dict:
+    """
+    Local gate in front of the LLM judge.
+
+    Args:
+        state: Current StoryState
+
+    Returns:
+        pre_judge_notes=None when the draft may go to the judge; otherwise
+        judge_result, safety_notes, pre_judge_notes and iteration_count updates
+    """
+    if not PRE_JUDGE_ENABLED or not state.story:
+        return {"pre_judge_notes": None}
+
+    result = pre_judge_story(state.story, target_age(state))
+    if result is None:
+        return {"pre_judge_notes": None}
+
+    logger.debug("Pre-judge failed: %s", result["edit_instructions"])
+    return {
+        "judge_result": result,
+        "safety_notes": find_safety_issues(state.story),
+        "pre_judge_notes": result["edit_instructions"],
+        "iteration_count": state.iteration_count + 1,
+    }
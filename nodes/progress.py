@@ -0,0 +1,44 @@
+"""
+Progress node for LangGraph.
+Records each judged draft in score_history, keeps the best-scoring draft and
+decides (via utils.scoring.stop_reason) whether the revise loop stops. Local only.
+"""
+from graph.state import StoryState
+from utils.scoring import draft_rank, score_entry, stop_reason
+from typing import Dict
+
+
+def progress_node(state: StoryState) -> Dict:
+    """
+    Tracks the score trajectory after a draft was judged (or rejected by the pre-judge).
+
+    Args:
+        state: StoryState with the latest story, judge_result and safety_notes
+
+    Returns:
+        Dictionary with a score_history entry, stop_reason (None to revise) and
+        best_draft when this draft ranks at least as high as the best so far
+    """
+    entry = score_entry(state.iteration_count, state.judge_result, state.safety_notes)
+    update: Dict = {"score_history": [entry]}
+
+    best = state.best_draft
+    rank = draft_rank(state.judge_result, state.safety_notes)
+    if best is None or rank >= draft_rank(best["judge_result"], best["safety_notes"]):
+        best = {
+            "story": state.story,
+            "judge_result": state.judge_result,
+            "safety_notes": state.safety_notes,
+            "iteration": state.iteration_count,
+        }
+        update["best_draft"] = best
+
+    update["stop_reason"] = stop_reason(
+        state.score_history + [entry],
+        state.judge_result,
+        state.safety_notes,
+        state.iteration_count,
+        state.max_iterations,
+        best_is_safe=not best["safety_notes"],
+    )
+    return update
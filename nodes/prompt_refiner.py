@@ -1,57 +1,137 @@
 """
 PromptRefiner node for LangGraph.
-Converts raw user input into structured JSON brief.
+Converts raw user input into structured JSON brief, filled from the precomputed
+brief index for common themes or the shared brief cache, and refined by the LLM otherwise.
 """
 from langchain_core.messages import SystemMessage, HumanMessage
 from graph.state import StoryState
+from storage.brief_index import lookup_brief, share_brief, shared_brief
 from utils.prompts import PROMPT_REFINER_SYSTEM
-from utils.json_parser import parse_strict_json
+from utils.json_parser import parse_structured
 from utils.llm_factory import get_llm
-from typing import Dict
+from utils.llm_calls import invoke_llm, ainvoke_llm
+from utils.schemas import StoryBrief
+from utils.config import STRUCTURED_OUTPUT
+from typing import Dict, List, Optional
+import logging
 
+logger = logging.getLogger(__name__)
 
-def prompt_refiner_node(state: StoryState) -> Dict:
+
+def _validate(content: str) -> Dict:
+    return parse_structured(content, StoryBrief)
+
+
+def _build_user_prompt(state: StoryState) -> str:
+    """Build the refiner user prompt from the raw request fields."""
+    user_prompt = f"Raw topic: \"{state.user_input}\"\nAge (5–10): {state.age}"
+    if state.tone:
+        user_prompt += f"\nPreferred tone (optional): \"{state.tone}\""
+    return user_prompt
+
+
+def _messages(user_prompt: str) -> List:
+    return [
+        SystemMessage(content=PROMPT_REFINER_SYSTEM),
+        HumanMessage(content=user_prompt)
+    ]
+
+
+def _local_brief(state: StoryState) -> Optional[Dict]:
+    """Brief from the precomputed index or the shared brief cache, or None."""
+    brief = lookup_brief(state.user_input, state.age, state.tone)
+    if brief is None:
+        brief = shared_brief(state.user_input, state.age, state.tone)
+    return brief
+
+
+def refine_with_llm(state: StoryState) -> Dict:
     """
-    Refines user input into structured JSON brief.
-    
+    Ask the LLM for a brief (the refiner's LLM path; also used to build the brief index).
+
     Args:
-        state: Current StoryState
-        
+        state: StoryState with user_input, age and tone
+
     Returns:
-        Dictionary with refined_brief update
+        Refined brief
     """
-    # Extract user input from state
-    user_input = state.user_input
-    age = state.age
-    tone = state.tone
-    
-    # Build user prompt
-    user_prompt = f"Raw topic: \"{user_input}\"\nAge (5–10): {age}"
-    if tone:
-        user_prompt += f"\nPreferred tone (optional): \"{tone}\""
-    
+    user_prompt = _build_user_prompt(state)
+
     # Initialize LLM (flexible: Gemini or OpenAI)
-    llm = get_llm(temperature=0.3)
-    
+    llm = get_llm(temperature=0.3, json_mode=STRUCTURED_OUTPUT)
+
     # Call LLM
-    messages = [
-        SystemMessage(content=PROMPT_REFINER_SYSTEM),
-        HumanMessage(content=user_prompt)
-    ]
-    response = llm.invoke(messages)
-    
-    # Parse JSON response
+    response = invoke_llm(llm, _messages(user_prompt), "prompt_refiner", validate=_validate)
+
+    # Parse JSON response against the brief schema
     try:
-        refined_brief = parse_strict_json(response.content)
-        print(f"jjjjjjDEBUG: Refined brief: {refined_brief}")
-    except (ValueError, Exception) as e:
+        refined_brief = parse_structured(response.content, StoryBrief, node="prompt_refiner")
+        logger.debug("Refined brief: %s", refined_brief)
+    except ValueError:
         # If parsing fails, retry once with stricter prompt
         retry_prompt = user_prompt + "\n\nReturn STRICT JSON only."
-        retry_response = llm.invoke([
-            SystemMessage(content=PROMPT_REFINER_SYSTEM),
-            HumanMessage(content=retry_prompt)
-        ])
-        refined_brief = parse_strict_json(retry_response.content)
-    
+        retry_response = invoke_llm(
+            llm, _messages(retry_prompt), "prompt_refiner", validate=_validate, retry=True
+        )
+        refined_brief = parse_structured(retry_response.content, StoryBrief, node="prompt_refiner")
+
+    return refined_brief
+
+
+async def arefine_with_llm(state: StoryState) -> Dict:
+    """
+    Async variant of refine_with_llm using ``ainvoke`` under the global LLM limiter.
+    """
+    user_prompt = _build_user_prompt(state)
+    llm = get_llm(temperature=0.3, json_mode=STRUCTURED_OUTPUT)
+
+    response = await ainvoke_llm(llm, _messages(user_prompt), "prompt_refiner", validate=_validate)
+
+    try:
+        refined_brief = parse_structured(response.content, StoryBrief, node="prompt_refiner")
+    except ValueError:
+        retry_prompt = user_prompt + "\n\nReturn STRICT JSON only."
+        retry_response = await ainvoke_llm(
+            llm, _messages(retry_prompt), "prompt_refiner", validate=_validate, retry=True
+        )
+        refined_brief = parse_structured(retry_response.content, StoryBrief, node="prompt_refiner")
+
+    return refined_brief
+
+
+def prompt_refiner_node(state: StoryState) -> Dict:
+    """
+    Refines user input into structured JSON brief.
+
+    Common themes with a confident match in the brief index are filled locally,
+    then briefs another server process already refined for the same request are
+    reused (shared "briefs" cache tier); other topics go to the LLM.
+
+    Args:
+        state: Current StoryState
+
+    Returns:
+        Dictionary with refined_brief update
+    """
+    refined_brief = _local_brief(state)
+    if refined_brief is None:
+        refined_brief = refine_with_llm(state)
+        share_brief(state.user_input, state.age, state.tone, refined_brief)
     return {"refined_brief": refined_brief}
 
+
+async def aprompt_refiner_node(state: StoryState) -> Dict:
+    """
+    Async variant of prompt_refiner_node using ``ainvoke`` under the global LLM limiter.
+
+    Args:
+        state: Current StoryState
+
+    Returns:
+        Dictionary with refined_brief update
+    """
+    refined_brief = _local_brief(state)
+    if refined_brief is None:
+        refined_brief = await arefine_with_llm(state)
+        share_brief(state.user_input, state.age, state.tone, refined_brief)
+    return {"refined_brief": refined_brief}
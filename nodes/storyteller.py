@@ -1,43 +1,57 @@
 """
 Storyteller node for LangGraph.
 Generates stories in two modes: Initial (from brief) and Revision (from edit instructions).
+Revisions first ask for paragraph-level edits (STORY_REVISION_MODE=edits) and
+apply them locally; a full rewrite is used when the edits cannot be applied.
 """
 from langchain_core.messages import SystemMessage, HumanMessage
 from graph.state import StoryState
-from utils.prompts import STORYTELLER_SYSTEM
+from utils.prompts import STORYTELLER_SYSTEM, STORYTELLER_EDIT_SYSTEM
 from utils.llm_factory import get_llm
-from typing import Dict
+from utils.llm_calls import invoke_llm, ainvoke_llm, stream_llm, astream_llm
+from utils.json_parser import parse_structured
+from utils.schemas import StoryEdits
+from utils.story_edits import apply_edits, edited_fraction, numbered_paragraphs
+from utils.config import REVISION_EDIT_MAX_FRACTION, REVISION_MODE, REVISION_REWRITE_BELOW, STRUCTURED_OUTPUT
+from typing import Callable, Dict, List, Optional, Tuple
 import json
+import logging
 
+logger = logging.getLogger(__name__)
 
-def storyteller_node(state: StoryState) -> Dict:
+try:
+    from langgraph.config import get_stream_writer
+except ImportError:
+    get_stream_writer = None
+
+
+def _revision_instructions(state: StoryState) -> Optional[str]:
+    if state.feedback_request and state.story:
+        return state.feedback_request
+    if state.judge_result and state.story:
+        return state.judge_result.get("edit_instructions", "")
+    return None
+
+
+def _build_request(state: StoryState) -> Tuple[float, str]:
     """
-    Generates or revises story based on state.
-    
+    Pick the generation mode and build its prompt.
+
     Two modes:
     1. Initial: Uses refined_brief to generate story
     2. Revision: Uses story + edit_instructions to revise (lower temperature)
-    
-    Args:
-        state: Current StoryState
-        
+
     Returns:
-        Dictionary with story update
+        Tuple of (temperature, user_prompt)
     """
-    revision_instructions = None
-    if state.feedback_request and state.story:
-        revision_instructions = state.feedback_request
-    elif state.judge_result and state.story:
-        revision_instructions = state.judge_result.get("edit_instructions", "")
+    revision_instructions = _revision_instructions(state)
 
     # Check if this is a revision
     if revision_instructions:
         # Revision mode: apply edit instructions
         edit_instructions = revision_instructions or ""
         temperature = 0.3  # Lower temperature for revisions
-        
-        llm = get_llm(temperature=temperature)
-        
+
         source_label = "Reader feedback" if state.feedback_request else "Edit instructions"
         user_prompt = f"""Revise the following story according to these {source_label.lower()}. Keep it safe, age-fit, and 250–400 words.
 
@@ -50,15 +64,16 @@ Original story:
 {state.story}
 
 Output only the revised story text."""
-    else:
-        # Initial mode: use refined_brief
-        if not state.refined_brief:
-            raise ValueError("refined_brief is required for initial story generation")
-        
-        llm = get_llm(temperature=0.7)  # Default temperature for initial
-        
-        brief_json = json.dumps(state.refined_brief, indent=2)
-        user_prompt = f"""Create a children's story using this brief:
+        return temperature, user_prompt
+
+    # Initial mode: use refined_brief
+    if not state.refined_brief:
+        raise ValueError("refined_brief is required for initial story generation")
+
+    temperature = 0.7  # Default temperature for initial
+
+    brief_json = json.dumps(state.refined_brief, indent=2)
+    user_prompt = f"""Create a children's story using this brief:
 
 Brief (JSON):
 
@@ -73,14 +88,201 @@ Aim to satisfy should.
 Use can if it helps engagement without breaking safety/length.
 
 Output only the story text."""
-    
-    # Call LLM
-    messages = [
+    return temperature, user_prompt
+
+
+def _edit_request(state: StoryState) -> Optional[str]:
+    """
+    Build the paragraph-edit prompt for a revision, or None when the revision
+    should be a full rewrite (initial draft, edits disabled, or a low judge score).
+    """
+    instructions = _revision_instructions(state)
+    if REVISION_MODE != "edits" or not instructions:
+        return None
+    overall = (state.judge_result or {}).get("overall")
+    if not state.feedback_request and overall is not None and overall < REVISION_REWRITE_BELOW:
+        return None  # A weak draft needs broad changes; rewriting is cheaper than a long edit list.
+    source_label = "Reader feedback" if state.feedback_request else "Edit instructions"
+    return f"""Revise the story below according to these {source_label.lower()}.
+
+{source_label}:
+
+{instructions}
+
+Story paragraphs:
+
+{numbered_paragraphs(state.story)}"""
+
+
+def _edited_story(state: StoryState, content: str) -> Optional[str]:
+    """Apply the edit-mode response to state.story; None means fall back to a full rewrite."""
+    try:
+        result = parse_structured(content, StoryEdits, node="storyteller")
+        if result["rewrite"]:
+            return result["story"].strip() or None
+        if not result["edits"]:
+            raise ValueError("no edits returned")
+        fraction = edited_fraction(state.story, result["edits"])
+        if fraction > REVISION_EDIT_MAX_FRACTION:
+            # Patching most paragraphs piecemeal reads worse than one coherent rewrite.
+            raise ValueError(f"edits touch {fraction:.0%} of the paragraphs")
+        return apply_edits(state.story, result["edits"])
+    except ValueError as exc:
+        logger.debug("Paragraph edits unusable (%s); rewriting the whole story", exc)
+        return None
+
+
+def _edit_messages(user_prompt: str) -> List:
+    return [
+        SystemMessage(content=STORYTELLER_EDIT_SYSTEM),
+        HumanMessage(content=user_prompt)
+    ]
+
+
+def revise_by_edits(state: StoryState) -> Optional[str]:
+    """
+    Try a delta revision: one small JSON call whose paragraph edits are applied locally.
+
+    Args:
+        state: StoryState holding the story and the feedback or judge instructions
+
+    Returns:
+        Revised story, or None when a full rewrite is needed
+    """
+    user_prompt = _edit_request(state)
+    if user_prompt is None:
+        return None
+    llm = get_llm(temperature=0.3, json_mode=STRUCTURED_OUTPUT)
+    response = invoke_llm(llm, _edit_messages(user_prompt), "storyteller")
+    return _edited_story(state, str(response.content))
+
+
+async def arevise_by_edits(state: StoryState) -> Optional[str]:
+    """
+    Async variant of revise_by_edits.
+    """
+    user_prompt = _edit_request(state)
+    if user_prompt is None:
+        return None
+    llm = get_llm(temperature=0.3, json_mode=STRUCTURED_OUTPUT)
+    response = await ainvoke_llm(llm, _edit_messages(user_prompt), "storyteller")
+    return _edited_story(state, str(response.content))
+
+
+def _stream_writer() -> Callable[[Dict], None]:
+    """
+    Return LangGraph's custom stream writer, or a no-op outside a streaming graph run.
+    """
+    if get_stream_writer is not None:
+        try:
+            return get_stream_writer()
+        except RuntimeError:
+            pass
+    return lambda event: None
+
+
+def _announce(state: StoryState, writer: Callable[[Dict], None]) -> None:
+    """Emit a draft_started or revision_started event before the LLM call."""
+    if state.story and (state.feedback_request or state.judge_result):
+        writer({"event": "revision_started", "iteration": state.iteration_count})
+    else:
+        writer({"event": "draft_started", "iteration": state.iteration_count})
+
+
+def _messages(user_prompt: str) -> List:
+    return [
         SystemMessage(content=STORYTELLER_SYSTEM),
         HumanMessage(content=user_prompt)
     ]
-    response = llm.invoke(messages)
-    
+
+
+def write_story(state: StoryState) -> str:
+    """
+    Generates or revises a story without streaming (used for parallel drafts).
+
+    Args:
+        state: StoryState with a refined_brief or a story to revise
+
+    Returns:
+        Story text
+    """
+    revised = revise_by_edits(state)
+    if revised is not None:
+        return revised
+    temperature, user_prompt = _build_request(state)
+    llm = get_llm(temperature=temperature)
+    response = invoke_llm(llm, _messages(user_prompt), "storyteller")
+    return response.content.strip()
+
+
+async def awrite_story(state: StoryState) -> str:
+    """
+    Async variant of write_story.
+    """
+    revised = await arevise_by_edits(state)
+    if revised is not None:
+        return revised
+    temperature, user_prompt = _build_request(state)
+    llm = get_llm(temperature=temperature)
+    response = await ainvoke_llm(llm, _messages(user_prompt), "storyteller")
+    return response.content.strip()
+
+
+def storyteller_node(state: StoryState) -> Dict:
+    """
+    Generates or revises story based on state.
+
+    Args:
+        state: Current StoryState
+
+    Returns:
+        Dictionary with story update
+    """
+    writer = _stream_writer()
+    _announce(state, writer)
+    revised = revise_by_edits(state)
+    if revised is not None:
+        # Edits arrive as JSON, so the preview gets the applied result in one piece.
+        writer({"event": "token", "text": revised})
+        return {"story": revised}
+
+    temperature, user_prompt = _build_request(state)
+    llm = get_llm(temperature=temperature)
+
+    # Stream the LLM call; tokens surface as custom events on graph.stream(..., stream_mode="custom")
+    response = stream_llm(
+        llm, _messages(user_prompt), "storyteller",
+        on_token=lambda text: writer({"event": "token", "text": text}),
+    )
+
     story_text = response.content.strip()
-    
+
     return {"story": story_text}
+
+
+async def astoryteller_node(state: StoryState) -> Dict:
+    """
+    Async variant of storyteller_node using ``astream`` under the global LLM limiter.
+
+    Args:
+        state: Current StoryState
+
+    Returns:
+        Dictionary with story update
+    """
+    writer = _stream_writer()
+    _announce(state, writer)
+    revised = await arevise_by_edits(state)
+    if revised is not None:
+        writer({"event": "token", "text": revised})
+        return {"story": revised}
+
+    temperature, user_prompt = _build_request(state)
+    llm = get_llm(temperature=temperature)
+
+    response = await astream_llm(
+        llm, _messages(user_prompt), "storyteller",
+        on_token=lambda text: writer({"event": "token", "text": text}),
+    )
+
+    return {"story": response.content.strip()}
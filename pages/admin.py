@@ -0,0 +1,78 @@
+"""
+Admin page: shared cache tiers (totals across every server process) and the
+per-process caches and pools of the process serving this page.
+"""
+import os
+
+import streamlit as st
+
+from jobs.warm_pool import get_warm_pool_stats
+from storage.brief_index import get_brief_index_stats
+from storage.reuse_index import get_reuse_stats
+from storage.shared_cache import TIERS, get_shared_cache
+from story_engine import graph_compiled
+from utils.config import SHARED_CACHE_BACKEND, SHARED_CACHE_PATH, SHARED_CACHE_TIERS
+from utils.llm_cache import get_llm_cache_stats
+from utils.llm_factory import get_llm_pool_stats
+
+st.set_page_config(page_title="Story Studio Admin", page_icon="🛠️", layout="wide")
+st.title("Cache admin")
+
+st.subheader("Shared cache tiers")
+shared = get_shared_cache()
+if shared is None:
+    st.info("The shared cache is off. Set `STORY_SHARED_CACHE=sqlite` (or `file`) on every server process to share it.")
+else:
+    st.caption(f"{SHARED_CACHE_BACKEND} backend at `{SHARED_CACHE_PATH}`; totals from every process using it.")
+    stats = shared.stats()["tiers"]
+    st.dataframe(
+        [
+            {
+                "tier": tier,
+                "enabled": tier in SHARED_CACHE_TIERS,
+                "entries": stats[tier]["entries"],
+                "hits": stats[tier]["hits"],
+                "misses": stats[tier]["misses"],
+                "hit rate": f"{stats[tier]['hit_rate']:.0%}",
+                "writes": stats[tier]["writes"],
+                "evictions": stats[tier]["evictions"],
+            }
+            for tier in TIERS
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+    columns = st.columns(len(TIERS))
+    for column, tier in zip(columns, TIERS):
+        if column.button(f"Clear {tier}", key=f"clear_{tier}"):
+            shared.clear(tier)
+            st.rerun()
+
+st.subheader("Warm pool")
+pool = get_warm_pool_stats()
+if not pool["enabled"]:
+    st.info("The warm pool is off. Set `STORY_WARM_POOL=on` to keep ready stories per age and preset tone.")
+else:
+    cols = st.columns(4)
+    cols[0].metric("Ready", f"{pool['ready']} / {pool['capacity']}")
+    cols[1].metric("Hit rate (this process)", f"{pool['hit_rate']:.0%}", f"{pool['hits']} of {pool['lookups']}")
+    cols[2].metric("Oldest ready story", f"{pool['oldest_ready_age_seconds'] / 3600:.1f} h")
+    cols[3].metric(
+        "Refills (24 h)", pool["refills_24h"],
+        f"${pool['refill_spend_24h_usd']:.2f} of ${pool['refill_budget_usd']:.2f}", delta_color="off",
+    )
+    st.json(pool, expanded=False)
+
+st.subheader(f"This process (pid {os.getpid()})")
+left, right = st.columns(2)
+with left:
+    st.metric("Graph compiled", "yes" if graph_compiled() else "not yet")
+    st.markdown("**Chat-model client pool**")
+    st.json(get_llm_pool_stats(), expanded=False)
+    st.markdown("**LLM response cache**")
+    st.json(get_llm_cache_stats() or {"backend": "off"}, expanded=False)
+with right:
+    st.markdown("**Precomputed brief index**")
+    st.json(get_brief_index_stats(), expanded=False)
+    st.markdown("**Near-duplicate reuse**")
+    st.json(get_reuse_stats(), expanded=False)
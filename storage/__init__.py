@@ -0,0 +1 @@
+# Storage module for persisted stories
@@ -0,0 +1,301 @@
+"""
+Local index of precomputed refiner briefs for common themes.
+
+Briefs are built offline (``python main.py build-briefs``) by running the prompt
+refiner once per theme x age band x tone, and stored in SQLite keyed by the
+theme's normalized keywords (utils.embeddings: stop words dropped, synonyms and
+suffixes folded, sorted), the age band and the tone. The refiner node looks a
+request up here first and only calls the LLM for topics without a confident match.
+"""
+import array
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from storage.shared_cache import make_key, shared_tier
+from storage.story_store import normalize_topic
+from utils.config import BRIEF_INDEX_ENABLED, BRIEF_INDEX_PATH, BRIEF_INDEX_THRESHOLD, JUDGE_AGE_BANDS
+from utils.embeddings import HashedNgramVectorizer, cosine, normalize_tokens
+
+
+def topic_key(topic: str) -> str:
+    """
+    Order-insensitive keyword key for a topic.
+
+    Args:
+        topic: Raw or refined topic
+
+    Returns:
+        Sorted, de-duplicated folded content words ("" when there are none)
+    """
+    return " ".join(sorted(set(normalize_tokens(topic or ""))))
+
+
+def read_themes(path: str) -> Iterator[str]:
+    """
+    Read one theme per line; blank lines and ``#`` comments are skipped.
+
+    Args:
+        path: Text file of themes
+
+    Yields:
+        Theme strings in file order
+    """
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            theme = line.split("#", 1)[0].strip()
+            if theme:
+                yield theme
+
+
+def age_band(age: Any) -> Optional[Tuple[int, int]]:
+    """The JUDGE_AGE_BANDS entry containing ``age``, or None."""
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return None
+    for band in JUDGE_AGE_BANDS:
+        if band[0] <= age <= band[1]:
+            return band
+    return None
+
+
+def _band_key(band: Tuple[int, int]) -> str:
+    return f"{band[0]}-{band[1]}"
+
+
+def _tone_key(tone: Optional[str]) -> str:
+    return (tone or "").strip().lower()
+
+
+class BriefIndex:
+    """
+    SQLite table of refiner briefs keyed by (topic keywords, age band, tone).
+
+    Args:
+        path: SQLite file
+        threshold: Minimum topic similarity for a confident match
+    """
+
+    def __init__(self, path: str, threshold: float = 0.92):
+        self.path = path
+        self.threshold = threshold
+        self.vectorizer = HashedNgramVectorizer()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS brief_templates ("
+            "topic_key TEXT NOT NULL, age_band TEXT NOT NULL, tone TEXT NOT NULL, theme TEXT NOT NULL, "
+            "brief TEXT NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (age_band, tone, topic_key))"
+        )
+        self._conn.commit()
+
+    def put(self, theme: str, band: Tuple[int, int], tone: Optional[str], brief: Dict[str, Any]) -> bool:
+        """
+        Store (or replace) the brief for a theme.
+
+        Args:
+            theme: Theme text the brief was refined from
+            band: Age band (low, high)
+            tone: Tone preference ("" or None for no preference)
+            brief: Refined brief
+
+        Returns:
+            False when the theme has no content words and cannot be indexed
+        """
+        key = topic_key(theme)
+        if not key:
+            return False
+        vector = array.array("f", self.vectorizer.embed(key)).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO brief_templates "
+                "(topic_key, age_band, tone, theme, brief, vector, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, _band_key(band), _tone_key(tone), theme, json.dumps(brief), vector, time.time()),
+            )
+            self._conn.commit()
+        return True
+
+    def has(self, theme: str, band: Tuple[int, int], tone: Optional[str]) -> bool:
+        """Whether a brief for exactly this theme key, band and tone is stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM brief_templates WHERE age_band = ? AND tone = ? AND topic_key = ?",
+                (_band_key(band), _tone_key(tone), topic_key(theme)),
+            ).fetchone()
+        return row is not None
+
+    def lookup(self, topic: str, age: Any, tone: Optional[str]) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """
+        Find a stored brief for a request.
+
+        An exact keyword-key match scores 1.0; otherwise the closest theme in the
+        same band and tone by vector similarity is returned if it reaches the
+        threshold.
+
+        Args:
+            topic: Requested topic
+            age: Target age
+            tone: Tone preference
+
+        Returns:
+            (similarity, record with theme and brief), or None
+        """
+        band = age_band(age)
+        key = topic_key(topic)
+        if band is None or not key:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT topic_key, theme, brief, vector FROM brief_templates WHERE age_band = ? AND tone = ?",
+                (_band_key(band), _tone_key(tone)),
+            ).fetchall()
+        best = None
+        vector = None
+        for row_key, theme, brief, blob in rows:
+            if row_key == key:
+                best = (1.0, theme, brief)
+                break
+            if vector is None:
+                vector = self.vectorizer.embed(key)
+            similarity = cosine(vector, array.array("f", blob).tolist())
+            if best is None or similarity > best[0]:
+                best = (similarity, theme, brief)
+        if best is None or best[0] < self.threshold:
+            return None
+        return best[0], {"theme": best[1], "brief": json.loads(best[2])}
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM brief_templates").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM brief_templates")
+            self._conn.commit()
+
+
+class BriefIndexStats:
+    """Local brief hits vs refiner LLM calls (thread-safe)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "lookups": lookups,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+BRIEF_INDEX_STATS = BriefIndexStats()
+_index: Optional[BriefIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_brief_index(create: bool = False) -> Optional[BriefIndex]:
+    """
+    Return the process-wide brief index at ``STORY_BRIEF_INDEX_PATH``.
+
+    Args:
+        create: Create the file if it does not exist yet (the build command does)
+
+    Returns:
+        The index, or None when it has not been built
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            if not create and not os.path.exists(BRIEF_INDEX_PATH):
+                return None
+            _index = BriefIndex(BRIEF_INDEX_PATH, threshold=BRIEF_INDEX_THRESHOLD)
+        return _index
+
+
+def set_brief_index(index: Optional[BriefIndex]) -> None:
+    """Install a custom brief index (e.g. a temporary file in tests)."""
+    global _index
+    with _index_lock:
+        _index = index
+
+
+def get_brief_index_stats() -> Dict[str, Any]:
+    """Report local brief hits, refiner LLM calls and the hit rate."""
+    return BRIEF_INDEX_STATS.snapshot()
+
+
+def lookup_brief(topic: str, age: Any, tone: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Fill a brief locally from the index when a confident match exists.
+
+    The stored brief is copied and its age set to the requested one; its topic
+    stays the refined theme.
+
+    Args:
+        topic: Raw user topic
+        age: Target age
+        tone: Tone preference
+
+    Returns:
+        Brief dict, or None when the refiner LLM should be called
+    """
+    index = get_brief_index() if BRIEF_INDEX_ENABLED else None
+    if index is None:
+        return None
+    match = index.lookup(topic, age, tone)
+    BRIEF_INDEX_STATS.record(hit=match is not None)
+    if match is None:
+        return None
+    brief = match[1]["brief"]
+    brief["age"] = int(age)
+    return brief
+
+
+def _shared_brief_key(topic: str, age: Any, tone: Optional[str]) -> str:
+    return make_key("brief", normalize_topic(topic), int(age), _tone_key(tone))
+
+
+def shared_brief(topic: str, age: Any, tone: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Brief refined for the same request by any server process (shared "briefs" tier).
+
+    Args:
+        topic: Raw user topic
+        age: Target age
+        tone: Tone preference
+
+    Returns:
+        Brief dict, or None when the tier is off or has no entry
+    """
+    shared = shared_tier("briefs")
+    if shared is None:
+        return None
+    return shared.get_json("briefs", _shared_brief_key(topic, age, tone))
+
+
+def share_brief(topic: str, age: Any, tone: Optional[str], brief: Dict[str, Any]) -> None:
+    """Publish an LLM-refined brief to the shared "briefs" tier (no-op when it is off)."""
+    shared = shared_tier("briefs")
+    if shared is not None:
+        shared.set_json("briefs", _shared_brief_key(topic, age, tone), brief)
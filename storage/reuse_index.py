@@ -0,0 +1,259 @@
+"""
+On-disk approximate-nearest-neighbor index of passed stories for near-duplicate reuse.
+
+Each passed story is indexed under its raw and refined topic vectors
+(utils.embeddings). Vectors are bucketed with random-hyperplane LSH: a few bands
+of sign bits are stored as indexed integer columns next to (age, tone), so a
+query only re-ranks the handful of rows sharing a band with it. A topic indexed
+again replaces its older entry; entries expire after a TTL and the oldest are
+trimmed beyond ``max_entries``.
+"""
+import array
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from graph.state import StoryState
+from storage.story_store import state_from_json, state_to_json
+from utils.config import (
+    REUSE_INDEX_PATH,
+    REUSE_LSH_BANDS,
+    REUSE_LSH_BITS,
+    REUSE_MAX_ENTRIES,
+    REUSE_TTL_SECONDS,
+)
+from utils.embeddings import HashedNgramVectorizer, cosine
+
+
+class ReuseIndex:
+    """
+    SQLite-backed LSH index of passed stories keyed by topic vector, age and tone.
+
+    Args:
+        path: SQLite file
+        bands: Number of LSH bands (more bands: higher recall, more candidates)
+        bits: Hyperplanes per band (more bits: fewer, closer candidates)
+        seed: Seed for the hyperplanes; must stay fixed for an existing index
+        max_entries: Entries kept (oldest first out)
+        ttl_seconds: Entry lifetime
+    """
+
+    def __init__(
+        self,
+        path: str,
+        bands: int = 4,
+        bits: int = 8,
+        seed: int = 13,
+        max_entries: int = 20_000,
+        ttl_seconds: float = 30 * 86400.0,
+    ):
+        self.path = path
+        self.bands = bands
+        self.bits = bits
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._writes = 0
+        self.vectorizer = HashedNgramVectorizer()
+        rng = random.Random(seed)
+        self._planes = [
+            [[rng.gauss(0.0, 1.0) for _ in range(self.vectorizer.dim)] for _ in range(bits)]
+            for _ in range(bands)
+        ]
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        band_columns = ", ".join(f"band{i} INTEGER NOT NULL" for i in range(bands))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reuse_entries ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, age INTEGER NOT NULL, "
+            "tone TEXT NOT NULL, key_text TEXT NOT NULL, story TEXT NOT NULL, state TEXT NOT NULL, "
+            f"vector BLOB NOT NULL, {band_columns})"
+        )
+        for i in range(bands):
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_reuse_band{i} ON reuse_entries(age, tone, band{i})"
+            )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_reuse_key ON reuse_entries(age, tone, key_text)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reuse_created ON reuse_entries(created_at)")
+        self._conn.commit()
+
+    def _signature(self, vector: List[float]) -> List[int]:
+        signature = []
+        for planes in self._planes:
+            code = 0
+            for plane in planes:
+                code = (code << 1) | (sum(p * v for p, v in zip(plane, vector)) >= 0.0)
+            signature.append(code)
+        return signature
+
+    @staticmethod
+    def _tone_key(tone: Optional[str]) -> str:
+        return (tone or "").strip().lower()
+
+    def add(self, topics: List[str], age: int, tone: Optional[str], story: str, state: StoryState) -> None:
+        """
+        Index a passed story under each distinct topic text (e.g. raw and refined).
+
+        Args:
+            topics: Topic strings to index the story under
+            age: Target age
+            tone: Tone preference
+            story: Final story text
+            state: Final StoryState
+        """
+        state_json = state_to_json(state)
+        now = time.time()
+        rows = []
+        for topic in dict.fromkeys(t for t in topics if t):
+            vector = self.vectorizer.embed(topic)
+            if not any(vector):
+                continue
+            rows.append((now, int(age), self._tone_key(tone), topic, story, state_json,
+                         array.array("f", vector).tobytes(), *self._signature(vector)))
+        if not rows:
+            return
+        placeholders = ", ".join("?" for _ in range(7 + self.bands))
+        band_names = ", ".join(f"band{i}" for i in range(self.bands))
+        with self._lock:
+            # The newest story for a topic replaces the previous one (e.g. a revised reuse hit).
+            self._conn.executemany(
+                "DELETE FROM reuse_entries WHERE age = ? AND tone = ? AND key_text = ?",
+                [(row[1], row[2], row[3]) for row in rows],
+            )
+            self._conn.executemany(
+                f"INSERT INTO reuse_entries (created_at, age, tone, key_text, story, state, vector, {band_names}) "
+                f"VALUES ({placeholders})",
+                rows,
+            )
+            self._writes += 1
+            # Trim occasionally rather than on every write.
+            if self._writes % 100 == 0:
+                self._conn.execute("DELETE FROM reuse_entries WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._conn.execute(
+                    "DELETE FROM reuse_entries WHERE id IN ("
+                    "SELECT id FROM reuse_entries ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def query(self, topic: str, age: int, tone: Optional[str]) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """
+        Find the most similar indexed story for the same age and tone.
+
+        Args:
+            topic: Requested topic
+            age: Target age
+            tone: Tone preference
+
+        Returns:
+            (similarity, record with key_text, story and state), or None
+        """
+        vector = self.vectorizer.embed(topic)
+        if not any(vector):
+            return None
+        signature = self._signature(vector)
+        band_match = " OR ".join(f"band{i} = ?" for i in range(self.bands))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, key_text, story, state, vector FROM reuse_entries "
+                f"WHERE age = ? AND tone = ? AND created_at >= ? AND ({band_match})",
+                (int(age), self._tone_key(tone), time.time() - self.ttl_seconds, *signature),
+            ).fetchall()
+        best = None
+        for row_id, key_text, story, state_json, blob in rows:
+            similarity = cosine(vector, array.array("f", blob).tolist())
+            if best is None or similarity > best[0]:
+                best = (similarity, {"id": row_id, "key_text": key_text, "story": story, "state": state_json})
+        if best is None:
+            return None
+        best[1]["state"] = state_from_json(best[1]["state"])
+        return best
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM reuse_entries").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM reuse_entries")
+            self._conn.commit()
+
+
+class ReuseStats:
+    """Hit rate and latency saved by near-duplicate reuse (thread-safe)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.revised = 0
+        self.misses = 0
+        self.generated_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def record_miss(self, seconds: float) -> None:
+        with self._lock:
+            self.lookups += 1
+            self.misses += 1
+            self.generated_seconds += seconds
+
+    def record_hit(self, seconds: float, revised: bool) -> None:
+        with self._lock:
+            self.lookups += 1
+            self.hits += 1
+            self.revised += 1 if revised else 0
+            # Estimate the saving against the mean full-generation latency seen so far.
+            if self.misses:
+                self.saved_seconds += max(0.0, self.generated_seconds / self.misses - seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "revised_hits": self.revised,
+                "misses": self.misses,
+                "hit_rate": (self.hits / self.lookups) if self.lookups else 0.0,
+                "mean_generation_seconds": (self.generated_seconds / self.misses) if self.misses else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
+
+
+REUSE_STATS = ReuseStats()
+_index: Optional[ReuseIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_reuse_index() -> ReuseIndex:
+    """Return the process-wide reuse index at ``STORY_REUSE_INDEX_PATH``."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ReuseIndex(
+                REUSE_INDEX_PATH,
+                bands=REUSE_LSH_BANDS,
+                bits=REUSE_LSH_BITS,
+                max_entries=REUSE_MAX_ENTRIES,
+                ttl_seconds=REUSE_TTL_SECONDS,
+            )
+        return _index
+
+
+def set_reuse_index(index: Optional[ReuseIndex]) -> None:
+    """Install a custom reuse index (e.g. a temporary file in tests)."""
+    global _index
+    with _index_lock:
+        _index = index
+
+
+def get_reuse_stats() -> Dict[str, Any]:
+    """Report reuse lookups, hit rate and estimated latency saved."""
+    return REUSE_STATS.snapshot()
@@ -0,0 +1,409 @@
+"""
+Cache tier shared by every server process on one host.
+
+Several Streamlit processes behind a load balancer each keep their own
+``st.session_state`` and in-process caches, so a popular prompt is refined, judged
+and written once per process. This tier holds what can be shared as plain text:
+
+    llm:     provider responses (utils.llm_cache, keyed like the in-process cache)
+    briefs:  refined briefs per (topic, age, tone)
+    stories: passed stories per fresh (topic, age, tone) request
+
+Entries expire after a TTL and each tier keeps at most ``max_entries`` (least
+recently used first out). Hit, miss, write and eviction counts are kept per tier
+in the shared store, so any process (pages/admin.py) sees the totals of all of them.
+
+Backends: SQLite in WAL mode, or a directory with one JSON file per entry.
+Compiled objects (the LangGraph graph, chat-model clients) cannot be pickled
+across processes; they stay per process (see story_engine.warm_up).
+"""
+import atexit
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Optional
+
+from utils.config import (
+    SHARED_CACHE_BACKEND,
+    SHARED_CACHE_MAX_ENTRIES,
+    SHARED_CACHE_PATH,
+    SHARED_CACHE_TIERS,
+    SHARED_CACHE_TTL_SECONDS,
+)
+
+TIERS = ("llm", "briefs", "stories")
+_COUNTERS = ("hits", "misses", "writes", "evictions")
+_STATS_FLUSH_SECONDS = 2.0
+
+
+def make_key(*parts: Any) -> str:
+    """
+    Hash key material into a fixed-length entry key.
+
+    Args:
+        parts: JSON-serializable values identifying the entry
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SharedCache(ABC):
+    """
+    Base interface. Values are strings; counters are buffered per process and
+    added to the shared totals every few seconds (and on ``stats``).
+
+    Args:
+        ttl_seconds: Entry lifetime
+        max_entries: Entries kept per tier
+    """
+
+    def __init__(self, ttl_seconds: float = 86400.0, max_entries: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._stats_lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, int]] = {}
+        self._last_flush = time.monotonic()
+        self._writes = 0
+
+    def get(self, tier: str, key: str) -> Optional[str]:
+        value = self._get(tier, key)
+        self._count(tier, "hits" if value is not None else "misses")
+        return value
+
+    def set(self, tier: str, key: str, value: str) -> None:
+        self._set(tier, key, value)
+        self._count(tier, "writes")
+        self._writes += 1
+        # Trim occasionally rather than on every write.
+        if self._writes % 100 == 0:
+            self._count(tier, "evictions", self._evict(tier))
+
+    def get_json(self, tier: str, key: str) -> Optional[Any]:
+        value = self.get(tier, key)
+        return json.loads(value) if value is not None else None
+
+    def set_json(self, tier: str, key: str, value: Any) -> None:
+        self.set(tier, key, json.dumps(value, ensure_ascii=False))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report shared totals per tier.
+
+        Returns:
+            Dictionary with backend and, per tier, entries, hits, misses,
+            hit_rate, writes and evictions
+        """
+        self.flush_stats(force=True)
+        totals = self._load_counters()
+        tiers = {}
+        for tier in TIERS:
+            counters = {name: totals.get(tier, {}).get(name, 0) for name in _COUNTERS}
+            lookups = counters["hits"] + counters["misses"]
+            tiers[tier] = dict(
+                counters,
+                entries=self._entries(tier),
+                hit_rate=counters["hits"] / lookups if lookups else 0.0,
+            )
+        return {"backend": type(self).__name__, "tiers": tiers}
+
+    def flush_stats(self, force: bool = False) -> None:
+        with self._stats_lock:
+            if not self._pending or (not force and time.monotonic() - self._last_flush < _STATS_FLUSH_SECONDS):
+                return
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        self._add_counters(pending)
+
+    def _count(self, tier: str, name: str, amount: int = 1) -> None:
+        if not amount:
+            return
+        with self._stats_lock:
+            counters = self._pending.setdefault(tier, dict.fromkeys(_COUNTERS, 0))
+            counters[name] += amount
+        self.flush_stats()
+
+    # Backend hooks
+    @abstractmethod
+    def _get(self, tier: str, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _set(self, tier: str, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _evict(self, tier: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _entries(self, tier: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self, tier: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _add_counters(self, deltas: Dict[str, Dict[str, int]]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _load_counters(self) -> Dict[str, Dict[str, int]]:
+        raise NotImplementedError
+
+
+class SQLiteSharedCache(SharedCache):
+    """All tiers in one SQLite file in WAL mode, so readers never block the writer."""
+
+    def __init__(self, path: str, ttl_seconds: float = 86400.0, max_entries: int = 10_000):
+        super().__init__(ttl_seconds, max_entries)
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_cache ("
+            "tier TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL, "
+            "last_access REAL NOT NULL, PRIMARY KEY (tier, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_shared_cache_access ON shared_cache(tier, last_access)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_cache_stats ("
+            "tier TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0, misses INTEGER NOT NULL DEFAULT 0, "
+            "writes INTEGER NOT NULL DEFAULT 0, evictions INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.commit()
+
+    def _get(self, tier: str, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM shared_cache WHERE tier = ? AND key = ?", (tier, key)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM shared_cache WHERE tier = ? AND key = ?", (tier, key))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE shared_cache SET last_access = ? WHERE tier = ? AND key = ?", (now, tier, key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def _set(self, tier: str, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO shared_cache (tier, key, value, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (tier, key, value, now, now),
+            )
+            self._conn.commit()
+
+    def _evict(self, tier: str) -> int:
+        with self._lock:
+            expired = self._conn.execute(
+                "DELETE FROM shared_cache WHERE tier = ? AND created_at < ?", (tier, time.time() - self.ttl_seconds)
+            ).rowcount
+            over = self._conn.execute(
+                "DELETE FROM shared_cache WHERE tier = ? AND key IN ("
+                "SELECT key FROM shared_cache WHERE tier = ? ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (tier, tier, self.max_entries),
+            ).rowcount
+            self._conn.commit()
+        return expired + over
+
+    def _entries(self, tier: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM shared_cache WHERE tier = ?", (tier,)).fetchone()[0]
+
+    def clear(self, tier: Optional[str] = None) -> None:
+        with self._lock:
+            if tier is None:
+                self._conn.execute("DELETE FROM shared_cache")
+            else:
+                self._conn.execute("DELETE FROM shared_cache WHERE tier = ?", (tier,))
+            self._conn.commit()
+
+    def _add_counters(self, deltas: Dict[str, Dict[str, int]]) -> None:
+        with self._lock:
+            for tier, counters in deltas.items():
+                self._conn.execute("INSERT OR IGNORE INTO shared_cache_stats (tier) VALUES (?)", (tier,))
+                self._conn.execute(
+                    "UPDATE shared_cache_stats SET hits = hits + ?, misses = misses + ?, "
+                    "writes = writes + ?, evictions = evictions + ? WHERE tier = ?",
+                    (*(counters[name] for name in _COUNTERS), tier),
+                )
+            self._conn.commit()
+
+    def _load_counters(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT tier, hits, misses, writes, evictions FROM shared_cache_stats"
+            ).fetchall()
+        return {row[0]: dict(zip(_COUNTERS, row[1:])) for row in rows}
+
+
+class FileSharedCache(SharedCache):
+    """
+    One JSON file per entry under ``<directory>/<tier>/``; the file's mtime is
+    its last access. Writes go through a temporary file and ``os.replace``, so
+    readers in other processes never see a partial entry. Each process keeps its
+    running counters in ``<directory>/_stats/<host>-<pid>.json``.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float = 86400.0, max_entries: int = 10_000):
+        super().__init__(ttl_seconds, max_entries)
+        self.directory = directory
+        self._stats_dir = os.path.join(directory, "_stats")
+        os.makedirs(self._stats_dir, exist_ok=True)
+        self._stats_file = os.path.join(self._stats_dir, f"{socket.gethostname()}-{os.getpid()}.json")
+        self._totals: Dict[str, Dict[str, int]] = {}
+
+    def _path(self, tier: str, key: str) -> str:
+        return os.path.join(self.directory, tier, key[:2], key + ".json")
+
+    def _write_atomic(self, path: str, text: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "w", encoding="utf-8") as handle:
+            handle.write(text)
+        os.replace(temp, path)
+
+    def _get(self, tier: str, key: str) -> Optional[str]:
+        path = self._path(tier, key)
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                entry = json.load(handle)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if time.time() - entry["created_at"] > self.ttl_seconds:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # Evicted by another process in the meantime.
+        return entry["value"]
+
+    def _set(self, tier: str, key: str, value: str) -> None:
+        self._write_atomic(self._path(tier, key), json.dumps({"created_at": time.time(), "value": value}))
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _files(self, tier: str) -> Iterable[os.DirEntry]:
+        root = os.path.join(self.directory, tier)
+        if not os.path.isdir(root):
+            return []
+        entries = []
+        for shard in os.scandir(root):
+            if shard.is_dir():
+                entries.extend(entry for entry in os.scandir(shard.path) if entry.name.endswith(".json"))
+        return entries
+
+    def _evict(self, tier: str) -> int:
+        files = sorted(self._files(tier), key=lambda entry: entry.stat().st_mtime, reverse=True)
+        removed = 0
+        # mtime is the last access; entries idle longer than the TTL are expired too.
+        cutoff = time.time() - self.ttl_seconds
+        for position, entry in enumerate(files):
+            if position >= self.max_entries or entry.stat().st_mtime < cutoff:
+                removed += self._remove(entry.path)
+        return removed
+
+    def _entries(self, tier: str) -> int:
+        return len(self._files(tier))
+
+    def clear(self, tier: Optional[str] = None) -> None:
+        for name in (tier,) if tier else TIERS:
+            for entry in self._files(name):
+                self._remove(entry.path)
+
+    def _add_counters(self, deltas: Dict[str, Dict[str, int]]) -> None:
+        with self._stats_lock:
+            for tier, counters in deltas.items():
+                totals = self._totals.setdefault(tier, dict.fromkeys(_COUNTERS, 0))
+                for name in _COUNTERS:
+                    totals[name] += counters[name]
+            text = json.dumps(self._totals)
+        self._write_atomic(self._stats_file, text)
+
+    def _load_counters(self) -> Dict[str, Dict[str, int]]:
+        totals: Dict[str, Dict[str, int]] = {}
+        for entry in os.scandir(self._stats_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                with open(entry.path, "r", encoding="utf-8") as handle:
+                    process_totals = json.load(handle)
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            for tier, counters in process_totals.items():
+                merged = totals.setdefault(tier, dict.fromkeys(_COUNTERS, 0))
+                for name in _COUNTERS:
+                    merged[name] += counters.get(name, 0)
+        return totals
+
+
+_cache: Optional[SharedCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """
+    Return the process-wide handle on the shared tier configured by ``STORY_SHARED_CACHE``.
+
+    Returns:
+        SharedCache instance, or None when the shared tier is off
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None and SHARED_CACHE_BACKEND not in ("", "off", "none"):
+            options = {"ttl_seconds": SHARED_CACHE_TTL_SECONDS, "max_entries": SHARED_CACHE_MAX_ENTRIES}
+            if SHARED_CACHE_BACKEND == "sqlite":
+                _cache = SQLiteSharedCache(SHARED_CACHE_PATH, **options)
+            elif SHARED_CACHE_BACKEND == "file":
+                _cache = FileSharedCache(SHARED_CACHE_PATH, **options)
+            else:
+                raise ValueError(f"Unknown STORY_SHARED_CACHE backend: {SHARED_CACHE_BACKEND!r} (use sqlite, file or off)")
+            # Counters not yet added to the shared totals would otherwise be lost on exit.
+            atexit.register(_cache.flush_stats, True)
+        return _cache
+
+
+def set_shared_cache(cache: Optional[SharedCache]) -> None:
+    """Install a custom shared cache (e.g. a temporary file in tests)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def shared_tier(tier: str) -> Optional[SharedCache]:
+    """The shared cache when ``tier`` is enabled in ``STORY_SHARED_CACHE_TIERS``, else None."""
+    return get_shared_cache() if tier in SHARED_CACHE_TIERS else None
+
+
+def get_shared_cache_stats() -> Dict[str, Any]:
+    """Report per-tier totals across all processes (empty when the shared tier is off)."""
+    cache = get_shared_cache()
+    return cache.stats() if cache else {}
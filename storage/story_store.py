@@ -0,0 +1,276 @@
+"""
+Persistent story store.
+Every generated version is saved with its brief, judge result and full state, plus
+a parent link so feedback revisions form a lineage. Lookups are indexed on
+(topic hash, age, tone), on created_at and per session, so history pages load
+without keeping every StoryState in Streamlit session memory.
+
+Backend: SQLite (WAL) by default; other backends implement StoryStore.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from graph.state import StoryState
+from utils.config import STORY_STORE_BACKEND, STORY_STORE_PATH
+
+# Summary columns returned by history listings (no story text or state).
+_SUMMARY_COLUMNS = "id, session_id, parent_id, version, created_at, topic, age, tone, trigger, overall, word_count"
+
+
+def normalize_topic(topic: str) -> str:
+    """Lowercase and collapse whitespace so trivially different topics share a hash."""
+    return re.sub(r"\s+", " ", (topic or "").strip().lower())
+
+
+def topic_hash(topic: str) -> str:
+    """
+    Stable index key for a topic.
+
+    Args:
+        topic: Raw user topic
+
+    Returns:
+        Hex SHA-256 digest of the normalized topic
+    """
+    return hashlib.sha256(normalize_topic(topic).encode("utf-8")).hexdigest()
+
+
+def state_to_json(state: StoryState) -> str:
+    """Serialize a StoryState for storage (parallel draft candidates are dropped)."""
+    return state.to_json(exclude=("candidates",))
+
+
+def state_from_json(data: str) -> StoryState:
+    """Rebuild a StoryState saved by state_to_json."""
+    return StoryState.from_json(data)
+
+
+class StoryStore(ABC):
+    """Base store interface."""
+
+    @abstractmethod
+    def save_version(
+        self,
+        session_id: str,
+        topic: str,
+        age: int,
+        tone: Optional[str],
+        story: str,
+        state: StoryState,
+        trigger: str = "generate",
+        parent_id: Optional[int] = None,
+    ) -> int:
+        """
+        Persist one story version.
+
+        Args:
+            session_id: Owner session (a browser session, CLI run or batch)
+            topic: Raw user topic
+            age: Target age
+            tone: Tone preference
+            story: Final story text
+            state: Final StoryState
+            trigger: What produced it ("generate", "user_feedback", ...)
+            parent_id: Story id this version revises, if any
+
+        Returns:
+            The new story id
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, story_id: int) -> Optional[Dict[str, Any]]:
+        """Full record (including story text and ``state``) or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_versions(self, session_id: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """Newest-first summaries for a session, one page at a time."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_versions(self, session_id: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_by_request(self, topic: str, age: int, tone: Optional[str], limit: int = 10) -> List[Dict[str, Any]]:
+        """Newest-first summaries of stories generated for the same topic, age and tone."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def lineage(self, story_id: int) -> List[Dict[str, Any]]:
+        """Summaries from the original story down to ``story_id``."""
+        raise NotImplementedError
+
+
+class SQLiteStoryStore(StoryStore):
+    """Stories in a SQLite file; shared by every process on the host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS stories (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                parent_id INTEGER REFERENCES stories(id),
+                version INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                topic TEXT NOT NULL,
+                topic_hash TEXT NOT NULL,
+                age INTEGER NOT NULL,
+                tone TEXT NOT NULL DEFAULT '',
+                trigger TEXT NOT NULL,
+                overall REAL,
+                word_count INTEGER NOT NULL,
+                story TEXT NOT NULL,
+                refined_brief TEXT,
+                judge_result TEXT,
+                safety_notes TEXT,
+                state TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_stories_request ON stories(topic_hash, age, tone);
+            CREATE INDEX IF NOT EXISTS idx_stories_created_at ON stories(created_at);
+            CREATE INDEX IF NOT EXISTS idx_stories_session ON stories(session_id, id);
+            CREATE INDEX IF NOT EXISTS idx_stories_parent ON stories(parent_id);
+            """
+        )
+        self._conn.commit()
+
+    def save_version(
+        self,
+        session_id: str,
+        topic: str,
+        age: int,
+        tone: Optional[str],
+        story: str,
+        state: StoryState,
+        trigger: str = "generate",
+        parent_id: Optional[int] = None,
+    ) -> int:
+        judge = state.judge_result or {}
+        with self._lock:
+            version = self._conn.execute(
+                "SELECT COUNT(*) FROM stories WHERE session_id = ?", (session_id,)
+            ).fetchone()[0] + 1
+            cursor = self._conn.execute(
+                "INSERT INTO stories (session_id, parent_id, version, created_at, topic, topic_hash, age, tone, "
+                "trigger, overall, word_count, story, refined_brief, judge_result, safety_notes, state) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    session_id,
+                    parent_id,
+                    version,
+                    time.time(),
+                    topic,
+                    topic_hash(topic),
+                    int(age),
+                    tone or "",
+                    trigger,
+                    judge.get("overall"),
+                    len(story.split()),
+                    story,
+                    json.dumps(state.refined_brief) if state.refined_brief is not None else None,
+                    json.dumps(state.judge_result) if state.judge_result is not None else None,
+                    state.safety_notes,
+                    state_to_json(state),
+                ),
+            )
+            self._conn.commit()
+            return int(cursor.lastrowid)
+
+    def get(self, story_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM stories WHERE id = ?", (story_id,)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record["refined_brief"] = json.loads(record["refined_brief"]) if record["refined_brief"] else None
+        record["judge_result"] = json.loads(record["judge_result"]) if record["judge_result"] else None
+        record["state"] = state_from_json(record["state"])
+        return record
+
+    def list_versions(self, session_id: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM stories WHERE session_id = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+                (session_id, limit, offset),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_versions(self, session_id: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM stories WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def find_by_request(self, topic: str, age: int, tone: Optional[str], limit: int = 10) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM stories WHERE topic_hash = ? AND age = ? AND tone = ? "
+                "ORDER BY id DESC LIMIT ?",
+                (topic_hash(topic), int(age), tone or "", limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def lineage(self, story_id: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                WITH RECURSIVE chain(id, depth) AS (
+                    SELECT id, 0 FROM stories WHERE id = ?
+                    UNION ALL
+                    SELECT s.parent_id, chain.depth + 1 FROM stories s JOIN chain ON s.id = chain.id
+                    WHERE s.parent_id IS NOT NULL
+                )
+                SELECT {", ".join("s." + c.strip() for c in _SUMMARY_COLUMNS.split(","))}
+                FROM chain JOIN stories s ON s.id = chain.id ORDER BY chain.depth DESC
+                """,
+                (story_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[StoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_story_store() -> StoryStore:
+    """
+    Return the process-wide story store configured by ``STORY_STORE_BACKEND``.
+
+    Returns:
+        StoryStore instance
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if STORY_STORE_BACKEND != "sqlite":
+                raise ValueError(f"Unknown STORY_STORE_BACKEND: {STORY_STORE_BACKEND!r} (use sqlite)")
+            _store = SQLiteStoryStore(STORY_STORE_PATH)
+        return _store
+
+
+def set_story_store(store: Optional[StoryStore]) -> None:
+    """Install a custom store backend (any StoryStore implementation)."""
+    global _store
+    with _store_lock:
+        _store = store
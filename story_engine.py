@@ -1,40 +1,71 @@
 """
 Shared helpers for running the LangGraph story workflow from both CLI and Streamlit front-ends.
 """
+import asyncio
+import random
+import time
+from contextlib import suppress
 from functools import lru_cache
-from typing import Optional, Tuple
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple
 
-from dotenv import load_dotenv
-
-from graph.graph import build_graph
 from graph.state import StoryState
-
-# Ensure environment variables are loaded once for any entry point.
-load_dotenv()
+from jobs.warm_pool import take_pooled_story
+from storage.reuse_index import REUSE_STATS, get_reuse_index
+from storage.shared_cache import make_key, shared_tier
+from storage.story_store import normalize_topic, state_from_json, state_to_json
+from utils.config import (
+    BATCH_RETRY_BASE_DELAY,
+    BATCH_RETRY_MAX_DELAY,
+    REUSE_ENABLED,
+    REUSE_REVISE_THRESHOLD,
+    REUSE_THRESHOLD,
+)
+from utils.rate_limiter import classify_error
+from utils.scoring import passes_quality_gate
+from utils.telemetry import finish_trace, start_trace
 
 
 @lru_cache(maxsize=1)
 def _get_graph():
-    """Build and cache the compiled LangGraph instance."""
+    """Build and cache the compiled LangGraph instance (once per process)."""
+    # Imported here: langgraph and the node modules are the bulk of this module's import time.
+    from graph.graph import build_graph
+
     return build_graph()
 
 
-def generate_story(
+def graph_compiled() -> bool:
+    """Whether this process has compiled the graph yet (compiled objects are never shared across processes)."""
+    return _get_graph.cache_info().currsize > 0
+
+
+def warm_up() -> None:
+    """Compile the graph and import the provider SDK ahead of the first request."""
+    from utils.llm_factory import get_llm
+
+    _get_graph()
+    try:
+        get_llm()
+    except ValueError:
+        pass  # No API key yet; the first request reports it.
+
+
+def _initial_state(
     user_input: str,
     age: int,
-    tone: Optional[str] = None,
-    max_iterations: int = 3,
-    previous_state: Optional[StoryState] = None,
-    feedback_request: Optional[str] = None,
-) -> Tuple[StoryState, Optional[str]]:
-    """
-    Run the LangGraph workflow and return the final state and best-available story text.
-    """
+    tone: Optional[str],
+    max_iterations: int,
+    previous_state: Optional[StoryState],
+    feedback_request: Optional[str],
+    drafts: int = 1,
+) -> StoryState:
+    """Build the graph input, carrying the brief and story over for feedback revisions."""
     initial_state = StoryState(
         user_input=user_input,
         age=age,
         tone=tone,
         max_iterations=max_iterations,
+        drafts=drafts,
     )
 
     if previous_state:
@@ -44,10 +75,644 @@ def generate_story(
     if feedback_request:
         initial_state.feedback_request = feedback_request
 
-    graph = _get_graph()
-    result = graph.invoke(initial_state)
+    return initial_state
+
 
-    # LangGraph returns dicts by default; coerce back into StoryState for consistent access.
-    final_state = result if isinstance(result, StoryState) else StoryState(**result)
+def _final_result(result: Any, trace: Optional[Dict[str, Any]] = None) -> Tuple[StoryState, Optional[str]]:
+    # LangGraph returns the channel values as a dict; wrap them (by reference) for attribute access.
+    final_state = result if isinstance(result, StoryState) else StoryState.from_dict(result)
+    final_state.trace = trace
     final_story = final_state.final_story or final_state.story
     return final_state, final_story
+
+
+def _reuse_applies(reuse: Optional[bool], previous_state: Optional[StoryState], feedback_request: Optional[str]) -> bool:
+    # Feedback revisions already start from a story; only fresh requests can reuse one.
+    enabled = REUSE_ENABLED if reuse is None else reuse
+    return enabled and previous_state is None and not feedback_request
+
+
+def _reuse_lookup(user_input: str, age: int, tone: Optional[str]):
+    """Best indexed match at or above the revise threshold, else None."""
+    match = get_reuse_index().query(user_input, age, tone)
+    if match is None or match[0] < REUSE_REVISE_THRESHOLD:
+        return None
+    return match
+
+
+def _reuse_info(similarity: float, record: Dict[str, Any], mode: str) -> Dict[str, Any]:
+    return {"entry_id": record["id"], "matched_topic": record["key_text"], "similarity": round(similarity, 4), "mode": mode}
+
+
+def _serve_reused(
+    user_input: str, similarity: float, record: Dict[str, Any], started: float
+) -> Tuple[StoryState, Optional[str]]:
+    """Return a stored story as-is for a new request, with a fresh (LLM-free) trace."""
+    token = start_trace()
+    state = record["state"]
+    state.user_input = user_input
+    trace = finish_trace(token)
+    trace["reuse"] = _reuse_info(similarity, record, "exact")
+    state.trace = trace
+    REUSE_STATS.record_hit(time.perf_counter() - started, revised=False)
+    return state, record["story"]
+
+
+def _adapt_request(user_input: str) -> str:
+    return (
+        f'Adapt this story to a new request: "{user_input}". Keep what already fits, and change '
+        "names, details and events so it is clearly about the new request."
+    )
+
+
+def _after_reuse_run(user_input, age, tone, state, story, started, match) -> None:
+    """Record reuse stats and index the story if it passed."""
+    elapsed = time.perf_counter() - started
+    if match is not None:
+        state.trace["reuse"] = _reuse_info(match[0], match[1], "revised")
+        REUSE_STATS.record_hit(elapsed, revised=True)
+    else:
+        REUSE_STATS.record_miss(elapsed)
+    if story and passes_quality_gate(state.judge_result, state.safety_notes):
+        topics = [user_input]
+        if match is None:
+            # A revised match still carries the old brief, so only fresh briefs add their topic.
+            topics.append((state.refined_brief or {}).get("topic"))
+        get_reuse_index().add(topics, age, tone, story, state)
+
+
+def _shared_story_key(user_input: str, age: int, tone: Optional[str]) -> str:
+    return make_key("story", normalize_topic(user_input), int(age), (tone or "").strip().lower())
+
+
+def _shared_story(
+    user_input: str,
+    age: int,
+    tone: Optional[str],
+    previous_state: Optional[StoryState],
+    feedback_request: Optional[str],
+) -> Optional[Tuple[StoryState, Optional[str]]]:
+    """A passed story another server process wrote for the same fresh request (shared "stories" tier)."""
+    shared = shared_tier("stories")
+    if shared is None or previous_state is not None or feedback_request:
+        return None
+    data = shared.get("stories", _shared_story_key(user_input, age, tone))
+    if data is None:
+        return None
+    token = start_trace()
+    state = state_from_json(data)
+    trace = finish_trace(token)
+    trace["shared_cache"] = "stories"
+    state.trace = trace
+    return state, state.final_story or state.story
+
+
+def _pooled_story(user_input: str, age: int, tone: Optional[str]) -> Optional[Tuple[StoryState, Optional[str]]]:
+    """Take a ready story from the warm pool for a matching (age, tone, theme)."""
+    record = take_pooled_story(user_input, age, tone)
+    if record is None:
+        return None
+    token = start_trace()
+    state = record["state"]
+    state.user_input = user_input
+    trace = finish_trace(token)
+    trace["warm_pool"] = {
+        "theme": record["theme"],
+        "similarity": round(record["similarity"], 4),
+        "age_seconds": round(record["age_seconds"], 1),
+    }
+    state.trace = trace
+    return state, record["story"]
+
+
+def _ready_story(
+    user_input: str,
+    age: int,
+    tone: Optional[str],
+    previous_state: Optional[StoryState],
+    feedback_request: Optional[str],
+) -> Optional[Tuple[StoryState, Optional[str]]]:
+    """A story that needs no generation: from the warm pool, else the shared "stories" tier."""
+    if previous_state is not None or feedback_request:
+        return None
+    return _pooled_story(user_input, age, tone) or _shared_story(user_input, age, tone, None, None)
+
+
+def _share_story(
+    user_input: str,
+    age: int,
+    tone: Optional[str],
+    previous_state: Optional[StoryState],
+    feedback_request: Optional[str],
+    state: StoryState,
+    story: Optional[str],
+) -> None:
+    """Publish a passed story for a fresh request to the shared "stories" tier."""
+    shared = shared_tier("stories")
+    if shared is None or previous_state is not None or feedback_request or not story:
+        return
+    if passes_quality_gate(state.judge_result, state.safety_notes):
+        shared.set("stories", _shared_story_key(user_input, age, tone), state_to_json(state))
+
+
+def generate_story(
+    user_input: str,
+    age: int,
+    tone: Optional[str] = None,
+    max_iterations: int = 3,
+    previous_state: Optional[StoryState] = None,
+    feedback_request: Optional[str] = None,
+    drafts: int = 1,
+    reuse: Optional[bool] = None,
+    serve_ready: bool = True,
+) -> Tuple[StoryState, Optional[str]]:
+    """
+    Run the LangGraph workflow and return the final state and best-available story text.
+
+    The returned state carries a ``trace`` summary: per-node timings, per-LLM-call
+    token counts, retries and estimated cost.
+
+    With drafts > 1 the first round writes and judges that many drafts in parallel
+    and continues with the best-scoring one, which often passes without revisions.
+
+    With reuse (``STORY_REUSE=on`` or ``reuse=True``) a near-duplicate of a
+    previously passed story for the same age and tone is returned directly, or
+    revised from the match instead of starting over; ``trace["reuse"]`` says which.
+
+    With the shared cache on (``STORY_SHARED_CACHE``), a passed story for the
+    same fresh request from any server process is returned without running the
+    graph (``trace["shared_cache"]``), and passed stories are published there.
+
+    With the warm pool on (``STORY_WARM_POOL=on``), a fresh request whose age,
+    tone and topic match a pre-generated story takes it (``trace["warm_pool"]``).
+    ``serve_ready=False`` always runs the pipeline and skips both.
+    """
+    if serve_ready:
+        ready = _ready_story(user_input, age, tone, previous_state, feedback_request)
+        if ready is not None:
+            return ready
+    state, story = _run_story(
+        user_input, age, tone, max_iterations, previous_state, feedback_request, drafts, reuse
+    )
+    if serve_ready:
+        _share_story(user_input, age, tone, previous_state, feedback_request, state, story)
+    return state, story
+
+
+def _run_story(
+    user_input: str,
+    age: int,
+    tone: Optional[str],
+    max_iterations: int,
+    previous_state: Optional[StoryState],
+    feedback_request: Optional[str],
+    drafts: int,
+    reuse: Optional[bool],
+) -> Tuple[StoryState, Optional[str]]:
+    """generate_story without the shared story tier: near-duplicate reuse, then the graph."""
+    if _reuse_applies(reuse, previous_state, feedback_request):
+        started = time.perf_counter()
+        match = _reuse_lookup(user_input, age, tone)
+        if match is not None and match[0] >= REUSE_THRESHOLD:
+            return _serve_reused(user_input, match[0], match[1], started)
+        if match is not None:
+            state, story = _run_story(
+                user_input, age, tone, max_iterations,
+                match[1]["state"], _adapt_request(user_input), 1, reuse=False,
+            )
+        else:
+            state, story = _run_story(user_input, age, tone, max_iterations, None, None, drafts, reuse=False)
+        _after_reuse_run(user_input, age, tone, state, story, started, match)
+        return state, story
+
+    initial_state = _initial_state(user_input, age, tone, max_iterations, previous_state, feedback_request, drafts)
+    token = start_trace()
+    try:
+        result = _get_graph().invoke(initial_state)
+    finally:
+        trace = finish_trace(token)
+    return _final_result(result, trace)
+
+
+async def agenerate_story(
+    user_input: str,
+    age: int,
+    tone: Optional[str] = None,
+    max_iterations: int = 3,
+    previous_state: Optional[StoryState] = None,
+    feedback_request: Optional[str] = None,
+    drafts: int = 1,
+    reuse: Optional[bool] = None,
+    serve_ready: bool = True,
+) -> Tuple[StoryState, Optional[str]]:
+    """
+    Async variant of generate_story driving the compiled graph through ``ainvoke``.
+
+    LLM calls from all stories on the running event loop share the
+    ``STORY_MAX_CONCURRENT_LLM_CALLS`` limiter, so callers can gather hundreds of
+    these coroutines without flooding the provider.
+    """
+    if serve_ready:
+        ready = _ready_story(user_input, age, tone, previous_state, feedback_request)
+        if ready is not None:
+            return ready
+    state, story = await _arun_story(
+        user_input, age, tone, max_iterations, previous_state, feedback_request, drafts, reuse
+    )
+    if serve_ready:
+        _share_story(user_input, age, tone, previous_state, feedback_request, state, story)
+    return state, story
+
+
+async def _arun_story(
+    user_input: str,
+    age: int,
+    tone: Optional[str],
+    max_iterations: int,
+    previous_state: Optional[StoryState],
+    feedback_request: Optional[str],
+    drafts: int,
+    reuse: Optional[bool],
+) -> Tuple[StoryState, Optional[str]]:
+    """Async variant of _run_story."""
+    if _reuse_applies(reuse, previous_state, feedback_request):
+        started = time.perf_counter()
+        match = _reuse_lookup(user_input, age, tone)
+        if match is not None and match[0] >= REUSE_THRESHOLD:
+            return _serve_reused(user_input, match[0], match[1], started)
+        if match is not None:
+            state, story = await _arun_story(
+                user_input, age, tone, max_iterations,
+                match[1]["state"], _adapt_request(user_input), 1, reuse=False,
+            )
+        else:
+            state, story = await _arun_story(user_input, age, tone, max_iterations, None, None, drafts, reuse=False)
+        _after_reuse_run(user_input, age, tone, state, story, started, match)
+        return state, story
+
+    initial_state = _initial_state(user_input, age, tone, max_iterations, previous_state, feedback_request, drafts)
+    token = start_trace()
+    try:
+        result = await _get_graph().ainvoke(initial_state)
+    finally:
+        trace = finish_trace(token)
+    return _final_result(result, trace)
+
+
+def _graph_event(mode: str, chunk: Any) -> Iterator[Dict[str, Any]]:
+    """Translate one LangGraph stream chunk into story events."""
+    if mode == "custom":
+        yield chunk
+        return
+    if mode != "updates":
+        return
+    for node, update in chunk.items():
+        if not update:
+            continue
+        if node == "storyteller":
+            yield {"event": "draft", "story": update.get("story")}
+        elif node == "judge":
+            judge = update.get("judge_result") or {}
+            yield {
+                "event": "judge",
+                "iteration": update.get("iteration_count"),
+                "overall": judge.get("overall"),
+                "dimensions": judge.get("dimensions", []),
+            }
+        elif node == "pre_judge" and update.get("pre_judge_notes"):
+            judge = update.get("judge_result") or {}
+            yield {
+                "event": "pre_judge",
+                "iteration": update.get("iteration_count"),
+                "overall": judge.get("overall"),
+                "notes": update["pre_judge_notes"],
+            }
+            yield {"event": "safety", "notes": update.get("safety_notes")}
+        elif node == "safety_check":
+            yield {"event": "safety", "notes": update.get("safety_notes")}
+        elif node == "draft_candidate":
+            for candidate in update.get("candidates", []):
+                yield {
+                    "event": "candidate",
+                    "index": candidate["index"],
+                    "overall": (candidate["judge_result"] or {}).get("overall"),
+                }
+        elif node == "progress" and update.get("stop_reason"):
+            yield {"event": "stopped", "reason": update["stop_reason"]}
+        elif node == "select_best":
+            judge = update.get("judge_result") or {}
+            yield {"event": "draft", "story": update.get("story")}
+            yield {
+                "event": "judge",
+                "iteration": update.get("iteration_count"),
+                "overall": judge.get("overall"),
+                "dimensions": judge.get("dimensions", []),
+            }
+
+
+def _stream_reuse(
+    user_input: str,
+    age: int,
+    tone: Optional[str],
+    previous_state: Optional[StoryState],
+    feedback_request: Optional[str],
+    drafts: int,
+    reuse: Optional[bool],
+    started: float,
+) -> Tuple[Optional[Tuple[StoryState, Optional[str]]], Any, Tuple[Any, Any, int]]:
+    """
+    Near-duplicate reuse for the streaming entry points, mirroring _run_story.
+
+    Returns:
+        (exact hit as (state, story) or None, the match to revise from or None,
+        (previous_state, feedback_request, drafts) for the graph run)
+    """
+    run = (previous_state, feedback_request, drafts)
+    if not _reuse_applies(reuse, previous_state, feedback_request):
+        return None, None, run
+    match = _reuse_lookup(user_input, age, tone)
+    if match is None:
+        return None, None, run
+    if match[0] >= REUSE_THRESHOLD:
+        return _serve_reused(user_input, match[0], match[1], started), match, run
+    return None, match, (match[1]["state"], _adapt_request(user_input), 1)
+
+
+def stream_story(
+    user_input: str,
+    age: int,
+    tone: Optional[str] = None,
+    max_iterations: int = 3,
+    previous_state: Optional[StoryState] = None,
+    feedback_request: Optional[str] = None,
+    drafts: int = 1,
+    reuse: Optional[bool] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run the workflow and yield progress events as they happen.
+
+    Events (dicts keyed by ``event``):
+        draft_started / revision_started: storyteller began a draft (``iteration``)
+        token: a chunk of draft text (``text``)
+        draft: storyteller finished a draft (``story``)
+        pre_judge: the local gate rejected a draft without an LLM judge call (``notes``, ``iteration``)
+        judge: judge scores (``overall``, ``dimensions``, ``iteration``)
+        safety: local safety result (``notes``)
+        candidate: a parallel draft was judged (``index``, ``overall``; drafts > 1 only)
+        stopped: the revise loop ended (``reason``: passed, max_iterations, regressed, no_gain, ...)
+        final: run finished (``state``, ``story``; the best-scoring draft, not necessarily the last)
+
+    Near-duplicate reuse applies as in generate_story (``reuse``, default
+    ``STORY_REUSE``): a revised match streams like any run, and passed stories
+    are indexed. A story served from the warm pool, the shared cache or an exact
+    reuse match yields only its ``draft`` and ``final`` events.
+    """
+    cached = _ready_story(user_input, age, tone, previous_state, feedback_request)
+    if cached is None:
+        started = time.perf_counter()
+        cached, match, run = _stream_reuse(user_input, age, tone, previous_state, feedback_request, drafts, reuse, started)
+    if cached is not None:
+        yield {"event": "draft", "story": cached[1]}
+        yield {"event": "final", "state": cached[0], "story": cached[1]}
+        return
+    initial_state = _initial_state(user_input, age, tone, max_iterations, *run)
+    values = None
+    token = start_trace()
+    try:
+        for mode, chunk in _get_graph().stream(initial_state, stream_mode=["custom", "updates", "values"]):
+            if mode == "values":
+                values = chunk
+                continue
+            yield from _graph_event(mode, chunk)
+    finally:
+        trace = finish_trace(token)
+    final_state, final_story = _final_result(values, trace)
+    if _reuse_applies(reuse, previous_state, feedback_request):
+        _after_reuse_run(user_input, age, tone, final_state, final_story, started, match)
+    _share_story(user_input, age, tone, previous_state, feedback_request, final_state, final_story)
+    yield {"event": "final", "state": final_state, "story": final_story}
+
+
+async def astream_story(
+    user_input: str,
+    age: int,
+    tone: Optional[str] = None,
+    max_iterations: int = 3,
+    previous_state: Optional[StoryState] = None,
+    feedback_request: Optional[str] = None,
+    drafts: int = 1,
+    reuse: Optional[bool] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async variant of stream_story driving the graph through ``astream``.
+    """
+    cached = _ready_story(user_input, age, tone, previous_state, feedback_request)
+    if cached is None:
+        started = time.perf_counter()
+        cached, match, run = _stream_reuse(user_input, age, tone, previous_state, feedback_request, drafts, reuse, started)
+    if cached is not None:
+        yield {"event": "draft", "story": cached[1]}
+        yield {"event": "final", "state": cached[0], "story": cached[1]}
+        return
+    initial_state = _initial_state(user_input, age, tone, max_iterations, *run)
+    values = None
+    token = start_trace()
+    try:
+        async for mode, chunk in _get_graph().astream(initial_state, stream_mode=["custom", "updates", "values"]):
+            if mode == "values":
+                values = chunk
+                continue
+            for event in _graph_event(mode, chunk):
+                yield event
+    finally:
+        trace = finish_trace(token)
+    final_state, final_story = _final_result(values, trace)
+    if _reuse_applies(reuse, previous_state, feedback_request):
+        _after_reuse_run(user_input, age, tone, final_state, final_story, started, match)
+    _share_story(user_input, age, tone, previous_state, feedback_request, final_state, final_story)
+    yield {"event": "final", "state": final_state, "story": final_story}
+
+
+def _request_id(request: Any, index: int) -> str:
+    if not isinstance(request, dict):
+        return str(index)
+    return str(request.get("id") or request.get("request_id") or index)
+
+
+class _NoStoryError(RuntimeError):
+    """The graph finished without a story; worth another attempt."""
+
+
+def _batch_fields(request: Any, max_iterations: int) -> Dict[str, Any]:
+    """
+    Check a batch request before generating it; bad input is never retried.
+
+    Args:
+        request: Request dict (may carry an ``error`` from the reader, e.g. a bad JSONL line)
+        max_iterations: Default revise-loop limit
+
+    Returns:
+        Keyword arguments for agenerate_story
+
+    Raises:
+        ValueError: When the request is malformed
+    """
+    if not isinstance(request, dict):
+        raise ValueError(f"Request must be a JSON object, got {type(request).__name__}")
+    if request.get("error"):
+        raise ValueError(str(request["error"]))
+    user_input = request.get("user_input")
+    if not isinstance(user_input, str) or not user_input.strip():
+        raise ValueError("user_input must be a non-empty string")
+    tone = request.get("tone")
+    if tone is not None and not isinstance(tone, str):
+        raise ValueError("tone must be a string")
+    fields: Dict[str, Any] = {"user_input": user_input, "tone": tone}
+    for name, default in (("age", 7), ("max_iterations", max_iterations), ("drafts", 1)):
+        value = request.get(name, default)
+        try:
+            if isinstance(value, bool):
+                raise TypeError
+            fields[name] = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be an integer, got {value!r}") from None
+    return fields
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Whether a failed batch attempt is worth retrying (provider overload, timeouts, empty output)."""
+    if isinstance(exc, (_NoStoryError, TimeoutError, ConnectionError)):
+        return True
+    return classify_error(exc)[0]
+
+
+async def _generate_one(index: int, request: Any, retries: int, max_iterations: int) -> Dict[str, Any]:
+    """Generate a single batch item, retrying transient failures with jittered backoff and never raising."""
+    fields = request if isinstance(request, dict) else {}
+    record: Dict[str, Any] = {
+        "id": _request_id(request, index),
+        "user_input": str(fields.get("user_input") or ""),
+        "age": fields.get("age", 7),
+        "tone": fields.get("tone"),
+    }
+    started = time.monotonic()
+    try:
+        kwargs = _batch_fields(request, max_iterations)
+    except ValueError as exc:
+        record.update(status="error", error=f"{type(exc).__name__}: {exc}", attempts=0)
+        record["elapsed_seconds"] = 0.0
+        return record
+    for attempt in range(1, retries + 2):
+        try:
+            # A catalog run generates fresh stories: it must not drain the user-facing
+            # warm pool or copy stories out of the shared "stories" tier.
+            final_state, final_story = await agenerate_story(**kwargs, serve_ready=False)
+            if not final_story:
+                raise _NoStoryError("No story was generated")
+        except Exception as exc:
+            record.update(status="error", error=f"{type(exc).__name__}: {exc}", attempts=attempt)
+            if attempt > retries or not _is_transient(exc):
+                break
+            delay = min(BATCH_RETRY_MAX_DELAY, BATCH_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            continue
+        judge = final_state.judge_result or {}
+        record.update(
+            status="ok",
+            error=None,
+            attempts=attempt,
+            story=final_story,
+            iterations=final_state.iteration_count,
+            stop_reason=final_state.stop_reason,
+            overall=judge.get("overall"),
+            safety_notes=final_state.safety_notes,
+        )
+        break
+    record["elapsed_seconds"] = round(time.monotonic() - started, 3)
+    return record
+
+
+async def agenerate_stories(
+    requests: Iterable[Dict[str, Any]],
+    concurrency: int = 8,
+    retries: int = 2,
+    max_iterations: int = 3,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Generate many stories with bounded parallelism, yielding results as they finish.
+
+    Each request is a dict with ``user_input``, optional ``age``/``tone`` and an
+    optional ``id`` (defaults to its position). Failures are isolated per item: a
+    malformed request is yielded with ``status="error"`` without any attempt, and
+    an item whose transient failures outlast ``retries`` retries is yielded likewise.
+    Items always run the pipeline (``serve_ready=False``): the warm pool and the
+    shared "stories" tier are neither read nor written.
+
+    Args:
+        requests: Iterable of request dicts (consumed lazily)
+        concurrency: Number of stories generated at once
+        retries: Extra attempts per failing item
+        max_iterations: Default revise-loop limit per story
+
+    Yields:
+        Result dicts in completion order
+    """
+    pending = iter(enumerate(requests))
+    results: asyncio.Queue = asyncio.Queue(maxsize=max(1, concurrency) * 2)
+    done = object()
+
+    async def worker() -> None:
+        # The shared iterator is only advanced between awaits, so workers never race on it.
+        for index, request in pending:
+            await results.put(await _generate_one(index, request, retries, max_iterations))
+
+    async def run_workers() -> None:
+        workers = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency))]
+        cancelled = False
+        try:
+            await asyncio.gather(*workers)
+        except asyncio.CancelledError:
+            cancelled = True  # The consumer stopped reading; nobody is waiting for ``done``.
+            raise
+        finally:
+            # A failing worker (e.g. the request iterable raised) stops the others too.
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if not cancelled:
+                await results.put(done)
+
+    runner = asyncio.ensure_future(run_workers())
+    try:
+        while True:
+            item = await results.get()
+            if item is done:
+                break
+            yield item
+        await runner
+    finally:
+        runner.cancel()
+        with suppress(asyncio.CancelledError):
+            await runner
+
+
+def generate_stories(
+    requests: Iterable[Dict[str, Any]],
+    concurrency: int = 8,
+    retries: int = 2,
+    max_iterations: int = 3,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Sync wrapper around agenerate_stories; yields result dicts as stories finish.
+    """
+    loop = asyncio.new_event_loop()
+    stream = agenerate_stories(requests, concurrency=concurrency, retries=retries, max_iterations=max_iterations)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(stream.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(stream.aclose())
+        loop.close()
@@ -1,15 +1,14 @@
 import html
+import threading
+import time
+import uuid
 import streamlit as st
 
-from story_engine import generate_story
+from jobs.job_manager import DONE, FAILED, QUEUED, QueueFullError, get_job_manager
+from storage.story_store import get_story_store
+from utils.config import JOB_POLL_SECONDS, PRESET_TONES, STORY_HISTORY_PAGE_SIZE
 
 DEFAULT_MAX_ITERATIONS = 3
-PRESET_TONES = [
-    "Warm bedtime",
-    "Playful",
-    "Gentle humor",
-    "Calm & cozy",
-]
 CUSTOM_TONE_OPTION = "Custom"
 TWEAK_HINTS = {
     "Cozy bedtime vibe": "Layer in extra bedtime imagery—warm blankets, hushed voices, sleepy yawns.",
@@ -284,14 +283,18 @@ input[type="radio"]:focus-visible {
 </style>
 """
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
-if "story_history" not in st.session_state:
-    st.session_state.story_history = []
+if "session_id" not in st.session_state:
+    # The session id lives in the URL so a refresh reopens the same persisted history.
+    st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
 if "user_settings" not in st.session_state:
     st.session_state.user_settings = {}
-if "active_version_idx" not in st.session_state:
-    st.session_state.active_version_idx = -1
-if "is_loading" not in st.session_state:
-    st.session_state.is_loading = False
+if "active_story_id" not in st.session_state:
+    st.session_state.active_story_id = None
+if "history_page" not in st.session_state:
+    st.session_state.history_page = 0
+if "pending_job" not in st.session_state:
+    st.session_state.pending_job = None
 if "feedback_choice" not in st.session_state:
     st.session_state.feedback_choice = None
 if "custom_feedback_note" not in st.session_state:
@@ -302,6 +305,34 @@ if "story_status_message" not in st.session_state:
     st.session_state.story_status_message = ""
 
 
+@st.cache_resource(show_spinner=False)
+def warm_engine():
+    """Compile the story graph once per server process, shared by every session.
+
+    Runs in a background thread so the first page renders without waiting on the
+    langgraph and provider SDK imports.
+    """
+    from story_engine import warm_up
+
+    thread = threading.Thread(target=warm_up, name="story-engine-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+warm_engine()
+
+
+@st.cache_resource(show_spinner=False)
+def warm_pool_refiller():
+    """Start the warm-pool refiller once per server process (no-op unless STORY_WARM_POOL=on)."""
+    from jobs.warm_pool import start_warm_pool_refiller
+
+    return start_warm_pool_refiller()
+
+
+warm_pool_refiller()
+
+
 def format_story_html(text: str) -> str:
     escaped = html.escape(text)
     paragraphs = escaped.split("\n\n")
@@ -322,7 +353,100 @@ def render_skeleton():
     )
 
 
-def run_generation(trigger: str, feedback_request: str = "", previous_state=None):
+def render_live_preview(preview, status: str, text: str):
+    preview.markdown(
+        f"<div class='story-status'>{html.escape(status)}</div>"
+        f'<div class="story-reader">{format_story_html(text)}</div>',
+        unsafe_allow_html=True,
+    )
+
+
+def poll_pending_job():
+    """Check this session's background job; save the story when it finishes.
+
+    Returns the job record while it is still queued or running, otherwise None.
+    """
+    pending = st.session_state.pending_job
+    manager = get_job_manager()
+    job = manager.status(pending["job_id"])
+    if job is None:
+        st.session_state.pending_job = None
+        st.error("The story job was lost. Please try again.")
+        return None
+    if job["status"] == DONE:
+        st.session_state.pending_job = None
+        finish_generation(pending, job["state"], job["story"])
+    elif job["status"] == FAILED:
+        st.session_state.pending_job = None
+        st.error(f"Story generation failed: {job['error']}")
+    else:
+        return job
+    # The result now lives in the story store (or was shown); the job record can go.
+    manager.forget(pending["job_id"])
+    return None
+
+
+def render_job_preview(job):
+    """Live preview of a running job's partial draft (a skeleton until text arrives)."""
+    status = job["message"] or "Writing your story…"
+    if job["status"] == QUEUED and job.get("queue_position"):
+        status = f"Waiting for a free storyteller ({job['queue_position']} in line)…"
+    if job["partial"]:
+        render_live_preview(st, status, job["partial"])
+    else:
+        st.markdown(f"<div class='story-status'>{html.escape(status)}</div>", unsafe_allow_html=True)
+        render_skeleton()
+
+
+def load_active_entry():
+    """Load the story being viewed from the store (the session's newest one by default)."""
+    store = get_story_store()
+    story_id = st.session_state.active_story_id
+    if story_id is None:
+        latest = store.list_versions(st.session_state.session_id, limit=1)
+        if not latest:
+            return None
+        story_id = st.session_state.active_story_id = latest[0]["id"]
+    entry = store.get(story_id)
+    if entry is None or entry["session_id"] != st.session_state.session_id:
+        st.session_state.active_story_id = None
+        return None
+    return entry
+
+
+def render_history(active_id):
+    """Paginated list of this session's saved versions; older pages load on demand."""
+    store = get_story_store()
+    session_id = st.session_state.session_id
+    total = store.count_versions(session_id)
+    if total <= 1:
+        return
+    pages = (total + STORY_HISTORY_PAGE_SIZE - 1) // STORY_HISTORY_PAGE_SIZE
+    page = min(st.session_state.history_page, pages - 1)
+    with st.expander(f"Version history ({total})"):
+        for row in store.list_versions(session_id, limit=STORY_HISTORY_PAGE_SIZE, offset=page * STORY_HISTORY_PAGE_SIZE):
+            label_cols = st.columns([0.75, 0.25])
+            score = f" · {row['overall']}/10" if row["overall"] is not None else ""
+            label_cols[0].markdown(
+                f"**v{row['version']}** · {html.escape(row['topic'])} · age {row['age']} · "
+                f"{row['trigger'].replace('_', ' ')}{score}"
+            )
+            if label_cols[1].button("Viewing" if row["id"] == active_id else "Open",
+                                    key=f"open_version_{row['id']}", disabled=row["id"] == active_id):
+                st.session_state.active_story_id = row["id"]
+                st.rerun()
+        if pages > 1:
+            nav = st.columns([0.3, 0.4, 0.3])
+            if nav[0].button("Newer", disabled=page == 0, key="history_newer"):
+                st.session_state.history_page = page - 1
+                st.rerun()
+            nav[1].caption(f"Page {page + 1} of {pages}")
+            if nav[2].button("Older", disabled=page >= pages - 1, key="history_older"):
+                st.session_state.history_page = page + 1
+                st.rerun()
+
+
+def run_generation(trigger: str, feedback_request: str = "", previous_state=None, parent_id=None):
     saved = st.session_state.user_settings
     idea = st.session_state.get("idea_input", "").strip()
     tone_choice = st.session_state.get("tone_choice", PRESET_TONES[0])
@@ -346,42 +470,53 @@ def run_generation(trigger: str, feedback_request: str = "", previous_state=None
         st.warning("Please provide a custom tone or pick one of the presets.")
         return
 
-    st.session_state.is_loading = True
+    request = {
+        "user_input": idea,
+        "age": age_value,
+        "tone": tone_value,
+        "max_iterations": DEFAULT_MAX_ITERATIONS,
+        "previous_state": previous_state if trigger != "generate" else None,
+        "feedback_request": feedback_request or None,
+    }
     try:
-        with st.spinner("Generating bedtime story…"):
-            state, story_text = generate_story(
-                user_input=idea,
-                age=age_value,
-                tone=tone_value,
-                max_iterations=DEFAULT_MAX_ITERATIONS,
-                previous_state=previous_state if trigger != "generate" else None,
-                feedback_request=feedback_request or None,
-            )
-    except Exception as exc:
-        st.session_state.is_loading = False
-        st.exception(exc)
+        job_id = get_job_manager().submit(**request)
+    except QueueFullError:
+        st.warning("The storytellers are busy right now. Please try again in a minute.")
         return
-    st.session_state.is_loading = False
+    st.session_state.pending_job = {
+        "job_id": job_id,
+        "trigger": trigger,
+        "parent_id": parent_id if trigger != "generate" else None,
+        "idea": idea,
+        "age": age_value,
+        "tone": tone_value,
+    }
+
 
+def finish_generation(pending, state, story_text):
+    """Persist a finished job's story and make it the active version."""
     if not story_text:
         st.error("No story was generated. Please try again.")
         return
 
-    entry = {
-        "version": len(st.session_state.story_history) + 1,
-        "story": story_text,
-        "state": state,
-        "tone": tone_value,
-        "age": age_value,
-        "trigger": trigger,
-    }
-    st.session_state.story_history.append(entry)
+    idea, age_value, tone_value, trigger = pending["idea"], pending["age"], pending["tone"], pending["trigger"]
+    story_id = get_story_store().save_version(
+        session_id=st.session_state.session_id,
+        topic=idea,
+        age=age_value,
+        tone=tone_value,
+        story=story_text,
+        state=state,
+        trigger=trigger,
+        parent_id=pending["parent_id"],
+    )
     st.session_state.user_settings = {
         "idea": idea,
         "age": age_value,
         "tone": tone_value,
     }
-    st.session_state.active_version_idx = len(st.session_state.story_history) - 1
+    st.session_state.active_story_id = story_id
+    st.session_state.history_page = 0
     if trigger == "generate":
         st.session_state.story_status_message = "New story ready."
     elif trigger == "user_feedback":
@@ -423,38 +558,37 @@ with setup_col:
             key="custom_tone_value",
         )
     st.caption("Stories are ~300 words and safe for ages 5–10. Takes ~3–5 seconds.")
-    button_label = "Generating…" if st.session_state.is_loading else "Generate Story"
+    is_loading = st.session_state.pending_job is not None
+    button_label = "Generating…" if is_loading else "Generate Story"
     st.markdown('<div class="primary-btn">', unsafe_allow_html=True)
     generate_clicked = st.button(
         button_label,
         use_container_width=True,
-        disabled=st.session_state.is_loading,
+        disabled=is_loading,
     )
     st.markdown("</div>", unsafe_allow_html=True)
     if generate_clicked:
         run_generation("generate")
+        is_loading = st.session_state.pending_job is not None
     st.markdown("</div>", unsafe_allow_html=True)
 
 with story_col:
     st.markdown('<div class="card">', unsafe_allow_html=True)
-    history = st.session_state.story_history
-    if st.session_state.is_loading and not history:
-        render_skeleton()
-    elif not history:
+    job = poll_pending_job() if is_loading else None
+    is_loading = job is not None
+    entry = load_active_entry()
+    if is_loading and not entry:
+        render_job_preview(job)
+    elif not entry:
         st.markdown(
             '<div class="placeholder-card">Describe a seed idea and generate to see your story here.</div>',
             unsafe_allow_html=True,
         )
     else:
-        active_idx = st.session_state.active_version_idx
-        if active_idx < 0 or active_idx >= len(history):
-            active_idx = len(history) - 1
-            st.session_state.active_version_idx = active_idx
-        entry = history[active_idx]
         judge = entry["state"].judge_result or {}
 
-        if st.session_state.is_loading:
-            render_skeleton()
+        if is_loading:
+            render_job_preview(job)
         else:
             story_html = format_story_html(entry["story"])
             st.markdown('<div class="story-header">', unsafe_allow_html=True)
@@ -538,7 +672,7 @@ with story_col:
                 "Apply feedback",
                 disabled=(
                     not selected_feedback
-                    or st.session_state.is_loading
+                    or is_loading
                 ),
                 key="apply_feedback_btn",
             )
@@ -548,7 +682,15 @@ with story_col:
                     "user_feedback",
                     instruction,
                     previous_state=entry["state"],
+                    parent_id=entry["id"],
                 )
                 st.session_state.feedback_reset_pending = True
 
+            render_history(entry["id"])
+
     st.markdown("</div>", unsafe_allow_html=True)
+
+if st.session_state.pending_job is not None:
+    # Poll the background job instead of blocking this script run on the graph.
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
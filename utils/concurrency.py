@@ -0,0 +1,74 @@
+"""
+Global concurrency limiter for async LLM calls.
+Caps how many provider requests one event loop keeps in flight, so hundreds of
+stories can run concurrently without flooding the provider.
+"""
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from utils.config import MAX_CONCURRENT_LLM_CALLS
+
+# asyncio primitives are bound to their event loop, so each loop gets its own semaphore.
+_lock = threading.Lock()
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_in_flight = 0
+_waiting = 0
+_peak_in_flight = 0
+
+
+def _loop_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        semaphore = _semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+            _semaphores[loop] = semaphore
+        return semaphore
+
+
+@asynccontextmanager
+async def llm_slot() -> AsyncIterator[None]:
+    """
+    Hold one of the ``MAX_CONCURRENT_LLM_CALLS`` provider slots for the current loop.
+
+    Usage:
+        async with llm_slot():
+            response = await llm.ainvoke(messages)
+    """
+    global _in_flight, _waiting, _peak_in_flight
+    semaphore = _loop_semaphore()
+    with _lock:
+        _waiting += 1
+    try:
+        await semaphore.acquire()
+    finally:
+        with _lock:
+            _waiting -= 1
+    with _lock:
+        _in_flight += 1
+        _peak_in_flight = max(_peak_in_flight, _in_flight)
+    try:
+        yield
+    finally:
+        with _lock:
+            _in_flight -= 1
+        semaphore.release()
+
+
+def get_concurrency_stats() -> Dict[str, int]:
+    """
+    Report in-flight and queued async LLM calls across all event loops.
+
+    Returns:
+        Dictionary with limit, in_flight, waiting and peak_in_flight counts
+    """
+    with _lock:
+        return {
+            "limit": MAX_CONCURRENT_LLM_CALLS,
+            "in_flight": _in_flight,
+            "waiting": _waiting,
+            "peak_in_flight": _peak_in_flight,
+        }
@@ -14,11 +14,175 @@ DEFAULT_GEMINI_MODEL = "gemini-1.5-flash-latest"
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", DEFAULT_GEMINI_MODEL)
 
 # Provider selection
-# STORY_LLM_PROVIDER can be: "openai", "gemini", or "auto" (defaults to "auto").
+# STORY_LLM_PROVIDER can be: "openai", "gemini", "fake" (offline, for benchmarks)
+# or "auto" (defaults to "auto").
 # We default to OpenAI because the assignment requires gpt-3.5 unless the user
 # explicitly opts into Gemini.
 LLM_PROVIDER = os.getenv("STORY_LLM_PROVIDER", "auto").strip().lower()
 
+# Offline fake provider (STORY_LLM_PROVIDER=fake); deterministic for a given seed.
+FAKE_LLM_LATENCY = float(os.getenv("STORY_FAKE_LLM_LATENCY", "0.05"))  # Seconds before the first token
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("STORY_FAKE_LLM_TOKENS_PER_SECOND", "0"))  # 0 = no per-token delay
+FAKE_LLM_FAILURE_RATE = float(os.getenv("STORY_FAKE_LLM_FAILURE_RATE", "0"))  # Fraction of calls that raise
+FAKE_LLM_SEED = int(os.getenv("STORY_FAKE_LLM_SEED", "0"))
+FAKE_LLM_RESPONSES = os.getenv("STORY_FAKE_LLM_RESPONSES", "")  # Optional JSON file with canned "refiner"/"judge" output
+
+# Structured output: the refiner and judge request provider JSON mode (OpenAI
+# response_format=json_object, Gemini response_mime_type=application/json) and
+# validate against utils/schemas.py. Set STORY_STRUCTURED_OUTPUT=off to disable.
+STRUCTURED_OUTPUT = os.getenv("STORY_STRUCTURED_OUTPUT", "on").strip().lower() not in {"off", "0", "false", "no"}
+
+# Client pooling
+# Chat-model instances are reused across nodes, threads and requests; they share
+# keep-alive HTTP connection pools sized by these settings.
+LLM_POOL_MAX_CLIENTS = int(os.getenv("STORY_LLM_POOL_MAX_CLIENTS", "32"))  # Distinct model/temperature combos kept
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("STORY_LLM_POOL_MAX_CONNECTIONS", "100"))  # Open HTTP connections per pool
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("STORY_LLM_POOL_MAX_KEEPALIVE", "20"))  # Idle connections kept warm
+LLM_POOL_IDLE_SECONDS = float(os.getenv("STORY_LLM_POOL_IDLE_SECONDS", "300"))  # Evict clients/connections idle this long
+
+# Async concurrency
+# Maximum provider calls one event loop keeps in flight (shared by all stories on that loop).
+MAX_CONCURRENT_LLM_CALLS = int(os.getenv("STORY_MAX_CONCURRENT_LLM_CALLS", "64"))
+
+# Client-side rate limiting, shared by every call to the same model (0 = unlimited).
+# Set these to your account's provider limits; a 429 temporarily lowers them.
+LLM_RATE_LIMIT_RPM = float(os.getenv("STORY_LLM_RATE_LIMIT_RPM", "3500"))
+LLM_RATE_LIMIT_TPM = float(os.getenv("STORY_LLM_RATE_LIMIT_TPM", "160000"))
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("STORY_LLM_COMPLETION_TOKEN_ESTIMATE", "600"))  # Reserved per call until usage is known
+# Retries for rate-limit, overload and connection errors (jittered exponential backoff).
+LLM_MAX_RETRIES = int(os.getenv("STORY_LLM_MAX_RETRIES", "5"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("STORY_LLM_RETRY_BASE_DELAY", "1.0"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("STORY_LLM_RETRY_MAX_DELAY", "60.0"))
+# The provider SDKs' own retries are turned down so they do not stack with ours.
+LLM_CLIENT_MAX_RETRIES = int(os.getenv("STORY_LLM_CLIENT_MAX_RETRIES", "0"))
+
+# Provider routing, used in auto mode when more than one provider has an API key.
+# "failover" (default) moves a failed call to the next provider and otherwise keeps
+# OpenAI primary; "hedge" (opt-in) also re-sends the short structured calls to the
+# next provider when the first has not answered in time, and lets a clearly faster
+# provider become primary.
+LLM_ROUTING = os.getenv("STORY_LLM_ROUTING", "failover").strip().lower()  # off | failover | hedge
+LLM_HEDGE_NODES = tuple(
+    node.strip() for node in os.getenv("STORY_LLM_HEDGE_NODES", "prompt_refiner,judge").split(",") if node.strip()
+)
+# Hedge delay: the primary's p95 latency for that node, clamped to these bounds
+# (the maximum is used until enough latencies have been seen).
+LLM_HEDGE_MIN_DELAY = float(os.getenv("STORY_LLM_HEDGE_MIN_DELAY", "1.0"))
+LLM_HEDGE_MAX_DELAY = float(os.getenv("STORY_LLM_HEDGE_MAX_DELAY", "4.0"))
+# A provider that fails this many calls in a row is skipped for the cooldown.
+LLM_ROUTE_FAILURE_THRESHOLD = int(os.getenv("STORY_LLM_ROUTE_FAILURE_THRESHOLD", "3"))
+LLM_ROUTE_COOLDOWN = float(os.getenv("STORY_LLM_ROUTE_COOLDOWN", "30"))
+
+# Batch generation retry backoff (seconds); delays are jittered by ±50%.
+BATCH_RETRY_BASE_DELAY = float(os.getenv("STORY_BATCH_RETRY_BASE_DELAY", "2.0"))
+BATCH_RETRY_MAX_DELAY = float(os.getenv("STORY_BATCH_RETRY_MAX_DELAY", "30.0"))
+
+# LLM response cache
+# STORY_LLM_CACHE can be: "memory" (LRU with TTL), "sqlite" (on-disk) or "off".
+LLM_CACHE_BACKEND = os.getenv("STORY_LLM_CACHE", "memory").strip().lower()
+LLM_CACHE_PATH = os.getenv("STORY_LLM_CACHE_PATH", os.path.join(".story_cache", "llm_cache.sqlite"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("STORY_LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("STORY_LLM_CACHE_MAX_ENTRIES", "1024"))
+# Nodes that opt into caching. The refiner and the low-temperature judge are
+# deterministic enough to reuse; the creative storyteller is left out by default.
+LLM_CACHE_NODES = {
+    node.strip() for node in os.getenv("STORY_LLM_CACHE_NODES", "prompt_refiner,judge").split(",") if node.strip()
+}
+
+# Judge calibration examples: "full" sends every few-shot example; "age_band"
+# sends only those matching the brief's age band (shorter prompt, one stable
+# cached prefix per band).
+JUDGE_CALIBRATION = os.getenv("STORY_JUDGE_CALIBRATION", "full").strip().lower()
+JUDGE_AGE_BANDS = ((5, 6), (7, 8), (9, 10))
+
+# Story store: every generated version, its brief, judge result and lineage.
+STORY_STORE_BACKEND = os.getenv("STORY_STORE_BACKEND", "sqlite").strip().lower()
+STORY_STORE_PATH = os.getenv("STORY_STORE_PATH", os.path.join(".story_cache", "stories.sqlite"))
+STORY_HISTORY_PAGE_SIZE = int(os.getenv("STORY_HISTORY_PAGE_SIZE", "5"))  # Versions per Streamlit history page
+
+# Near-duplicate reuse (opt-in): previously passed stories for a similar topic,
+# age and tone are returned as-is above REUSE_THRESHOLD, or revised from the match
+# (skipping the refiner and first draft) above REUSE_REVISE_THRESHOLD.
+REUSE_ENABLED = os.getenv("STORY_REUSE", "off").strip().lower() in {"on", "1", "true", "yes"}
+REUSE_THRESHOLD = float(os.getenv("STORY_REUSE_THRESHOLD", "0.9"))
+REUSE_REVISE_THRESHOLD = float(os.getenv("STORY_REUSE_REVISE_THRESHOLD", "0.75"))
+REUSE_INDEX_PATH = os.getenv("STORY_REUSE_INDEX_PATH", os.path.join(".story_cache", "reuse_index.sqlite"))
+REUSE_LSH_BANDS = int(os.getenv("STORY_REUSE_LSH_BANDS", "4"))
+REUSE_LSH_BITS = int(os.getenv("STORY_REUSE_LSH_BITS", "8"))
+REUSE_TTL_SECONDS = float(os.getenv("STORY_REUSE_TTL_SECONDS", str(30 * 86400)))
+REUSE_MAX_ENTRIES = int(os.getenv("STORY_REUSE_MAX_ENTRIES", "20000"))
+
+# Precomputed briefs (storage/brief_index.py, built by `python main.py build-briefs`):
+# the refiner fills the brief locally when the request's topic keywords match an
+# indexed theme for the same age band and tone at or above BRIEF_INDEX_THRESHOLD,
+# and only calls the LLM for novel topics. Unused until the index file exists.
+BRIEF_INDEX_ENABLED = os.getenv("STORY_BRIEF_INDEX", "on").strip().lower() not in {"off", "0", "false", "no"}
+BRIEF_INDEX_PATH = os.getenv("STORY_BRIEF_INDEX_PATH", os.path.join(".story_cache", "brief_index.sqlite"))
+BRIEF_INDEX_THRESHOLD = float(os.getenv("STORY_BRIEF_INDEX_THRESHOLD", "0.92"))
+
+# Shared cache tier (storage/shared_cache.py) for several server processes on one
+# host: "sqlite" (one WAL-mode file) or "file" (a directory of JSON entries); "off"
+# keeps every cache per process. Tiers: llm (provider responses, replacing the
+# STORY_LLM_CACHE backend), briefs (refined briefs) and stories (passed stories
+# for repeated fresh requests).
+SHARED_CACHE_BACKEND = os.getenv("STORY_SHARED_CACHE", "off").strip().lower()
+SHARED_CACHE_PATH = os.getenv(
+    "STORY_SHARED_CACHE_PATH",
+    os.path.join(".story_cache", "shared_cache" if SHARED_CACHE_BACKEND == "file" else "shared_cache.sqlite"),
+)
+SHARED_CACHE_TIERS = {
+    tier.strip() for tier in os.getenv("STORY_SHARED_CACHE_TIERS", "llm,briefs,stories").split(",") if tier.strip()
+}
+SHARED_CACHE_TTL_SECONDS = float(os.getenv("STORY_SHARED_CACHE_TTL_SECONDS", "86400"))
+SHARED_CACHE_MAX_ENTRIES = int(os.getenv("STORY_SHARED_CACHE_MAX_ENTRIES", "10000"))  # Per tier, least recently used evicted
+
+# Background generation jobs (jobs/job_manager.py)
+# STORY_JOB_BACKEND can be: "memory" (in-process) or "sqlite" (shared by processes on one host).
+JOB_BACKEND = os.getenv("STORY_JOB_BACKEND", "memory").strip().lower()
+JOB_DB_PATH = os.getenv("STORY_JOB_DB_PATH", os.path.join(".story_cache", "jobs.sqlite"))
+JOB_WORKERS = int(os.getenv("STORY_JOB_WORKERS", "4"))  # Stories generated concurrently
+JOB_MAX_QUEUE_DEPTH = int(os.getenv("STORY_JOB_MAX_QUEUE", "32"))  # Waiting jobs before submissions are rejected
+JOB_PROGRESS_INTERVAL = float(os.getenv("STORY_JOB_PROGRESS_INTERVAL", "0.5"))  # Seconds between partial-text writes
+JOB_RETENTION_SECONDS = float(os.getenv("STORY_JOB_RETENTION_SECONDS", "600"))  # Finished jobs kept this long if never collected
+JOB_LEASE_SECONDS = float(os.getenv("STORY_JOB_LEASE_SECONDS", "120"))  # Running jobs without a worker heartbeat this long fail
+JOB_POLL_SECONDS = float(os.getenv("STORY_JOB_POLL_SECONDS", "1.0"))  # Streamlit polling interval
+
+# Tone presets offered by the Streamlit app; the warm pool keeps a bucket for each.
+PRESET_TONES = [
+    "Warm bedtime",
+    "Playful",
+    "Gentle humor",
+    "Calm & cozy",
+]
+
+# Warm pool (jobs/warm_pool.py, opt-in): for ages 5-10 and each PRESET_TONES tone,
+# keep a passed story ready for each of the WARM_POOL_SIZE most popular themes
+# (first lines of WARM_POOL_THEMES_PATH). A background refiller generates missing
+# stories while the job queue is idle, within a rolling 24-hour budget; a fresh
+# request matching a ready story's theme (WARM_POOL_THRESHOLD) takes it instantly.
+WARM_POOL_ENABLED = os.getenv("STORY_WARM_POOL", "off").strip().lower() in {"on", "1", "true", "yes"}
+WARM_POOL_PATH = os.getenv("STORY_WARM_POOL_PATH", os.path.join(".story_cache", "warm_pool.sqlite"))
+WARM_POOL_THEMES_PATH = os.getenv("STORY_WARM_POOL_THEMES", "brief_themes.txt")
+WARM_POOL_SIZE = int(os.getenv("STORY_WARM_POOL_SIZE", "4"))  # Ready stories (one per theme) per (age, tone) bucket
+WARM_POOL_THRESHOLD = float(os.getenv("STORY_WARM_POOL_THRESHOLD", "0.92"))
+WARM_POOL_MAX_AGE_SECONDS = float(os.getenv("STORY_WARM_POOL_MAX_AGE_SECONDS", str(7 * 86400)))  # Older stories are regenerated
+WARM_POOL_IDLE_SECONDS = float(os.getenv("STORY_WARM_POOL_IDLE_SECONDS", "5"))  # Refiller check interval
+WARM_POOL_DAILY_BUDGET_USD = float(os.getenv("STORY_WARM_POOL_DAILY_BUDGET_USD", "2.0"))  # Estimated cost; 0 = no cost cap
+WARM_POOL_DAILY_MAX_STORIES = int(os.getenv("STORY_WARM_POOL_DAILY_MAX_STORIES", "200"))
+
+# Instrumentation
+# Estimated USD price per 1K (input, output) tokens, used for per-story cost.
+MODEL_PRICING = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gemini-1.5-flash-latest": (0.000075, 0.0003),
+}
+CACHED_INPUT_PRICE_RATIO = 0.5  # Provider-cached prompt tokens are billed at this fraction
+# Local metrics sink: STORY_METRICS_PATH enables it; format is "jsonl" (one line
+# per story) or "prometheus" (textfile-collector snapshot).
+METRICS_PATH = os.getenv("STORY_METRICS_PATH", "")
+METRICS_FORMAT = os.getenv("STORY_METRICS_FORMAT", "jsonl").strip().lower()
+METRICS_WINDOW = int(os.getenv("STORY_METRICS_WINDOW", "1000"))  # Stories kept for p50/p95
+
 # Thresholds for quality control
 OVERALL_THRESHOLD = 8.0  # Overall score must be >= 8.0 to pass
 DIMENSION_THRESHOLD = 7.0  # Each dimension must be >= 7.0 to pass
@@ -26,11 +190,37 @@ DIMENSION_THRESHOLD = 7.0  # Each dimension must be >= 7.0 to pass
 # Iteration limits
 MAX_ITERATIONS = 3  # Configurable (2-3)
 
+# Early stop of the revise loop from the judge-score trajectory: stop when a
+# revision gains less than CONVERGENCE_MIN_GAIN overall (or loses score), or when
+# the same gain per remaining iteration cannot reach OVERALL_THRESHOLD. The
+# best-scoring draft is kept either way.
+EARLY_STOP_ENABLED = os.getenv("STORY_EARLY_STOP", "on").strip().lower() not in {"off", "0", "false", "no"}
+CONVERGENCE_MIN_GAIN = float(os.getenv("STORY_CONVERGENCE_MIN_GAIN", "0.3"))
+
+# Revisions: "edits" asks the storyteller for paragraph-level edits applied
+# locally (full rewrite if they cannot be applied); "rewrite" always regenerates
+# the whole story. Judge-driven revisions of drafts scoring below
+# REVISION_REWRITE_BELOW go straight to a full rewrite, as do edit lists touching
+# more than REVISION_EDIT_MAX_FRACTION of the paragraphs.
+REVISION_MODE = os.getenv("STORY_REVISION_MODE", "edits").strip().lower()
+REVISION_REWRITE_BELOW = float(os.getenv("STORY_REVISION_REWRITE_BELOW", "6.0"))
+REVISION_EDIT_MAX_FRACTION = float(os.getenv("STORY_REVISION_EDIT_MAX_FRACTION", "0.6"))
+
+# Speculative drafts: upper bound for generate_story(..., drafts=N)
+MAX_DRAFTS = int(os.getenv("STORY_MAX_DRAFTS", "5"))
+
 # Story constraints
 MIN_WORDS = 200  # 250 - 20% tolerance
 MAX_WORDS = 480  # 400 + 20% tolerance
 TARGET_WORDS_MIN = 250
 TARGET_WORDS_MAX = 400
 
+# Local pre-judge gate: drafts that fail these checks go straight back to the
+# storyteller without an LLM judge call. Set STORY_PRE_JUDGE=off to disable.
+PRE_JUDGE_ENABLED = os.getenv("STORY_PRE_JUDGE", "on").strip().lower() not in {"off", "0", "false", "no"}
+PRE_JUDGE_MAX_PARAGRAPH_WORDS = int(os.getenv("STORY_PRE_JUDGE_MAX_PARAGRAPH_WORDS", "150"))
+# Hard-fail when the Flesch-Kincaid grade exceeds (age - 5) + this slack.
+PRE_JUDGE_GRADE_SLACK = float(os.getenv("STORY_PRE_JUDGE_GRADE_SLACK", "6.0"))
+
 # Banned terms for safety check
 BANNED_TERMS = ["gun", "knife", "kill", "die", "alcohol", "drugs", "blood", "adult themes", "violence","Porn","Sexual content"]
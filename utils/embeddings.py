@@ -0,0 +1,103 @@
+"""
+Local, CPU-only text vectors for near-duplicate topic matching.
+
+A hashed n-gram vectorizer: topics are tokenized, stop words dropped, common
+synonyms and suffixes folded ("afraid of darkness" -> "scared dark"), then word,
+word-pair and character-trigram features are hashed into a fixed-size signed
+vector and L2-normalized. No model download and no third-party dependencies;
+hashing uses blake2b so vectors are stable across processes.
+"""
+import hashlib
+import math
+import re
+from typing import Dict, List
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "the", "of", "and", "or", "to", "in", "on", "at", "for", "with", "about", "who", "that",
+    "is", "are", "was", "be", "its", "it", "his", "her", "their", "my", "our", "story", "tale", "very",
+    "little", "really", "gets", "get", "goes", "go", "from", "by",
+}
+_SYNONYMS = {
+    "afraid": "scared", "frightened": "scared", "fearful": "scared", "scary": "scared", "fear": "scared",
+    "darkness": "dark", "nighttime": "night", "kitty": "cat", "kitten": "cat", "puppy": "dog", "doggy": "dog",
+    "bunny": "rabbit", "pal": "friend", "buddy": "friend", "friends": "friend", "sleepy": "sleep",
+    "bedtime": "sleep", "tiny": "small", "big": "large", "huge": "large", "ocean": "sea",
+}
+_SUFFIXES = ("ness", "ing", "ed", "es", "s")
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """
+    Tokenize a topic into folded content words.
+
+    Args:
+        text: Raw or refined topic
+
+    Returns:
+        Lowercase content tokens with synonyms and simple suffixes folded
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        token = _SYNONYMS.get(token, token)
+        for suffix in _SUFFIXES:
+            # Keep a stem of at least three letters, so "dogs" -> "dog" but "bed" stays.
+            if len(token) - len(suffix) >= 3 and token.endswith(suffix):
+                token = token[: -len(suffix)]
+                break
+        tokens.append(_SYNONYMS.get(token, token))
+    return tokens
+
+
+def _bucket(feature: str, dim: int):
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dim, 1.0 if (value >> 63) & 1 else -1.0
+
+
+class HashedNgramVectorizer:
+    """
+    Maps text to an L2-normalized vector of ``dim`` floats.
+
+    Args:
+        dim: Vector size
+        char_ngram: Character n-gram length for fuzzy word matching
+    """
+
+    def __init__(self, dim: int = 256, char_ngram: int = 3):
+        self.dim = dim
+        self.char_ngram = char_ngram
+
+    def features(self, text: str) -> Dict[str, float]:
+        tokens = normalize_tokens(text)
+        weights: Dict[str, float] = {}
+        for token in tokens:
+            weights["w:" + token] = weights.get("w:" + token, 0.0) + 1.0
+            padded = f"#{token}#"
+            for i in range(max(1, len(padded) - self.char_ngram + 1)):
+                gram = "c:" + padded[i:i + self.char_ngram]
+                weights[gram] = weights.get(gram, 0.0) + 0.3
+        for left, right in zip(tokens, tokens[1:]):
+            weights[f"b:{left} {right}"] = weights.get(f"b:{left} {right}", 0.0) + 0.5
+        return weights
+
+    def embed(self, text: str) -> List[float]:
+        """
+        Vectorize ``text``.
+
+        Returns:
+            Unit-length vector (all zeros for text without content words)
+        """
+        vector = [0.0] * self.dim
+        for feature, weight in self.features(text).items():
+            index, sign = _bucket(feature, self.dim)
+            vector[index] += sign * weight
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+
+def cosine(a: List[float], b: List[float]) -> float:
+    """Cosine similarity of two unit vectors (their dot product)."""
+    return sum(x * y for x, y in zip(a, b))
@@ -0,0 +1,310 @@
+"""
+Offline, deterministic chat model for benchmarks and local development.
+
+Selected with ``STORY_LLM_PROVIDER=fake``. It recognises the refiner, storyteller
+and judge prompts and answers each with canned output, simulating provider
+latency, token throughput and failures without any network access. Judge scores
+are derived from a hash of the story plus the number of revisions it has been
+through, so a batch of topics produces a realistic spread of iterations-to-pass.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from utils.config import (
+    FAKE_LLM_FAILURE_RATE,
+    FAKE_LLM_LATENCY,
+    FAKE_LLM_RESPONSES,
+    FAKE_LLM_SEED,
+    FAKE_LLM_TOKENS_PER_SECOND,
+)
+from utils.prompts import JUDGE_SYSTEM, PROMPT_REFINER_SYSTEM, STORYTELLER_EDIT_SYSTEM
+
+# Appended by every fake revision; the fake judge counts it to reward revised drafts.
+REVISION_SENTENCE = "Then everyone shared a warm cup of cocoa and smiled at the stars."
+JUDGE_DIMENSIONS = ["Age-fit", "Clarity", "Coherence", "Safety/Positivity", "Engagement", "Length-fit"]
+
+# Like OpenAI, only prompt prefixes of at least this many tokens are cached.
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+_REFINER_MARKER = PROMPT_REFINER_SYSTEM.splitlines()[0]
+_JUDGE_MARKER = JUDGE_SYSTEM.splitlines()[0]
+_EDIT_MARKER = STORYTELLER_EDIT_SYSTEM.splitlines()[0]
+_PARAGRAPH_LABEL_RE = re.compile(r"^\[(\d+)\] ", re.MULTILINE)
+_TOPIC_RE = re.compile(r'Raw topic: "(.*)"')
+_AGE_RE = re.compile(r"Age \(5–10\): (\d+)")
+
+_STORY_PARAGRAPHS = [
+    "Once upon a time, in a cozy little town, there lived a curious friend who loved {topic}. "
+    "Every morning the sun peeked through the window and said hello with a golden smile.",
+    "One day, something new happened. A soft breeze carried a tiny note that said, "
+    "\"Come and explore!\" Our friend put on a warm scarf and skipped down the garden path.",
+    "Along the way there were puddles to hop over and birds to wave at. A kind neighbor "
+    "shared a basket of apples, and together they counted clouds shaped like boats and bunnies.",
+    "Soon they found a quiet meadow filled with flowers. The flowers nodded in the wind as "
+    "if they were listening to every word. Our friend told them all about {topic} and laughed.",
+    "When a little worry came along, our friend took a slow breath, held a friend's hand and "
+    "remembered that being brave can be gentle. Step by step, the worry grew small and soft.",
+    "As evening came, the sky turned pink and then purple. Fireflies blinked like tiny "
+    "lanterns, and the whole meadow hummed a sleepy song about friendship and kindness.",
+    "Back at home, there was a bath with bubbles, a story by the lamp and a big hug goodnight. "
+    "Our friend snuggled under the blanket and thought about the wonderful day.",
+    "And as the moon rose high and round, everyone in the cozy little town drifted off to "
+    "sleep, dreaming of new adventures and of {topic}. The end.",
+]
+
+
+def _load_canned() -> Dict[str, Any]:
+    if not FAKE_LLM_RESPONSES:
+        return {}
+    with open(FAKE_LLM_RESPONSES, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def count_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class FakeLLMError(RuntimeError):
+    """Raised by FakeStoryLLM to simulate a provider failure (a retryable 503)."""
+
+    status_code = 503
+
+
+class FakeStoryLLM(BaseChatModel):
+    """
+    Chat model that answers the story pipeline's prompts without a provider.
+
+    Args:
+        temperature: Accepted for pool-key parity with real providers
+        latency: Seconds before the first token
+        tokens_per_second: Simulated output rate (0 streams instantly)
+        failure_rate: Probability that a call raises FakeLLMError
+        seed: Seed for failures and judge scores
+        canned: Optional {"refiner": {...}, "judge": {...}} overrides
+        json_mode: Without it, JSON answers come wrapped in a sentence and a code
+            fence, as chat models often do when JSON mode is off
+    """
+
+    model_name: str = "fake-story-llm"
+    temperature: float = 0.7
+    latency: float = FAKE_LLM_LATENCY
+    tokens_per_second: float = FAKE_LLM_TOKENS_PER_SECOND
+    failure_rate: float = FAKE_LLM_FAILURE_RATE
+    seed: int = FAKE_LLM_SEED
+    canned: Dict[str, Any] = {}
+    json_mode: bool = False
+
+    _rng: random.Random = PrivateAttr()
+    _rng_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _seen_prefixes: set = PrivateAttr(default_factory=set)
+
+    def __init__(self, **kwargs: Any):
+        kwargs.setdefault("canned", _load_canned())
+        super().__init__(**kwargs)
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-story-llm"
+
+    # ---- canned content -------------------------------------------------
+
+    def respond(self, messages: List[BaseMessage]) -> str:
+        """
+        Produce the canned answer for a refiner, judge or storyteller prompt.
+
+        Args:
+            messages: System + human prompt messages
+
+        Returns:
+            Response text
+        """
+        system = str(messages[0].content) if messages else ""
+        user = str(messages[-1].content) if messages else ""
+        if system.startswith(_REFINER_MARKER):
+            return self._as_json(self._refine(user))
+        if system.startswith(_JUDGE_MARKER):
+            return self._as_json(self._judge(user))
+        if system.startswith(_EDIT_MARKER):
+            return self._as_json(self._edit(user))
+        return self._write(user)
+
+    def _as_json(self, payload: str) -> str:
+        if self.json_mode:
+            return payload
+        return f"Here is the JSON you asked for:\n```json\n{payload}\n```"
+
+    def _refine(self, user: str) -> str:
+        if "refiner" in self.canned:
+            return json.dumps(self.canned["refiner"])
+        topic_match = _TOPIC_RE.search(user)
+        age_match = _AGE_RE.search(user)
+        topic = topic_match.group(1) if topic_match else "a friendly adventure"
+        return json.dumps({
+            "topic": topic,
+            "age": int(age_match.group(1)) if age_match else 7,
+            "tone": "warm, positive, imaginative",
+            "length_words": "250–400",
+            "vocabulary_level": "simple, concrete, grade 2–3",
+            "forbidden": ["violence", "scary imagery", "adult themes"],
+            "moral": "Being gentle and brave go together.",
+            "setting": "a cozy little town",
+            "main_characters": ["a curious friend", "a kind neighbor"],
+            "plot_beats": ["Beginning: a new day", "Middle: a small worry", "End: a calm goodnight"],
+            "must": ["250–400 words", "happy ending"],
+            "should": ["sensory details"],
+            "can": ["light humor"],
+        })
+
+    def _write(self, user: str) -> str:
+        if "Original story:" in user:
+            story = user.split("Original story:", 1)[1].split("Output only the revised story text.", 1)[0].strip()
+            return f"{story}\n\n{REVISION_SENTENCE}"
+        topic = "a friendly adventure"
+        if "Brief (JSON):" in user:
+            try:
+                brief = json.loads(user.split("Brief (JSON):", 1)[1].split("Guidance:", 1)[0])
+                topic = brief.get("topic") or topic
+            except ValueError:
+                pass
+        return "\n\n".join(paragraph.format(topic=topic) for paragraph in _STORY_PARAGRAPHS)
+
+    def _edit(self, user: str) -> str:
+        # Same revision as the rewrite path, expressed as one appended paragraph.
+        count = len(_PARAGRAPH_LABEL_RE.findall(user.split("Story paragraphs:", 1)[-1]))
+        return json.dumps({"edits": [{"op": "insert", "index": count, "text": REVISION_SENTENCE}], "rewrite": False})
+
+    def _judge(self, user: str) -> str:
+        if "judge" in self.canned:
+            return json.dumps(self.canned["judge"])
+        story = user.split("\n\n", 1)[-1]
+        revisions = story.count(REVISION_SENTENCE)
+        digest = hashlib.sha256(f"{self.seed}:{story.replace(REVISION_SENTENCE, '')}".encode("utf-8")).digest()
+        base = 6.6 + (digest[0] % 20) / 10  # 6.6 .. 8.5
+        overall = round(min(9.5, base + 0.7 * revisions), 1)
+        return json.dumps({
+            "overall": overall,
+            "dimensions": [
+                {"name": name, "score": round(overall + (0.3 if i % 2 else -0.3), 1), "reason": "Fake judge."}
+                for i, name in enumerate(JUDGE_DIMENSIONS)
+            ],
+            "edit_instructions": "Add a cozy closing image." if overall < 9.0 else "No changes needed.",
+        })
+
+    # ---- simulated provider behaviour ------------------------------------
+
+    def _maybe_fail(self) -> None:
+        if self.failure_rate <= 0:
+            return
+        with self._rng_lock:
+            roll = self._rng.random()
+        if roll < self.failure_rate:
+            raise FakeLLMError("simulated provider failure")
+
+    def _delays(self, output_tokens: int):
+        per_token = (1.0 / self.tokens_per_second) if self.tokens_per_second > 0 else 0.0
+        return self.latency, per_token * output_tokens
+
+    def _usage(self, messages: List[BaseMessage], text: str) -> Dict[str, Any]:
+        input_tokens = sum(count_tokens(str(message.content)) for message in messages)
+        output_tokens = count_tokens(text)
+        # Simulate provider prefix caching: a repeated long system prompt is a cache read.
+        system = str(messages[0].content) if messages else ""
+        prefix_tokens = count_tokens(system)
+        cache_read = 0
+        if prefix_tokens >= PROMPT_CACHE_MIN_TOKENS:
+            with self._rng_lock:
+                if system in self._seen_prefixes:
+                    cache_read = prefix_tokens
+                self._seen_prefixes.add(system)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_token_details": {"cache_read": cache_read},
+        }
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._maybe_fail()
+        text = self.respond(messages)
+        usage = self._usage(messages, text)
+        first, rest = self._delays(usage["output_tokens"])
+        time.sleep(first + rest)
+        message = AIMessage(content=text, usage_metadata=usage, response_metadata={"model_name": self.model_name})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._maybe_fail()
+        text = self.respond(messages)
+        usage = self._usage(messages, text)
+        first, rest = self._delays(usage["output_tokens"])
+        await asyncio.sleep(first + rest)
+        message = AIMessage(content=text, usage_metadata=usage, response_metadata={"model_name": self.model_name})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, messages: List[BaseMessage]):
+        text = self.respond(messages)
+        usage = self._usage(messages, text)
+        words = re.findall(r"\S+\s*", text)
+        return words, usage
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        self._maybe_fail()
+        words, usage = self._chunks(messages)
+        first, rest = self._delays(usage["output_tokens"])
+        time.sleep(first)
+        per_word = rest / len(words) if words else 0.0
+        for word in words:
+            if per_word:
+                time.sleep(per_word)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+        # Usage arrives once, on the final chunk, as with OpenAI's stream_usage.
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self._maybe_fail()
+        words, usage = self._chunks(messages)
+        first, rest = self._delays(usage["output_tokens"])
+        await asyncio.sleep(first)
+        per_word = rest / len(words) if words else 0.0
+        for word in words:
+            if per_word:
+                await asyncio.sleep(per_word)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
@@ -1,44 +1,158 @@
 """
 JSON parser for strict JSON extraction from LLM responses.
-Slices first {...} block and parses with json.loads.
-Retries once if parsing fails.
+With provider JSON mode the response is a single object and json.loads takes it
+directly. Otherwise IncrementalJsonParser scans the text once (tracking strings,
+escapes and nesting depth) and returns the first complete top-level object, so
+prose or code fences around the JSON are skipped in linear time without a
+second LLM call.
 """
 import json
-import re
-from typing import Dict, Any, Optional
+import threading
+from typing import Any, Dict, List, Optional, Type
 
+from pydantic import BaseModel, ValidationError
 
-def parse_strict_json(text: str, retry_prompt: Optional[str] = None) -> Dict[str, Any]:
+
+class IncrementalJsonParser:
+    """
+    Finds the first complete JSON object in text fed in one or more chunks.
+
+    Usage:
+        parser = IncrementalJsonParser()
+        for chunk in chunks:
+            obj = parser.feed(chunk)
+            if obj is not None:
+                break
     """
-    Parse strict JSON from text by extracting first {...} block.
-    
+
+    def __init__(self) -> None:
+        self.result: Optional[Dict[str, Any]] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """
+        Consume more text.
+
+        Returns:
+            The first complete object once its closing brace has arrived, else None
+        """
+        if self.result is not None:
+            return self.result
+        for char in chunk:
+            if not self._buffer:
+                if char != "{":
+                    continue
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        value = json.loads("".join(self._buffer))
+                    except json.JSONDecodeError:
+                        value = None
+                    if isinstance(value, dict):
+                        self.result = value
+                        return value
+                    # Balanced but not valid JSON (e.g. "{placeholder}" in prose): keep scanning.
+                    self._reset()
+        return None
+
+
+class ParseStats:
+    """Per-node structured-output outcomes (thread-safe)."""
+
+    OUTCOMES = ("direct", "recovered", "failed")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, node: str, outcome: str) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(node, dict.fromkeys(self.OUTCOMES, 0))
+            counts[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns:
+            Per node: direct (clean JSON), recovered (JSON extracted from surrounding
+            text; a retry call avoided), failed, total and failure_rate
+        """
+        with self._lock:
+            report = {}
+            for node, counts in self._counts.items():
+                total = sum(counts.values())
+                report[node] = {
+                    **counts,
+                    "total": total,
+                    "failure_rate": counts["failed"] / total if total else 0.0,
+                    "retries_avoided": counts["recovered"],
+                }
+            return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+PARSE_STATS = ParseStats()
+
+
+def parse_structured(text: str, schema: Type[BaseModel], node: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parse an LLM response and validate it against ``schema``.
+
     Args:
-        text: Text containing JSON
-        retry_prompt: Optional prompt to add if first attempt fails
-        
+        text: Response content
+        schema: Pydantic model (utils.schemas.StoryBrief or JudgeResult)
+        node: Node name; when given, the outcome is counted in PARSE_STATS
+
     Returns:
-        Parsed JSON dictionary
-        
+        Validated dictionary (schema defaults filled in, unknown keys kept)
+
     Raises:
-        ValueError: If JSON cannot be parsed after retry
+        ValueError: If no object can be parsed or it does not fit the schema
     """
-    # Find first JSON object block {...}
-    match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', text, re.DOTALL)
-    
-    if not match:
-        # If no match found, try to find any {...} pattern more broadly
-        match = re.search(r'\{.*\}', text, re.DOTALL)
-    
-    if match:
-        json_str = match.group(0)
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError:
-            # If parsing fails and we have a retry prompt, try adding it
-            if retry_prompt:
-                # This would be used if we need to retry with LLM
-                raise ValueError(f"JSON parsing failed. Retry with: {retry_prompt}")
-            raise ValueError("JSON parsing failed")
-    
-    raise ValueError("No JSON object found in text")
+    stripped = text.strip()
+    outcome = "direct"
+    try:
+        data = json.loads(stripped)
+        if not isinstance(data, dict):
+            raise ValueError("not an object")
+    except ValueError:
+        outcome = "recovered"
+        data = IncrementalJsonParser().feed(text)
+    try:
+        if data is None:
+            raise ValueError("No JSON object found in text")
+        model = schema.model_validate(data)
+    except (ValueError, ValidationError) as exc:
+        if node:
+            PARSE_STATS.record(node, "failed")
+        raise ValueError(f"{schema.__name__} parsing failed: {exc}") from exc
+    result = model.model_dump(exclude_none=True)
+    if node:
+        PARSE_STATS.record(node, outcome)
+    return result
+
 
+def get_parse_stats() -> Dict[str, Dict[str, Any]]:
+    """Report structured-output parse outcomes per node."""
+    return PARSE_STATS.snapshot()
@@ -0,0 +1,259 @@
+"""
+Content-addressed response cache for LLM calls.
+Responses are keyed by a hash of (model, temperature, system prompt, user prompt),
+so identical refiner/judge requests are served locally instead of hitting the provider.
+
+Backends: in-memory LRU with TTL, or an on-disk SQLite store shared across runs;
+the "llm" tier of the shared cache (storage/shared_cache.py) takes over when enabled.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from storage.shared_cache import shared_tier
+from utils.config import (
+    LLM_CACHE_BACKEND,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_NODES,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+)
+
+
+def make_cache_key(model: str, temperature: Optional[float], messages: Iterable[Tuple[str, str]]) -> str:
+    """
+    Hash the request into a stable cache key.
+
+    Args:
+        model: Model name
+        temperature: Sampling temperature
+        messages: (role, content) pairs, e.g. the system and user prompts
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": list(messages)},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache(ABC):
+    """Base cache interface; tracks hit/miss counters per node."""
+
+    def __init__(self) -> None:
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def record(self, node: str, hit: bool) -> None:
+        with self._stats_lock:
+            counters = self._stats.setdefault(node, {"hits": 0, "misses": 0})
+            counters["hits" if hit else "misses"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report hit rates overall and per node.
+
+        Returns:
+            Dictionary with backend, hits, misses, hit_rate and a per-node breakdown
+        """
+        with self._stats_lock:
+            nodes = {
+                node: dict(c, hit_rate=c["hits"] / (c["hits"] + c["misses"]) if c["hits"] + c["misses"] else 0.0)
+                for node, c in self._stats.items()
+            }
+        hits = sum(c["hits"] for c in nodes.values())
+        misses = sum(c["misses"] for c in nodes.values())
+        return {
+            "backend": type(self).__name__,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "nodes": nodes,
+        }
+
+
+class MemoryLRUCache(LLMCache):
+    """In-process LRU cache with a time-to-live per entry."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 86400.0):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(LLMCache):
+    """On-disk cache in a SQLite file; survives restarts and is shared by processes on one host."""
+
+    def __init__(self, path: str, max_entries: int = 100_000, ttl_seconds: float = 86400.0):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+        self._conn.commit()
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._writes += 1
+            # Trim occasionally rather than on every write.
+            if self._writes % 100 == 0:
+                self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+
+class SharedTierCache(LLMCache):
+    """Responses kept in a tier of the cross-process shared cache; per-node counters stay per process."""
+
+    def __init__(self, shared: Any, tier: str = "llm"):
+        super().__init__()
+        self.shared = shared
+        self.tier = tier
+
+    def get(self, key: str) -> Optional[str]:
+        return self.shared.get(self.tier, key)
+
+    def set(self, key: str, value: str) -> None:
+        self.shared.set(self.tier, key, value)
+
+    def clear(self) -> None:
+        self.shared.clear(self.tier)
+
+
+# Distinguishes "not configured yet" from an explicit None (caching off).
+_UNSET = object()
+_cache: Any = _UNSET
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Return the process-wide response cache configured by ``STORY_LLM_CACHE``.
+
+    With the shared cache on (``STORY_SHARED_CACHE``) and its "llm" tier enabled,
+    responses go there instead, so every server process sees them.
+
+    Returns:
+        LLMCache instance, or None when caching is off
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is not _UNSET:
+            return _cache
+        cache: Optional[LLMCache] = None
+        if shared_tier("llm") is not None:
+            cache = SharedTierCache(shared_tier("llm"), "llm")
+        elif LLM_CACHE_BACKEND not in ("", "off", "none"):
+            if LLM_CACHE_BACKEND == "sqlite":
+                cache = SQLiteCache(LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS)
+            elif LLM_CACHE_BACKEND == "memory":
+                cache = MemoryLRUCache(max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS)
+            else:
+                raise ValueError(f"Unknown STORY_LLM_CACHE backend: {LLM_CACHE_BACKEND!r} (use memory, sqlite or off)")
+        _cache = cache
+        return _cache
+
+
+def set_llm_cache(cache: Optional[LLMCache]) -> None:
+    """Install a custom cache backend (any LLMCache implementation), or None to turn caching off."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def cache_enabled_for(node: str) -> bool:
+    """True when ``node`` opted into response caching via ``STORY_LLM_CACHE_NODES``."""
+    return node in LLM_CACHE_NODES
+
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """Report cache hit rates (empty when caching is off)."""
+    cache = get_llm_cache()
+    return cache.stats() if cache else {}
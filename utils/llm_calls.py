@@ -0,0 +1,258 @@
+"""
+Single entry point for node LLM calls.
+Wraps ``llm.invoke``/``llm.ainvoke`` (and their streaming forms) with the response
+cache, the per-model rate limiter and retry scheduler, per-call tracing (latency,
+tokens, cost) and, for async calls, the global concurrency limiter. A RoutedLLM
+runs the provider call on each of its providers as needed (failover, hedging);
+only its last provider retries on its own.
+"""
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from utils.concurrency import llm_slot
+from utils.config import LLM_COMPLETION_TOKEN_ESTIMATE
+from utils.llm_cache import cache_enabled_for, get_llm_cache, make_cache_key
+from utils.llm_factory import get_rate_limiter
+from utils.llm_router import RoutedLLM
+from utils.telemetry import current_trace
+
+
+def _model_name(llm: Any) -> str:
+    return str(getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__)
+
+
+def _cache_key(llm: Any, messages: List[BaseMessage]) -> str:
+    return make_cache_key(
+        _model_name(llm),
+        getattr(llm, "temperature", None),
+        [(message.type, str(message.content)) for message in messages],
+    )
+
+
+def _estimate_tokens(llm: Any, messages: List[BaseMessage]) -> int:
+    """Rough prompt tokens (4 chars each) plus the completion budget, reserved before a call."""
+    prompt = sum(len(str(message.content)) for message in messages) // 4
+    return prompt + (getattr(llm, "max_tokens", None) or LLM_COMPLETION_TOKEN_ESTIMATE)
+
+
+def _usage_tokens(response: Any) -> int:
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("total_tokens") or (usage.get("input_tokens", 0) + usage.get("output_tokens", 0))
+
+
+def _route(llm: Any, node: str, call: Callable[[Any, bool], Any], **options: Any) -> Tuple[Any, Any]:
+    """Run ``call(model, last)`` on ``llm``, or across the providers of a RoutedLLM; returns (model, response)."""
+    if isinstance(llm, RoutedLLM):
+        return llm.call(node, call, **options)
+    return llm, call(llm, True)
+
+
+async def _aroute(llm: Any, node: str, call: Callable[[Any, bool], Awaitable[Any]], **options: Any) -> Tuple[Any, Any]:
+    if isinstance(llm, RoutedLLM):
+        return await llm.acall(node, call, **options)
+    return llm, await call(llm, True)
+
+
+def _lookup(node: str, llm: Any, messages: List[BaseMessage]):
+    """Return (cache, key, cached_message) for a call; cache is None when the node opted out."""
+    cache = get_llm_cache() if cache_enabled_for(node) else None
+    if cache is None:
+        return None, None, None
+    key = _cache_key(llm, messages)
+    value = cache.get(key)
+    cache.record(node, hit=value is not None)
+    if value is None:
+        return cache, key, None
+    return cache, key, AIMessage(content=value, response_metadata={"cache_hit": True})
+
+
+def _record(node: str, llm: Any, started: float, response: Any, cached: bool, retry: bool) -> None:
+    """Attach one LLM call (latency, token usage, retry flag) to the running story trace."""
+    trace = current_trace()
+    if trace is None:
+        return
+    usage = getattr(response, "usage_metadata", None) or {}
+    # Prompt tokens the provider served from its prefix cache (OpenAI/Gemini report these).
+    input_details = usage.get("input_token_details") or {}
+    trace.record_llm_call(
+        node=node,
+        model=_model_name(llm),
+        seconds=time.perf_counter() - started,
+        prompt_tokens=usage.get("input_tokens", 0),
+        completion_tokens=usage.get("output_tokens", 0),
+        cached=cached,
+        retry=retry,
+        cached_prompt_tokens=input_details.get("cache_read", 0) or 0,
+    )
+
+
+def _store(cache, key: Optional[str], response: Any, validate: Optional[Callable[[str], Any]]) -> None:
+    if cache is None or key is None:
+        return
+    content = str(response.content)
+    if validate is not None:
+        try:
+            validate(content)
+        except Exception:
+            return  # Never cache a response the node cannot use.
+    cache.set(key, content)
+
+
+def invoke_llm(
+    llm: Any,
+    messages: List[BaseMessage],
+    node: str,
+    validate: Optional[Callable[[str], Any]] = None,
+    retry: bool = False,
+) -> Any:
+    """
+    Call ``llm.invoke`` through the response cache.
+
+    Args:
+        llm: Chat model from get_llm
+        messages: Prompt messages
+        node: Calling node name; selects cache opt-in
+        validate: Optional check run on the content before caching it
+        retry: Marks the call as a retry in the story trace
+
+    Returns:
+        AIMessage-like response
+    """
+    started = time.perf_counter()
+    cache, key, cached = _lookup(node, llm, messages)
+    if cached is not None:
+        _record(node, llm, started, cached, cached=True, retry=retry)
+        return cached
+
+    def call(model: Any, last: bool) -> Any:
+        limiter, tokens = get_rate_limiter(_model_name(model)), _estimate_tokens(model, messages)
+        response = limiter.call(lambda: model.invoke(messages), tokens, can_retry=lambda: last)
+        limiter.settle(tokens, _usage_tokens(response))
+        return response
+
+    model, response = _route(llm, node, call)
+    _record(node, model, started, response, cached=False, retry=retry)
+    _store(cache, key, response, validate)
+    return response
+
+
+async def ainvoke_llm(
+    llm: Any,
+    messages: List[BaseMessage],
+    node: str,
+    validate: Optional[Callable[[str], Any]] = None,
+    retry: bool = False,
+) -> Any:
+    """
+    Async variant of invoke_llm; holds a global limiter slot while the provider call runs.
+    """
+    started = time.perf_counter()
+    cache, key, cached = _lookup(node, llm, messages)
+    if cached is not None:
+        _record(node, llm, started, cached, cached=True, retry=retry)
+        return cached
+
+    async def call(model: Any, last: bool) -> Any:
+        async def attempt():
+            # The concurrency slot is released while backing off between attempts.
+            async with llm_slot():
+                return await model.ainvoke(messages)
+
+        limiter, tokens = get_rate_limiter(_model_name(model)), _estimate_tokens(model, messages)
+        response = await limiter.acall(attempt, tokens, can_retry=lambda: last)
+        limiter.settle(tokens, _usage_tokens(response))
+        return response
+
+    model, response = await _aroute(llm, node, call)
+    _record(node, model, started, response, cached=False, retry=retry)
+    _store(cache, key, response, validate)
+    return response
+
+
+def stream_llm(
+    llm: Any,
+    messages: List[BaseMessage],
+    node: str,
+    on_token: Callable[[str], None],
+) -> Any:
+    """
+    Call ``llm.stream`` through the response cache, forwarding each token to ``on_token``.
+
+    A cache hit is forwarded as a single token. Failed calls are retried (or
+    moved to another provider) only until the first token has been forwarded.
+
+    Returns:
+        AIMessage with the full streamed content
+    """
+    started = time.perf_counter()
+    cache, key, cached = _lookup(node, llm, messages)
+    if cached is not None:
+        on_token(str(cached.content))
+        _record(node, llm, started, cached, cached=True, retry=False)
+        return cached
+    streamed = False
+
+    def call(model: Any, last: bool) -> Any:
+        def attempt():
+            nonlocal streamed
+            response = None
+            for chunk in model.stream(messages):
+                # Chunks add up into one message, merging content and usage metadata.
+                response = chunk if response is None else response + chunk
+                if chunk.content:
+                    streamed = True
+                    on_token(str(chunk.content))
+            return response if response is not None else AIMessage(content="")
+
+        limiter, tokens = get_rate_limiter(_model_name(model)), _estimate_tokens(model, messages)
+        response = limiter.call(attempt, tokens, can_retry=lambda: last and not streamed)
+        limiter.settle(tokens, _usage_tokens(response))
+        return response
+
+    # Streams are never hedged: two providers would interleave their tokens.
+    model, response = _route(llm, node, call, hedge=False, can_fail_over=lambda: not streamed)
+    _record(node, model, started, response, cached=False, retry=False)
+    _store(cache, key, response, None)
+    return response
+
+
+async def astream_llm(
+    llm: Any,
+    messages: List[BaseMessage],
+    node: str,
+    on_token: Callable[[str], None],
+) -> Any:
+    """
+    Async variant of stream_llm; holds a global limiter slot for the whole stream.
+    """
+    started = time.perf_counter()
+    cache, key, cached = _lookup(node, llm, messages)
+    if cached is not None:
+        on_token(str(cached.content))
+        _record(node, llm, started, cached, cached=True, retry=False)
+        return cached
+    streamed = False
+
+    async def call(model: Any, last: bool) -> Any:
+        async def attempt():
+            nonlocal streamed
+            response = None
+            async with llm_slot():
+                async for chunk in model.astream(messages):
+                    response = chunk if response is None else response + chunk
+                    if chunk.content:
+                        streamed = True
+                        on_token(str(chunk.content))
+            return response if response is not None else AIMessage(content="")
+
+        limiter, tokens = get_rate_limiter(_model_name(model)), _estimate_tokens(model, messages)
+        response = await limiter.acall(attempt, tokens, can_retry=lambda: last and not streamed)
+        limiter.settle(tokens, _usage_tokens(response))
+        return response
+
+    model, response = await _aroute(llm, node, call, hedge=False, can_fail_over=lambda: not streamed)
+    _record(node, model, started, response, cached=False, retry=False)
+    _store(cache, key, response, None)
+    return response
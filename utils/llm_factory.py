@@ -1,77 +1,411 @@
 """
 LLM Factory for flexible model selection.
-Supports OpenAI and Google Gemini based on available API keys.
+Supports OpenAI and Google Gemini based on available API keys, plus an offline
+fake provider (``STORY_LLM_PROVIDER=fake``) for benchmarks.
+
+Chat-model clients are pooled: instances are cached in a process-wide registry
+keyed by (provider, model, API key hash, temperature, settings, event loop) and share keep-alive HTTP
+connection pools, so repeated node invocations reuse warm connections instead of
+paying a fresh TLS handshake per LLM hop.
+
+Every model also gets one shared AdaptiveRateLimiter (utils/rate_limiter.py);
+utils.llm_calls routes each provider call through it.
+
+In auto mode with more than one provider key, get_llm returns a RoutedLLM over
+one model per provider (utils/llm_router.py): calls fail over on errors and the
+short refiner/judge calls are hedged, steered by one shared ProviderRouter.
+
+Provider SDKs and ``.env`` are loaded on the first get_llm call, not at import
+time: langchain_openai and langchain_google_genai together take over a second to
+import, and a process only ever talks to one of them.
 """
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
 import os
-from typing import Union
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional, Tuple, Union
 
-try:
-    from langchain_openai import ChatOpenAI
-except ImportError:
-    ChatOpenAI = None
+from utils.config import (
+    MODEL_NAME,
+    GEMINI_MODEL,
+    LLM_PROVIDER,
+    LLM_POOL_MAX_CLIENTS,
+    LLM_POOL_MAX_CONNECTIONS,
+    LLM_POOL_MAX_KEEPALIVE,
+    LLM_POOL_IDLE_SECONDS,
+    LLM_RATE_LIMIT_RPM,
+    LLM_RATE_LIMIT_TPM,
+    LLM_CLIENT_MAX_RETRIES,
+    LLM_ROUTING,
+)
+from utils.llm_router import ProviderRouter, RoutedLLM
+from utils.rate_limiter import AdaptiveRateLimiter
 
-try:
+if TYPE_CHECKING:
     from langchain_google_genai import ChatGoogleGenerativeAI
-except ImportError:
-    ChatGoogleGenerativeAI = None
+    from langchain_openai import ChatOpenAI
+
+logger = logging.getLogger(__name__)
+logger.debug("Using GEMINI_MODEL = %s", GEMINI_MODEL)
+
+
+class _ClientRegistry:
+    """
+    Thread-safe LRU registry of chat-model instances with idle eviction.
+
+    Entries unused for longer than ``idle_seconds`` are dropped on the next
+    lookup; when the registry is full the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_clients: int, idle_seconds: float):
+        self.max_clients = max_clients
+        self.idle_seconds = idle_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_create(self, key: Hashable, builder: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries[key] = (entry[0], now)
+                self._entries.move_to_end(key)
+                return entry[0]
+            self.misses += 1
+
+        # Build outside the lock; constructing a client can be slow.
+        client = builder()
+
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                # Another thread won the race; keep a single shared instance.
+                self._entries[key] = (existing[0], now)
+                return existing[0]
+            self._entries[key] = (client, now)
+            while len(self._entries) > self.max_clients:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return client
+
+    def _evict_idle(self, now: float) -> None:
+        stale = [
+            key for key, (_, last_used) in self._entries.items()
+            if now - last_used > self.idle_seconds or _loop_is_closed(key)
+        ]
+        for key in stale:
+            del self._entries[key]
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "clients": len(self._entries),
+                "max_clients": self.max_clients,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+_registry = _ClientRegistry(LLM_POOL_MAX_CLIENTS, LLM_POOL_IDLE_SECONDS)
+
+# Shared HTTP connection pools. The sync client is process-wide; async clients are
+# bound to the event loop that created them, so they are kept one per loop.
+_http_lock = threading.Lock()
+_sync_http_client = None
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+# Registry keys name a loop by a token that is never reused: id() of a collected
+# loop can come back for a new one, which would hand it the dead loop's clients.
+_loop_tokens: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, int]" = weakref.WeakKeyDictionary()
+_loops_by_token: "weakref.WeakValueDictionary[int, asyncio.AbstractEventLoop]" = weakref.WeakValueDictionary()
+_next_loop_token = itertools.count(1)
+
+
+def _http_limits():
+    import httpx
+
+    return httpx.Limits(
+        max_connections=LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_POOL_IDLE_SECONDS,
+    )
+
+
+def _shared_http_client():
+    """Return the process-wide keep-alive ``httpx.Client``."""
+    global _sync_http_client
+    with _http_lock:
+        if _sync_http_client is None:
+            import httpx
+
+            _sync_http_client = httpx.Client(limits=_http_limits())
+        return _sync_http_client
+
+
+def _shared_async_http_client(loop: Optional[asyncio.AbstractEventLoop]):
+    """Return the keep-alive ``httpx.AsyncClient`` for ``loop`` (None outside a loop)."""
+    if loop is None:
+        return None
+    with _http_lock:
+        client = _async_http_clients.get(loop)
+        if client is None:
+            import httpx
+
+            client = httpx.AsyncClient(limits=_http_limits())
+            _async_http_clients[loop] = client
+        return client
+
+
+def _current_loop() -> Tuple[Optional[asyncio.AbstractEventLoop], Optional[int]]:
+    """Return the running event loop (None outside one) and its registry token."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None, None
+    with _http_lock:
+        token = _loop_tokens.get(loop)
+        if token is None:
+            token = _loop_tokens[loop] = next(_next_loop_token)
+            _loops_by_token[token] = loop
+    return loop, token
+
+
+def _loop_is_closed(key: Hashable) -> bool:
+    """True when a registry key belongs to an event loop that has gone away."""
+    token = key[-1] if isinstance(key, tuple) and key else None
+    if token is None:
+        return False
+    loop = _loops_by_token.get(token)
+    return loop is None or loop.is_closed()
+
+
+def _key_fingerprint(api_key: Optional[str]) -> str:
+    """Short hash of an API key, so a rotated key gets fresh clients without clearing the pool."""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def _pool_usage(client) -> Optional[int]:
+    """Best-effort count of open connections in an httpx client's pool."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    return len(connections) if connections is not None else None
+
+
+def get_llm_pool_stats() -> Dict[str, Any]:
+    """
+    Report client-registry and HTTP connection-pool counters.
+
+    Returns:
+        Dictionary with registry hits/misses/evictions and open connection counts
+    """
+    stats = _registry.stats()
+    with _http_lock:
+        stats["http_max_connections"] = LLM_POOL_MAX_CONNECTIONS
+        stats["http_max_keepalive"] = LLM_POOL_MAX_KEEPALIVE
+        stats["http_sync_connections"] = _pool_usage(_sync_http_client) if _sync_http_client else 0
+        stats["http_async_pools"] = len(_async_http_clients)
+        stats["http_async_connections"] = sum(
+            _pool_usage(client) or 0 for client in list(_async_http_clients.values())
+        )
+    return stats
 
-from utils.config import MODEL_NAME, GEMINI_MODEL, LLM_PROVIDER
-print(f"DEBUG: Using GEMINI_MODEL = {GEMINI_MODEL}")
 
+def reset_llm_pool() -> None:
+    """Drop all pooled clients (used by tests and after changing API keys)."""
+    global _sync_http_client
+    _registry.clear()
+    with _http_lock:
+        if _sync_http_client is not None:
+            _sync_http_client.close()
+        _sync_http_client = None
+        _async_http_clients.clear()
 
-def get_llm(temperature: float = 0.7) -> Union[ChatOpenAI, ChatGoogleGenerativeAI]:
+
+_rate_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model: str) -> AdaptiveRateLimiter:
+    """
+    Return the limiter shared by every call to ``model`` in this process.
+
+    Args:
+        model: Model name (see utils.llm_calls._model_name)
+
+    Returns:
+        AdaptiveRateLimiter sized by STORY_LLM_RATE_LIMIT_RPM / STORY_LLM_RATE_LIMIT_TPM
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(model)
+        if limiter is None:
+            limiter = _rate_limiters[model] = AdaptiveRateLimiter(LLM_RATE_LIMIT_RPM, LLM_RATE_LIMIT_TPM)
+        return limiter
+
+
+def get_rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-model throttling, 429 and retry counters."""
+    with _rate_limiters_lock:
+        limiters = dict(_rate_limiters)
+    return {model: limiter.stats() for model, limiter in limiters.items()}
+
+
+_provider_router = ProviderRouter()
+
+
+def get_provider_router() -> ProviderRouter:
+    """Return the router whose provider health steers every RoutedLLM in this process."""
+    return _provider_router
+
+
+def get_route_stats() -> Dict[str, Any]:
+    """Hedge and failover counters plus per-provider health and latency."""
+    return _provider_router.stats()
+
+
+@lru_cache(maxsize=1)
+def _load_env() -> None:
+    """Load ``.env`` into the environment once per process."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+@lru_cache(maxsize=None)
+def _provider_class(provider: str):
     """
-    Get LLM instance based on available API keys.
-    Priority: Gemini (if GOOGLE_API_KEY exists) > OpenAI (if OPENAI_API_KEY exists)
-    
+    Import a provider's chat-model class on first use.
+
+    Args:
+        provider: "openai" or "gemini"
+
+    Returns:
+        ChatOpenAI / ChatGoogleGenerativeAI, or None when the SDK is not installed
+    """
+    try:
+        if provider == "openai":
+            from langchain_openai import ChatOpenAI
+
+            return ChatOpenAI
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI
+    except ImportError:
+        return None
+
+
+def _settings_key(settings: Dict[str, Any]) -> str:
+    return json.dumps(settings, sort_keys=True, default=repr)
+
+
+def get_llm(temperature: float = 0.7, json_mode: bool = False, **settings: Any) -> Union["ChatOpenAI", "ChatGoogleGenerativeAI", RoutedLLM]:
+    """
+    Get a pooled LLM instance based on available API keys.
+    Priority: OpenAI (if OPENAI_API_KEY exists) > Gemini (if GOOGLE_API_KEY exists).
+    In auto mode with both keys (and STORY_LLM_ROUTING not "off") the two are
+    wrapped in a RoutedLLM in that priority order.
+
     Args:
         temperature: Temperature for the LLM
-        
+        json_mode: Ask the provider to return a single JSON object
+        **settings: Extra constructor arguments; part of the pool key
+
     Returns:
-        LLM instance (ChatOpenAI or ChatGoogleGenerativeAI)
-        
+        LLM instance (ChatOpenAI, ChatGoogleGenerativeAI, RoutedLLM or FakeStoryLLM)
+
     Raises:
         ValueError: If neither API key is available
     """
+    _load_env()
     provider = LLM_PROVIDER
     google_api_key = os.getenv("GOOGLE_API_KEY")
     openai_api_key = os.getenv("OPENAI_API_KEY")
-    
+    loop, loop_key = _current_loop()
+
     def build_gemini():
         if not google_api_key:
             raise ValueError("GOOGLE_API_KEY not set but Gemini provider requested.")
-        if not ChatGoogleGenerativeAI:
+        chat_class = _provider_class("gemini")
+        if not chat_class:
             raise ValueError("langchain-google-genai is not installed.")
-        return ChatGoogleGenerativeAI(
+        gemini_settings = {"response_mime_type": "application/json", **settings} if json_mode else settings
+        key = ("gemini", GEMINI_MODEL, _key_fingerprint(google_api_key), temperature,
+               _settings_key(gemini_settings), loop_key)
+        return _registry.get_or_create(key, lambda: chat_class(
             model=GEMINI_MODEL,
             temperature=temperature,
             google_api_key=google_api_key,
-            convert_system_message_to_human=True  # Gemini quirk: converts system messages to human
-        )
-    
+            convert_system_message_to_human=True,  # Gemini quirk: converts system messages to human
+            **{"max_retries": LLM_CLIENT_MAX_RETRIES, **gemini_settings},
+        ))
+
     def build_openai():
         if not openai_api_key:
             raise ValueError("OPENAI_API_KEY not set but OpenAI provider requested.")
-        if not ChatOpenAI:
+        chat_class = _provider_class("openai")
+        if not chat_class:
             raise ValueError("langchain-openai is not installed.")
-        return ChatOpenAI(
+        openai_settings = settings
+        if json_mode:
+            model_kwargs = {"response_format": {"type": "json_object"}, **settings.get("model_kwargs", {})}
+            openai_settings = {**settings, "model_kwargs": model_kwargs}
+        key = ("openai", MODEL_NAME, _key_fingerprint(openai_api_key), temperature,
+               _settings_key(openai_settings), loop_key)
+        return _registry.get_or_create(key, lambda: chat_class(
             model=MODEL_NAME,
             temperature=temperature,
-            openai_api_key=openai_api_key
-        )
-    
+            openai_api_key=openai_api_key,
+            http_client=_shared_http_client(),
+            http_async_client=_shared_async_http_client(loop),
+            stream_usage=True,  # Report token usage on streamed responses too
+            **{"max_retries": LLM_CLIENT_MAX_RETRIES, **openai_settings},  # Retries happen in the shared rate limiter
+        ))
+
+    def build_fake():
+        from utils.fake_llm import FakeStoryLLM
+
+        key = ("fake", temperature, json_mode, _settings_key(settings), None)
+        return _registry.get_or_create(key, lambda: FakeStoryLLM(temperature=temperature, json_mode=json_mode, **settings))
+
     # Explicit provider selection
+    if provider == "fake":
+        return build_fake()
     if provider == "gemini":
         return build_gemini()
     if provider == "openai":
         return build_openai()
-    
+
     # Auto mode: prefer OpenAI per assignment requirement, fall back to Gemini.
-    if openai_api_key and ChatOpenAI:
-        return build_openai()
-    if google_api_key and ChatGoogleGenerativeAI:
-        return build_gemini()
-    
+    members = []
+    if openai_api_key and _provider_class("openai"):
+        members.append(("openai", build_openai()))
+    if google_api_key and _provider_class("gemini"):
+        members.append(("gemini", build_gemini()))
+    if len(members) > 1 and LLM_ROUTING != "off":
+        return RoutedLLM(_provider_router, members)
+    if members:
+        return members[0][1]
+
     raise ValueError(
         "No API key found. Please set OPENAI_API_KEY or GOOGLE_API_KEY (and optionally STORY_LLM_PROVIDER)."
     )
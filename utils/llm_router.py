@@ -0,0 +1,362 @@
+"""
+Provider routing for LLM calls: failover, hedged requests and health tracking.
+
+With more than one provider configured, get_llm returns a RoutedLLM holding one
+chat model per provider, and ProviderRouter orders them for every call from
+recent health. A provider that fails LLM_ROUTE_FAILURE_THRESHOLD calls in a row
+sits out LLM_ROUTE_COOLDOWN seconds, and a provider whose median latency for the
+node is clearly lower takes over as primary. A failed call moves on to the next
+provider. For the nodes in LLM_HEDGE_NODES, when the primary has not answered by
+its p95 latency for that node (clamped to LLM_HEDGE_MIN_DELAY..LLM_HEDGE_MAX_DELAY)
+the same call is also sent to the next provider and the first answer wins; async
+losers are cancelled.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from utils.config import (
+    LLM_HEDGE_MAX_DELAY,
+    LLM_HEDGE_MIN_DELAY,
+    LLM_HEDGE_NODES,
+    LLM_ROUTE_COOLDOWN,
+    LLM_ROUTE_FAILURE_THRESHOLD,
+    LLM_ROUTING,
+)
+
+LATENCY_WINDOW = 100  # Recent latencies (and outcomes) kept per provider and node
+MIN_LATENCY_SAMPLES = 10  # Fewer than this and a provider's latency for a node counts as unknown
+SWITCH_MARGIN = 1.5  # Another provider must be this much faster before it becomes primary
+
+# Makes one provider call: fn(chat_model, last) where ``last`` marks the final
+# provider in the route, the only one that should retry errors on its own.
+ProviderCall = Callable[[Any, bool], Any]
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+class ProviderHealth:
+    """Recent outcomes of one provider (guarded by the router's lock)."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.outcomes: Deque[bool] = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def latency(self, node: str, fraction: float) -> Optional[float]:
+        window = self.latencies.get(node)
+        if not window or len(window) < MIN_LATENCY_SAMPLES:
+            return None
+        return _percentile(window, fraction)
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def score(self, node: str) -> Optional[float]:
+        """Median latency for ``node`` inflated by the recent error rate; None when unknown."""
+        median = self.latency(node, 0.5)
+        return None if median is None else median * (1 + 2 * self.error_rate())
+
+    def add_latency(self, node: str, seconds: float) -> None:
+        self.latencies.setdefault(node, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+
+class ProviderRouter:
+    """
+    Health and latency bookkeeping shared by every routed call in the process (thread-safe).
+
+    Args:
+        mode: "failover" or "hedge" (see LLM_ROUTING)
+        hedge_nodes: Nodes whose calls may be hedged
+    """
+
+    def __init__(self, mode: str = LLM_ROUTING, hedge_nodes: Sequence[str] = LLM_HEDGE_NODES):
+        self.mode = mode
+        self.hedge_nodes = set(hedge_nodes)
+        self._lock = threading.Lock()
+        self._health: Dict[str, ProviderHealth] = {}
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def _get(self, provider: str) -> ProviderHealth:
+        health = self._health.get(provider)
+        if health is None:
+            health = self._health[provider] = ProviderHealth()
+        return health
+
+    def rank(self, providers: Sequence[str], node: str) -> List[str]:
+        """
+        Order ``providers`` for one call.
+
+        Providers in their failure cooldown go last. Otherwise the configured order
+        holds; in hedge mode another provider whose score for ``node`` beats the
+        primary's by SWITCH_MARGIN is promoted.
+
+        Returns:
+            Provider names, primary first
+        """
+        with self._lock:
+            now = time.monotonic()
+            order = sorted(providers, key=lambda name: self._get(name).open_until > now)
+            primary = self._get(order[0])
+            primary_score = primary.score(node)
+            # Failover keeps the configured primary (OpenAI by default) while it is healthy.
+            if self.mode != "hedge" or primary_score is None or primary.open_until > now:
+                return order
+            best, best_score = None, primary_score / SWITCH_MARGIN
+            for name in order[1:]:
+                health = self._get(name)
+                score = health.score(node)
+                if health.open_until <= now and score is not None and score < best_score:
+                    best, best_score = name, score
+            if best is not None:
+                order.remove(best)
+                order.insert(0, best)
+            return order
+
+    def hedge_delay(self, provider: str, node: str) -> Optional[float]:
+        """Seconds to wait on ``provider`` before hedging, or None when ``node`` is not hedged."""
+        if self.mode != "hedge" or node not in self.hedge_nodes:
+            return None
+        with self._lock:
+            p95 = self._get(provider).latency(node, 0.95)
+        if p95 is None:
+            return LLM_HEDGE_MAX_DELAY
+        return min(LLM_HEDGE_MAX_DELAY, max(LLM_HEDGE_MIN_DELAY, p95))
+
+    def record_success(self, provider: str, node: str, seconds: float) -> None:
+        with self._lock:
+            health = self._get(provider)
+            health.calls += 1
+            health.add_latency(node, seconds)
+            health.outcomes.append(True)
+            health.consecutive_failures = 0
+            health.open_until = 0.0
+
+    def record_failure(self, provider: str) -> None:
+        with self._lock:
+            health = self._get(provider)
+            health.calls += 1
+            health.failures += 1
+            health.outcomes.append(False)
+            health.consecutive_failures += 1
+            if health.consecutive_failures >= LLM_ROUTE_FAILURE_THRESHOLD:
+                health.open_until = time.monotonic() + LLM_ROUTE_COOLDOWN
+
+    def record_cancelled(self, provider: str, node: str, seconds: float) -> None:
+        """A hedge loser was cancelled after ``seconds``: a lower bound on its latency."""
+        with self._lock:
+            self._get(provider).add_latency(node, seconds)
+
+    def count(self, event: str) -> None:
+        with self._lock:
+            setattr(self, event, getattr(self, event) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Hedge/failover counters and, per provider, calls, failures, recent error
+            rate, whether it is cooling down, and p50/p95 latency per node
+        """
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "mode": self.mode,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "failovers": self.failovers,
+                "providers": {
+                    name: {
+                        "calls": health.calls,
+                        "failures": health.failures,
+                        "error_rate": health.error_rate(),
+                        "cooling_down": health.open_until > now,
+                        "latency": {
+                            node: {"p50": _percentile(window, 0.5), "p95": _percentile(window, 0.95), "samples": len(window)}
+                            for node, window in health.latencies.items()
+                        },
+                    }
+                    for name, health in self._health.items()
+                },
+            }
+
+
+_executor_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    """Threads for sync hedged calls (a losing call finishes in the background)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+        return _executor
+
+
+class RoutedLLM:
+    """
+    Routes each call across one chat model per provider (built by utils.llm_factory.get_llm).
+
+    Args:
+        router: Shared ProviderRouter
+        members: (provider name, chat model) pairs in configured priority order
+    """
+
+    def __init__(self, router: ProviderRouter, members: Sequence[Tuple[str, Any]]):
+        self.router = router
+        self.members = dict(members)
+        self.providers = [name for name, _ in members]
+        # Cache keys and traces read these like any chat model's attributes.
+        self.model_name = "|".join(
+            str(getattr(llm, "model_name", None) or getattr(llm, "model", None)) for _, llm in members
+        )
+        self.temperature = getattr(members[0][1], "temperature", None)
+
+    def _timed(self, name: str, node: str, fn: ProviderCall, last: bool) -> Any:
+        started = time.perf_counter()
+        try:
+            response = fn(self.members[name], last)
+        except Exception:
+            self.router.record_failure(name)
+            raise
+        self.router.record_success(name, node, time.perf_counter() - started)
+        return response
+
+    async def _atimed(self, name: str, node: str, fn: Callable[[Any, bool], Awaitable[Any]], last: bool) -> Any:
+        started = time.perf_counter()
+        try:
+            response = await fn(self.members[name], last)
+        except asyncio.CancelledError:
+            self.router.record_cancelled(name, node, time.perf_counter() - started)
+            raise
+        except Exception:
+            self.router.record_failure(name)
+            raise
+        self.router.record_success(name, node, time.perf_counter() - started)
+        return response
+
+    def call(self, node: str, fn: ProviderCall, hedge: bool = True,
+             can_fail_over: Callable[[], bool] = lambda: True) -> Tuple[Any, Any]:
+        """
+        Run ``fn`` on the ranked providers, failing over on errors and hedging slow calls.
+
+        Args:
+            node: Calling node; selects the latency window and whether to hedge
+            fn: Provider call, fn(chat_model, last)
+            hedge: False for calls that must not run twice at once (streams)
+            can_fail_over: Returns False once moving to another provider is unsafe
+
+        Returns:
+            (chat model that answered, its response)
+        """
+        order = self.router.rank(self.providers, node)
+        delay = self.router.hedge_delay(order[0], node) if hedge and len(order) > 1 else None
+        if delay is None:
+            for index, name in enumerate(order):
+                last = index == len(order) - 1
+                try:
+                    return self.members[name], self._timed(name, node, fn, last)
+                except Exception:
+                    if last or not can_fail_over():
+                        raise
+                    self.router.count("failovers")
+
+        pending: Dict[Future, str] = {}
+        launched = 0
+
+        def launch() -> None:
+            nonlocal launched
+            name = order[launched]
+            launched += 1
+            # Copy the context so the story trace and stream writer stay visible in the worker.
+            context = contextvars.copy_context()
+            pending[_hedge_executor().submit(context.run, self._timed, name, node, fn, launched == len(order))] = name
+
+        launch()
+        hedged = not wait(pending, timeout=delay).done
+        if hedged:
+            self.router.count("hedges")
+            launch()
+        error: Optional[BaseException] = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as exc:
+                    error = exc
+                    if launched < len(order) and can_fail_over():
+                        self.router.count("failovers")
+                        launch()
+                    continue
+                if hedged and name != order[0]:
+                    self.router.count("hedge_wins")
+                return self.members[name], response
+        raise error
+
+    async def acall(self, node: str, fn: Callable[[Any, bool], Awaitable[Any]], hedge: bool = True,
+                    can_fail_over: Callable[[], bool] = lambda: True) -> Tuple[Any, Any]:
+        """Async variant of call; the losing side of a hedge is cancelled."""
+        order = self.router.rank(self.providers, node)
+        delay = self.router.hedge_delay(order[0], node) if hedge and len(order) > 1 else None
+        if delay is None:
+            for index, name in enumerate(order):
+                last = index == len(order) - 1
+                try:
+                    return self.members[name], await self._atimed(name, node, fn, last)
+                except Exception:
+                    if last or not can_fail_over():
+                        raise
+                    self.router.count("failovers")
+
+        pending: Dict[asyncio.Task, str] = {}
+        launched = 0
+
+        def launch() -> None:
+            nonlocal launched
+            name = order[launched]
+            launched += 1
+            pending[asyncio.ensure_future(self._atimed(name, node, fn, launched == len(order)))] = name
+
+        launch()
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            hedged = not done
+            if hedged:
+                self.router.count("hedges")
+                launch()
+            error: Optional[BaseException] = None
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as exc:
+                        error = exc
+                        if launched < len(order) and can_fail_over():
+                            self.router.count("failovers")
+                            launch()
+                        continue
+                    if hedged and name != order[0]:
+                        self.router.count("hedge_wins")
+                    return self.members[name], response
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
@@ -56,8 +56,38 @@ If given a structured brief, follow it precisely. If given edit instructions, ap
 
 Do not include explanations—output the story only."""
 
+# Storyteller edit-mode System Prompt
+# Revisions return paragraph-level edits that are applied locally, so a small
+# change costs a few dozen output tokens instead of the whole story.
+STORYTELLER_EDIT_SYSTEM = """You are a friendly children's story editor for ages 5–10.
+
+You receive a story as numbered paragraphs and instructions for revising it. Make the smallest set of paragraph edits that fully applies the instructions while keeping the story safe, age-fit, and 250–400 words.
+
+Forbidden: violence, scary imagery, adult themes, blood, alcohol, drugs, guns, knives, killing, dying, graphic harm.
+
+Return STRICT JSON ONLY with this schema—no extra text:
+
+{
+  "edits": [
+    {"op": "replace", "index": 0, "text": "string"},   // replace paragraph [index] with text
+    {"op": "insert", "index": 0, "text": "string"},    // insert a new paragraph before [index]; use the paragraph count to append
+    {"op": "delete", "index": 0}                       // remove paragraph [index]
+  ],
+  "rewrite": false,
+  "story": ""
+}
+
+Indexes always refer to the original numbering. Each paragraph text is plain story text without its [n] label.
+
+If the instructions require changing most of the story, set "rewrite" to true, leave "edits" empty and put the complete revised story in "story".
+
+Return STRICT JSON only."""
+
 # Judge System Prompt
-JUDGE_SYSTEM = """You are a children's story reviewer.
+# Assembled from a static rubric, calibration examples and a static closing
+# section. The per-story text goes in the user message, so the system prompt is a
+# byte-stable prefix that providers can serve from their prompt cache.
+JUDGE_RUBRIC = """You are a children's story reviewer.
 
 Evaluate the story for ages 5–10.
 
@@ -93,62 +123,58 @@ Be concise and specific (e.g., "Shorten the middle by ~80 words," "Replace 'rock
 
 Include safety corrections if needed (remove forbidden words/themes).
 
-Include length adjustments if needed.
-
-Few-shot references (for style and scoring calibration only—do not repeat these stories):
-
-Story summary: "A 5-year-old tries baking cookies, burns them a little, but learns patience." Length: 280.
-Expected evaluation: {"overall": 8.4,"dimensions":[{"name":"Age-fit","score":8.5,"reason":"Simple kitchen setting."},{"name":"Clarity","score":8.0,"reason":"One paragraph too long."},{"name":"Coherence","score":8.5,"reason":"Clear setup-growth-resolution."},{"name":"Safety/Positivity","score":9.0,"reason":"Gentle lesson on patience."},{"name":"Engagement","score":8.0,"reason":"Relatable mishap."},{"name":"Length-fit","score":8.5,"reason":"Within range."}],"edit_instructions":"Split the long paragraph and describe the cookie smell."}
-
-Story summary: "A 10-year-old journeys alone through a spooky forest with shadow monsters." Length: 430.
-Expected evaluation: {"overall":5.6,"dimensions":[{"name":"Age-fit","score":5.0,"reason":"Sustained fear for older kids."},{"name":"Clarity","score":6.0,"reason":"Sentences tangled."},{"name":"Coherence","score":6.5,"reason":"Abrupt ending."},{"name":"Safety/Positivity","score":4.5,"reason":"No reassurance."},{"name":"Engagement","score":6.5,"reason":"Imaginative but intense."},{"name":"Length-fit","score":5.5,"reason":"Over 400 words."}],"edit_instructions":"Swap monsters for friendly animals, add a guide, trim ~60 words."}
-
-Story summary: "Two friends build a cardboard rocket in a garage with dad supervising." Length: 320.
-Expected evaluation: {"overall":8.8,"dimensions":[{"name":"Age-fit","score":9.0,"reason":"Everyday play, gentle tone."},{"name":"Clarity","score":8.7,"reason":"Short, crisp lines."},{"name":"Coherence","score":8.6,"reason":"Goal-achieve-celebrate arc."},{"name":"Safety/Positivity","score":9.2,"reason":"Adult present, safe play."},{"name":"Engagement","score":8.5,"reason":"Imaginative rocket details."},{"name":"Length-fit","score":8.6,"reason":"Mid-range length."}],"edit_instructions":"Add one line of dialogue and describe the rocket’s colors."}
+Include length adjustments if needed."""
+
+JUDGE_CALIBRATION_HEADER = "Few-shot references (for style and scoring calibration only—do not repeat these stories):"
+
+# (youngest age, oldest age, example); the age range selects trimmed per-band sets.
+JUDGE_CALIBRATION_EXAMPLES = [
+    (5, 7, """Story summary: "A 5-year-old tries baking cookies, burns them a little, but learns patience." Length: 280.
+Expected evaluation: {"overall": 8.4,"dimensions":[{"name":"Age-fit","score":8.5,"reason":"Simple kitchen setting."},{"name":"Clarity","score":8.0,"reason":"One paragraph too long."},{"name":"Coherence","score":8.5,"reason":"Clear setup-growth-resolution."},{"name":"Safety/Positivity","score":9.0,"reason":"Gentle lesson on patience."},{"name":"Engagement","score":8.0,"reason":"Relatable mishap."},{"name":"Length-fit","score":8.5,"reason":"Within range."}],"edit_instructions":"Split the long paragraph and describe the cookie smell."}"""),
+    (8, 10, """Story summary: "A 10-year-old journeys alone through a spooky forest with shadow monsters." Length: 430.
+Expected evaluation: {"overall":5.6,"dimensions":[{"name":"Age-fit","score":5.0,"reason":"Sustained fear for older kids."},{"name":"Clarity","score":6.0,"reason":"Sentences tangled."},{"name":"Coherence","score":6.5,"reason":"Abrupt ending."},{"name":"Safety/Positivity","score":4.5,"reason":"No reassurance."},{"name":"Engagement","score":6.5,"reason":"Imaginative but intense."},{"name":"Length-fit","score":5.5,"reason":"Over 400 words."}],"edit_instructions":"Swap monsters for friendly animals, add a guide, trim ~60 words."}"""),
+    (5, 8, """Story summary: "Two friends build a cardboard rocket in a garage with dad supervising." Length: 320.
+Expected evaluation: {"overall":8.8,"dimensions":[{"name":"Age-fit","score":9.0,"reason":"Everyday play, gentle tone."},{"name":"Clarity","score":8.7,"reason":"Short, crisp lines."},{"name":"Coherence","score":8.6,"reason":"Goal-achieve-celebrate arc."},{"name":"Safety/Positivity","score":9.2,"reason":"Adult present, safe play."},{"name":"Engagement","score":8.5,"reason":"Imaginative rocket details."},{"name":"Length-fit","score":8.6,"reason":"Mid-range length."}],"edit_instructions":"Add one line of dialogue and describe the rocket’s colors."}"""),
+    (5, 7, """Story summary: "A 6-year-old argues with her brother over toys, ends with teasing." Length: 260.
+Expected evaluation: {"overall":6.7,"dimensions":[{"name":"Age-fit","score":6.5,"reason":"Mild sarcasm feels older."},{"name":"Clarity","score":7.2,"reason":"Mostly simple sentences."},{"name":"Coherence","score":6.8,"reason":"Resolution thin."},{"name":"Safety/Positivity","score":6.0,"reason":"Teasing not resolved kindly."},{"name":"Engagement","score":6.9,"reason":"Realistic but low warmth."},{"name":"Length-fit","score":7.0,"reason":"In range."}],"edit_instructions":"Add a gentle apology scene and soften the teasing words."}"""),
+    (8, 10, """Story summary: "Child experiments with a chemistry set, causes small smoke puff." Length: 300.
+Expected evaluation: {"overall":7.5,"dimensions":[{"name":"Age-fit","score":7.0,"reason":"Need clearer adult supervision."},{"name":"Clarity","score":7.6,"reason":"Some jargon appears."},{"name":"Coherence","score":7.8,"reason":"Cause-effect resolved."},{"name":"Safety/Positivity","score":7.0,"reason":"Smoke moment needs reassurance."},{"name":"Engagement","score":8.0,"reason":"Curious science details."},{"name":"Length-fit","score":7.8,"reason":"In range."}],"edit_instructions":"Mention a parent nearby, replace 'reaction chamber' with 'mixing cup' and stress safety goggles."}"""),
+    (5, 8, """Story summary: "Girl helps new student plant sunflowers in school garden." Length: 310.
+Expected evaluation: {"overall":9.1,"dimensions":[{"name":"Age-fit","score":9.2},{"name":"Clarity","score":9.0},{"name":"Coherence","score":9.0},{"name":"Safety/Positivity","score":9.4},{"name":"Engagement","score":8.8},{"name":"Length-fit","score":9.0}],"edit_instructions":"Add one sensory phrase about soil texture to deepen immersion."}"""),
+    (7, 10, """Story summary: "Boy rides dragon to fight pirates on a burning island." Length: 350.
+Expected evaluation: {"overall":4.8,"dimensions":[{"name":"Age-fit","score":4.5,"reason":"Combat and fire imagery."},{"name":"Clarity","score":5.5,"reason":"Complex battles."},{"name":"Coherence","score":5.0,"reason":"Jumps between scenes."},{"name":"Safety/Positivity","score":4.0,"reason":"Violent focus."},{"name":"Engagement","score":6.5,"reason":"Action heavy."},{"name":"Length-fit","score":7.0,"reason":"In range."}],"edit_instructions":"Remove battles, pivot to a cooperative treasure hunt, add calm resolution."}"""),
+    (5, 7, """Story summary: "Siblings host a backyard animal talent show." Length: 270.
+Expected evaluation: {"overall":8.6,"dimensions":[{"name":"Age-fit","score":8.8},{"name":"Clarity","score":8.5},{"name":"Coherence","score":8.4},{"name":"Safety/Positivity","score":9.0},{"name":"Engagement","score":8.7},{"name":"Length-fit","score":8.5}],"edit_instructions":"Give each act a one-sentence description to boost variety."}"""),
+    (7, 10, """Story summary: "Child sneaks out at midnight to explore construction site." Length: 290.
+Expected evaluation: {"overall":3.9,"dimensions":[{"name":"Age-fit","score":4.0},{"name":"Clarity","score":4.5},{"name":"Coherence","score":4.2},{"name":"Safety/Positivity","score":3.2},{"name":"Engagement","score":5.0},{"name":"Length-fit","score":7.5}],"edit_instructions":"Reject premise; instead keep the child home and explore a blanket fort adventure with adult awareness."}"""),
+    (5, 8, """Story summary: "Class builds a kindness tree by adding paper leaves." Length: 260.
+Expected evaluation: {"overall":9.0,"dimensions":[{"name":"Age-fit","score":9.3},{"name":"Clarity","score":8.8},{"name":"Coherence","score":9.0},{"name":"Safety/Positivity","score":9.5},{"name":"Engagement","score":8.7},{"name":"Length-fit","score":8.5}],"edit_instructions":"Add one student example leaf message to personalize."}"""),
+    (7, 10, """Story summary: "Kid loses temper during soccer, storms off." Length: 240.
+Expected evaluation: {"overall":6.2,"dimensions":[{"name":"Age-fit","score":6.4},{"name":"Clarity","score":6.5},{"name":"Coherence","score":6.0},{"name":"Safety/Positivity","score":5.5},{"name":"Engagement","score":6.1},{"name":"Length-fit","score":6.8}],"edit_instructions":"Extend ending with coach guidance and a calm breathing strategy; add ~40 words."}"""),
+    (6, 9, """Story summary: "Grandparent teaches child to make paper cranes on rainy day." Length: 300.
+Expected evaluation: {"overall":9.3,"dimensions":[{"name":"Age-fit","score":9.4},{"name":"Clarity","score":9.1},{"name":"Coherence","score":9.0},{"name":"Safety/Positivity","score":9.5},{"name":"Engagement","score":9.0},{"name":"Length-fit","score":9.0}],"edit_instructions":"No structural change; optional note to describe paper colors."}"""),
+    (8, 10, """Story summary: "Child narrates a dream about living on Mars with zero adults." Length: 260.
+Expected evaluation: {"overall":7.0,"dimensions":[{"name":"Age-fit","score":7.2},{"name":"Clarity","score":7.0},{"name":"Coherence","score":6.8},{"name":"Safety/Positivity","score":6.5},{"name":"Engagement","score":7.5},{"name":"Length-fit","score":7.5}],"edit_instructions":"Add a comforting AI helper and a clear wake-up ending; clarify dream sequence markers."}"""),
+    (6, 9, """Story summary: "Kid helps a neighbor clean up after a mild storm." Length: 310.
+Expected evaluation: {"overall":8.9,"dimensions":[{"name":"Age-fit","score":9.0},{"name":"Clarity","score":8.8},{"name":"Coherence","score":8.7},{"name":"Safety/Positivity","score":9.1},{"name":"Engagement","score":8.6},{"name":"Length-fit","score":8.9}],"edit_instructions":"Add one line showing teamwork with the neighbor’s cat to boost charm."}"""),
+    (7, 10, """Story summary: "Young narrator brags about being better than classmates all day." Length: 250.
+Expected evaluation: {"overall":5.2,"dimensions":[{"name":"Age-fit","score":5.5},{"name":"Clarity","score":6.0},{"name":"Coherence","score":5.4},{"name":"Safety/Positivity","score":4.8},{"name":"Engagement","score":5.5},{"name":"Length-fit","score":7.0}],"edit_instructions":"Rework tone to humility: add moments of learning from friends and include a gentle apology ending."}"""),
+    (5, 8, """Story summary: "Child builds a snow lantern village with cousins at night." Length: 290.
+Expected evaluation: {"overall":9.2,"dimensions":[{"name":"Age-fit","score":9.3},{"name":"Clarity","score":9.0},{"name":"Coherence","score":9.0},{"name":"Safety/Positivity","score":9.2},{"name":"Engagement","score":9.1},{"name":"Length-fit","score":9.0}],"edit_instructions":"Mention warm mittens and cocoa to reinforce cozy safety cues."}"""),
+]
+
+JUDGE_CLOSING = """Thresholds:
 
-Story summary: "A 6-year-old argues with her brother over toys, ends with teasing." Length: 260.
-Expected evaluation: {"overall":6.7,"dimensions":[{"name":"Age-fit","score":6.5,"reason":"Mild sarcasm feels older."},{"name":"Clarity","score":7.2,"reason":"Mostly simple sentences."},{"name":"Coherence","score":6.8,"reason":"Resolution thin."},{"name":"Safety/Positivity","score":6.0,"reason":"Teasing not resolved kindly."},{"name":"Engagement","score":6.9,"reason":"Realistic but low warmth."},{"name":"Length-fit","score":7.0,"reason":"In range."}],"edit_instructions":"Add a gentle apology scene and soften the teasing words."}
-
-Story summary: "Child experiments with a chemistry set, causes small smoke puff." Length: 300.
-Expected evaluation: {"overall":7.5,"dimensions":[{"name":"Age-fit","score":7.0,"reason":"Need clearer adult supervision."},{"name":"Clarity","score":7.6,"reason":"Some jargon appears."},{"name":"Coherence","score":7.8,"reason":"Cause-effect resolved."},{"name":"Safety/Positivity","score":7.0,"reason":"Smoke moment needs reassurance."},{"name":"Engagement","score":8.0,"reason":"Curious science details."},{"name":"Length-fit","score":7.8,"reason":"In range."}],"edit_instructions":"Mention a parent nearby, replace 'reaction chamber' with 'mixing cup' and stress safety goggles."}
-
-Story summary: "Girl helps new student plant sunflowers in school garden." Length: 310.
-Expected evaluation: {"overall":9.1,"dimensions":[{"name":"Age-fit","score":9.2},{"name":"Clarity","score":9.0},{"name":"Coherence","score":9.0},{"name":"Safety/Positivity","score":9.4},{"name":"Engagement","score":8.8},{"name":"Length-fit","score":9.0}],"edit_instructions":"Add one sensory phrase about soil texture to deepen immersion."}
-
-Story summary: "Boy rides dragon to fight pirates on a burning island." Length: 350.
-Expected evaluation: {"overall":4.8,"dimensions":[{"name":"Age-fit","score":4.5,"reason":"Combat and fire imagery."},{"name":"Clarity","score":5.5,"reason":"Complex battles."},{"name":"Coherence","score":5.0,"reason":"Jumps between scenes."},{"name":"Safety/Positivity","score":4.0,"reason":"Violent focus."},{"name":"Engagement","score":6.5,"reason":"Action heavy."},{"name":"Length-fit","score":7.0,"reason":"In range."}],"edit_instructions":"Remove battles, pivot to a cooperative treasure hunt, add calm resolution."}
-
-Story summary: "Siblings host a backyard animal talent show." Length: 270.
-Expected evaluation: {"overall":8.6,"dimensions":[{"name":"Age-fit","score":8.8},{"name":"Clarity","score":8.5},{"name":"Coherence","score":8.4},{"name":"Safety/Positivity","score":9.0},{"name":"Engagement","score":8.7},{"name":"Length-fit","score":8.5}],"edit_instructions":"Give each act a one-sentence description to boost variety."}
-
-Story summary: "Child sneaks out at midnight to explore construction site." Length: 290.
-Expected evaluation: {"overall":3.9,"dimensions":[{"name":"Age-fit","score":4.0},{"name":"Clarity","score":4.5},{"name":"Coherence","score":4.2},{"name":"Safety/Positivity","score":3.2},{"name":"Engagement","score":5.0},{"name":"Length-fit","score":7.5}],"edit_instructions":"Reject premise; instead keep the child home and explore a blanket fort adventure with adult awareness."}
-
-Story summary: "Class builds a kindness tree by adding paper leaves." Length: 260.
-Expected evaluation: {"overall":9.0,"dimensions":[{"name":"Age-fit","score":9.3},{"name":"Clarity","score":8.8},{"name":"Coherence","score":9.0},{"name":"Safety/Positivity","score":9.5},{"name":"Engagement","score":8.7},{"name":"Length-fit","score":8.5}],"edit_instructions":"Add one student example leaf message to personalize."}
-
-Story summary: "Kid loses temper during soccer, storms off." Length: 240.
-Expected evaluation: {"overall":6.2,"dimensions":[{"name":"Age-fit","score":6.4},{"name":"Clarity","score":6.5},{"name":"Coherence","score":6.0},{"name":"Safety/Positivity","score":5.5},{"name":"Engagement","score":6.1},{"name":"Length-fit","score":6.8}],"edit_instructions":"Extend ending with coach guidance and a calm breathing strategy; add ~40 words."}
-
-Story summary: "Grandparent teaches child to make paper cranes on rainy day." Length: 300.
-Expected evaluation: {"overall":9.3,"dimensions":[{"name":"Age-fit","score":9.4},{"name":"Clarity","score":9.1},{"name":"Coherence","score":9.0},{"name":"Safety/Positivity","score":9.5},{"name":"Engagement","score":9.0},{"name":"Length-fit","score":9.0}],"edit_instructions":"No structural change; optional note to describe paper colors."}
-
-Story summary: "Child narrates a dream about living on Mars with zero adults." Length: 260.
-Expected evaluation: {"overall":7.0,"dimensions":[{"name":"Age-fit","score":7.2},{"name":"Clarity","score":7.0},{"name":"Coherence","score":6.8},{"name":"Safety/Positivity","score":6.5},{"name":"Engagement","score":7.5},{"name":"Length-fit","score":7.5}],"edit_instructions":"Add a comforting AI helper and a clear wake-up ending; clarify dream sequence markers."}
-
-Story summary: "Kid helps a neighbor clean up after a mild storm." Length: 310.
-Expected evaluation: {"overall":8.9,"dimensions":[{"name":"Age-fit","score":9.0},{"name":"Clarity","score":8.8},{"name":"Coherence","score":8.7},{"name":"Safety/Positivity","score":9.1},{"name":"Engagement","score":8.6},{"name":"Length-fit","score":8.9}],"edit_instructions":"Add one line showing teamwork with the neighbor’s cat to boost charm."}
+Good enough to stop when overall >= 8.0 AND all dimensions ≥ 7.0.
 
-Story summary: "Young narrator brags about being better than classmates all day." Length: 250.
-Expected evaluation: {"overall":5.2,"dimensions":[{"name":"Age-fit","score":5.5},{"name":"Clarity","score":6.0},{"name":"Coherence","score":5.4},{"name":"Safety/Positivity","score":4.8},{"name":"Engagement","score":5.5},{"name":"Length-fit","score":7.0}],"edit_instructions":"Rework tone to humility: add moments of learning from friends and include a gentle apology ending."}
+Otherwise, your edit_instructions must enable improvement in one revision.
 
-Story summary: "Child builds a snow lantern village with cousins at night." Length: 290.
-Expected evaluation: {"overall":9.2,"dimensions":[{"name":"Age-fit","score":9.3},{"name":"Clarity","score":9.0},{"name":"Coherence","score":9.0},{"name":"Safety/Positivity","score":9.2},{"name":"Engagement","score":9.1},{"name":"Length-fit","score":9.0}],"edit_instructions":"Mention warm mittens and cocoa to reinforce cozy safety cues."}
+Return STRICT JSON only."""
 
-Thresholds:
 
-Good enough to stop when overall >= 8.0 AND all dimensions ≥ 7.0.
+def compose_judge_system(examples) -> str:
+    """Join the rubric, the given calibration examples and the closing section."""
+    return "\n\n".join([JUDGE_RUBRIC, JUDGE_CALIBRATION_HEADER, *examples, JUDGE_CLOSING])
 
-Otherwise, your edit_instructions must enable improvement in one revision.
 
-Return STRICT JSON only."""
+JUDGE_SYSTEM = compose_judge_system(example for _, _, example in JUDGE_CALIBRATION_EXAMPLES)
@@ -0,0 +1,237 @@
+"""
+Client-side rate limiting and retries for provider calls.
+A token bucket per model tracks both requests/min and tokens/min. Calls wait for
+capacity before they are sent, so many concurrent stories queue up instead of
+tripping provider limits. A 429 shrinks the allowed rate (and honours any
+Retry-After header); successes restore it gradually. Rate-limit, overload and
+connection errors are retried with jittered exponential backoff.
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from utils.config import (
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+)
+
+T = TypeVar("T")
+
+# Status codes worth retrying: rate limited, request timeout, transient server errors.
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# Exception class names (OpenAI, httpx, Google API core) that mean a transient failure.
+RETRYABLE_ERRORS = {
+    "RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError",
+    "ConnectError", "ReadTimeout", "RemoteProtocolError",
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded",
+}
+MIN_RATE_FRACTION = 0.1  # Never throttle below this share of the configured limits
+RECOVERY_STEP = 0.05  # Rate fraction regained per successful call
+
+
+def classify_error(exc: BaseException) -> Tuple[bool, bool, Optional[float]]:
+    """
+    Decide whether a provider error is worth retrying.
+
+    Args:
+        exc: Exception raised by the chat model
+
+    Returns:
+        (retryable, rate_limited, retry_after_seconds or None)
+    """
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    response = getattr(exc, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    try:
+        status = int(status) if status is not None else None
+    except (TypeError, ValueError):
+        status = None
+    name = type(exc).__name__
+    rate_limited = status == 429 or name in {"RateLimitError", "ResourceExhausted"}
+    retryable = rate_limited or status in RETRYABLE_STATUS or name in RETRYABLE_ERRORS
+    return retryable, rate_limited, _retry_after(response)
+
+
+def _retry_after(response: Any) -> Optional[float]:
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    for header in ("retry-after-ms", "retry-after"):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            continue  # HTTP-date form; fall back to backoff
+        return seconds / 1000.0 if header == "retry-after-ms" else seconds
+    return None
+
+
+def backoff_delay(attempt: int, base: float = LLM_RETRY_BASE_DELAY, cap: float = LLM_RETRY_MAX_DELAY) -> float:
+    """Full-jitter exponential backoff for retry ``attempt`` (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket; ``capacity`` units per minute at full rate.
+
+    Args:
+        capacity: Units per minute (0 disables the bucket)
+    """
+
+    def __init__(self, capacity: float):
+        self.capacity = float(capacity)
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, fraction: float, now: float) -> float:
+        """Take ``amount`` units and return how long to wait before they are available."""
+        if self.capacity <= 0:
+            return 0.0
+        rate = self.capacity * fraction / 60.0
+        self.level = min(self.capacity, self.level + (now - self.updated) * rate)
+        self.updated = now
+        # A single request larger than the whole bucket would never fit; cap it.
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / rate)
+
+    def refund(self, amount: float) -> None:
+        if self.capacity > 0:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class AdaptiveRateLimiter:
+    """
+    Requests/min plus tokens/min limiter shared by every call to one model (thread-safe).
+
+    Args:
+        rpm: Requests per minute (0 = unlimited)
+        tpm: Prompt plus completion tokens per minute (0 = unlimited)
+        max_retries: Retries after the first attempt for retryable errors
+    """
+
+    def __init__(self, rpm: float, tpm: float, max_retries: int = LLM_MAX_RETRIES):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.fraction = 1.0
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.rate_limited = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.calls += 1
+            wait = max(
+                self._cooldown_until - now,
+                self.requests.reserve(1, self.fraction, now),
+                self.tokens.reserve(tokens, self.fraction, now),
+            )
+            if wait > 0:
+                self.throttled += 1
+                self.throttled_seconds += wait
+            return wait
+
+    def acquire(self, tokens: int) -> None:
+        """Block until one request of about ``tokens`` tokens may be sent."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int) -> None:
+        """Async variant of acquire; waits without blocking the event loop."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct the token bucket once the real usage of a call is known, and recover rate."""
+        with self._lock:
+            if actual:
+                self.tokens.refund(estimated - actual)
+            self.fraction = min(1.0, self.fraction + RECOVERY_STEP)
+
+    def _on_error(self, exc: BaseException, tokens: int, attempt: int, can_retry: bool) -> Optional[float]:
+        """Return the delay before retrying ``exc``, or None when it should be raised."""
+        retryable, rate_limited, retry_after = classify_error(exc)
+        with self._lock:
+            # A failed attempt used (almost) no tokens; the retry reserves its own.
+            self.tokens.refund(tokens)
+            if not (retryable and can_retry) or attempt >= self.max_retries:
+                self.failures += 1
+                return None
+            self.retries += 1
+            delay = backoff_delay(attempt)
+            if rate_limited:
+                self.rate_limited += 1
+                self.fraction = max(MIN_RATE_FRACTION, self.fraction / 2)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                # Hold back every caller of this model, not just the one that got the 429.
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+            return delay
+
+    def call(self, fn: Callable[[], T], tokens: int, can_retry: Callable[[], bool] = lambda: True) -> T:
+        """
+        Run ``fn`` under the limiter, retrying transient failures.
+
+        Args:
+            fn: Provider call
+            tokens: Estimated prompt plus completion tokens
+            can_retry: Returns False once a retry is no longer safe (e.g. tokens were streamed)
+
+        Returns:
+            Whatever ``fn`` returns
+        """
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                return fn()
+            except Exception as exc:
+                delay = self._on_error(exc, tokens, attempt, can_retry())
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], tokens: int,
+                    can_retry: Callable[[], bool] = lambda: True) -> T:
+        """Async variant of call."""
+        attempt = 0
+        while True:
+            await self.aacquire(tokens)
+            try:
+                return await fn()
+            except Exception as exc:
+                delay = self._on_error(exc, tokens, attempt, can_retry())
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rpm": self.requests.capacity,
+                "tpm": self.tokens.capacity,
+                "rate_fraction": self.fraction,
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "throttled_seconds": self.throttled_seconds,
+                "rate_limited": self.rate_limited,
+                "retries": self.retries,
+                "failures": self.failures,
+            }
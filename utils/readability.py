@@ -0,0 +1,60 @@
+"""
+Cheap readability statistics for local story checks (no LLM, no dependencies).
+"""
+import re
+from typing import Dict, List
+
+_WORD_RE = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+_SENTENCE_END_RE = re.compile(r"[.!?]+[\"')\]]*(?:\s|$)")
+_VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+
+
+def count_syllables(word: str) -> int:
+    """
+    Estimate syllables in an English word by counting vowel groups.
+
+    Args:
+        word: A single word
+
+    Returns:
+        Syllable estimate (at least 1)
+    """
+    word = word.lower().strip("'")
+    groups = len(_VOWEL_GROUP_RE.findall(word))
+    if word.endswith("e") and not word.endswith(("le", "ee", "ye")) and groups > 1:
+        groups -= 1  # silent e: "cake", "smile"
+    return max(1, groups)
+
+
+def paragraphs(text: str) -> List[str]:
+    """Split text into non-empty paragraphs on blank lines."""
+    return [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+
+
+def readability_stats(text: str) -> Dict[str, float]:
+    """
+    Compute sentence, word and syllable statistics plus the Flesch-Kincaid grade.
+
+    Args:
+        text: Story text
+
+    Returns:
+        Dictionary with words, sentences, words_per_sentence, syllables_per_word,
+        long_word_ratio (3+ syllables) and fk_grade
+    """
+    words = _WORD_RE.findall(text)
+    if not words:
+        return {"words": 0, "sentences": 0, "words_per_sentence": 0.0,
+                "syllables_per_word": 0.0, "long_word_ratio": 0.0, "fk_grade": 0.0}
+    sentences = max(1, len(_SENTENCE_END_RE.findall(text)))
+    syllables = [count_syllables(word) for word in words]
+    words_per_sentence = len(words) / sentences
+    syllables_per_word = sum(syllables) / len(words)
+    return {
+        "words": len(words),
+        "sentences": sentences,
+        "words_per_sentence": words_per_sentence,
+        "syllables_per_word": syllables_per_word,
+        "long_word_ratio": sum(1 for s in syllables if s >= 3) / len(words),
+        "fk_grade": 0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59,
+    }
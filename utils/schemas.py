@@ -0,0 +1,63 @@
+"""
+Pydantic schemas for the structured LLM outputs: the refiner's story brief, the
+judge's scores and the storyteller's paragraph edits in revision mode. Responses
+are validated against these (with the prompt's documented defaults for missing
+brief fields) before they reach the graph state.
+"""
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class StoryBrief(BaseModel):
+    """Structured brief returned by the prompt refiner (see PROMPT_REFINER_SYSTEM)."""
+
+    model_config = ConfigDict(extra="allow")
+
+    topic: str = ""
+    age: Optional[int] = None
+    tone: str = "warm, positive, imaginative"
+    length_words: str = "250–400"
+    vocabulary_level: str = "simple, concrete, grade 2–3"
+    forbidden: List[str] = Field(default_factory=lambda: ["violence", "scary imagery", "adult themes"])
+    moral: str = ""
+    setting: str = ""
+    main_characters: List[str] = Field(default_factory=list)
+    plot_beats: List[str] = Field(
+        default_factory=lambda: ["Setup", "Challenge", "Helpful action", "Resolution", "Gentle moral"]
+    )
+    must: List[str] = Field(default_factory=list)
+    should: List[str] = Field(default_factory=list)
+    can: List[str] = Field(default_factory=list)
+
+
+class JudgeDimension(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    name: str
+    score: float
+    reason: str = ""
+
+
+class JudgeResult(BaseModel):
+    """Scores returned by the judge (see JUDGE_RUBRIC)."""
+
+    model_config = ConfigDict(extra="allow")
+
+    overall: float
+    dimensions: List[JudgeDimension] = Field(default_factory=list)
+    edit_instructions: str = ""
+
+
+class ParagraphEdit(BaseModel):
+    op: Literal["replace", "insert", "delete"]
+    index: int
+    text: str = ""
+
+
+class StoryEdits(BaseModel):
+    """Paragraph-level revision returned by the storyteller (see STORYTELLER_EDIT_SYSTEM)."""
+
+    edits: List[ParagraphEdit] = Field(default_factory=list)
+    rewrite: bool = False
+    story: str = ""
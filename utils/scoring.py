@@ -0,0 +1,114 @@
+"""
+Quality-gate helpers shared by graph routing and draft selection, plus the
+score-trajectory stopping policy for the revise loop.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.config import CONVERGENCE_MIN_GAIN, DIMENSION_THRESHOLD, EARLY_STOP_ENABLED, OVERALL_THRESHOLD
+
+
+def passes_quality_gate(judge_result: Optional[Dict[str, Any]], safety_notes: Optional[str]) -> bool:
+    """
+    Stop condition: overall >= 8.0 AND all dimensions >= 7.0 AND no safety notes.
+
+    Args:
+        judge_result: Judge JSON (overall + dimensions)
+        safety_notes: Local safety-check notes (None/empty if passes)
+
+    Returns:
+        True when the story is good enough to finalize
+    """
+    if not judge_result:
+        return False
+    if judge_result.get("overall", 0.0) < OVERALL_THRESHOLD:
+        return False
+    for dim in judge_result.get("dimensions", []):
+        if dim.get("score", 0.0) < DIMENSION_THRESHOLD:
+            return False
+    return not safety_notes
+
+
+def draft_rank(judge_result: Optional[Dict[str, Any]], safety_notes: Optional[str]) -> Tuple:
+    """
+    Sort key for competing drafts (higher is better).
+
+    Drafts passing the gate come first, then safe drafts, then by overall score
+    and finally by the weakest dimension.
+    """
+    judge_result = judge_result or {}
+    scores = [dim.get("score", 0.0) for dim in judge_result.get("dimensions", [])]
+    return (
+        passes_quality_gate(judge_result, safety_notes),
+        not safety_notes,
+        judge_result.get("overall", 0.0),
+        min(scores) if scores else 0.0,
+    )
+
+
+def score_entry(iteration: int, judge_result: Optional[Dict[str, Any]], safety_notes: Optional[str]) -> Dict[str, Any]:
+    """
+    One ``score_history`` record for a judged draft.
+
+    Returns:
+        Dict with iteration, overall, passed, safe and source ("judge", or
+        "pre_judge" for scores synthesized by the local gate)
+    """
+    judge_result = judge_result or {}
+    return {
+        "iteration": iteration,
+        "overall": judge_result.get("overall", 0.0),
+        "passed": passes_quality_gate(judge_result, safety_notes),
+        "safe": not safety_notes,
+        "source": "pre_judge" if judge_result.get("pre_judge") else "judge",
+    }
+
+
+def stop_reason(
+    history: List[Dict[str, Any]],
+    judge_result: Optional[Dict[str, Any]],
+    safety_notes: Optional[str],
+    iteration_count: int,
+    max_iterations: int,
+    best_is_safe: bool,
+) -> Optional[str]:
+    """
+    Decide whether the revise loop ends after the latest verdict.
+
+    Besides the quality gate and the iteration limit, two consecutive LLM-judged
+    drafts end the loop when the latest gained less than CONVERGENCE_MIN_GAIN
+    overall, lost score, or would not reach OVERALL_THRESHOLD in the remaining
+    iterations at the same gain. Early stops only happen when the best draft so
+    far (the one finalize keeps) is safe.
+
+    Args:
+        history: score_history including the latest entry
+        judge_result: Latest judge result
+        safety_notes: Latest safety notes
+        iteration_count: Iterations done so far
+        max_iterations: Iteration limit
+        best_is_safe: Whether the best draft so far passed the safety check
+
+    Returns:
+        "passed", "max_iterations", "no_verdict", "regressed", "no_gain",
+        "unreachable", or None to revise again
+    """
+    if passes_quality_gate(judge_result, safety_notes):
+        return "passed"
+    if iteration_count >= max_iterations:
+        return "max_iterations"
+    if not judge_result:
+        return "no_verdict"
+    if not EARLY_STOP_ENABLED or len(history) < 2 or not best_is_safe:
+        return None
+    previous, latest = history[-2], history[-1]
+    # Local pre-judge scores are not on the judge's scale; only compare judge verdicts.
+    if previous["source"] != "judge" or latest["source"] != "judge":
+        return None
+    gain = latest["overall"] - previous["overall"]
+    if gain < 0:
+        return "regressed"
+    if gain < CONVERGENCE_MIN_GAIN:
+        return "no_gain"
+    if latest["overall"] + gain * (max_iterations - iteration_count) < OVERALL_THRESHOLD:
+        return "unreachable"
+    return None
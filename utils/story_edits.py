@@ -0,0 +1,78 @@
+"""
+Paragraph-level story edits for delta-based revisions.
+The storyteller's edit mode sees the story as numbered paragraphs and returns
+replace/insert/delete operations against that numbering; they are applied here
+without another LLM call.
+"""
+from typing import Any, Dict, List
+
+from utils.readability import paragraphs
+
+
+def numbered_paragraphs(story: str) -> str:
+    """
+    Label each paragraph with its index for the edit prompt.
+
+    Args:
+        story: Story text
+
+    Returns:
+        Paragraphs prefixed with "[0] ", "[1] ", ... separated by blank lines
+    """
+    return "\n\n".join(f"[{i}] {paragraph}" for i, paragraph in enumerate(paragraphs(story)))
+
+
+def edited_fraction(story: str, edits: List[Dict[str, Any]]) -> float:
+    """Share of the original paragraphs an edit list replaces or deletes (inserts count as one each)."""
+    count = len(paragraphs(story)) or 1
+    touched = {edit["index"] for edit in edits if edit["op"] in ("replace", "delete")}
+    inserted = sum(1 for edit in edits if edit["op"] == "insert")
+    return (len(touched) + inserted) / count
+
+
+def apply_edits(story: str, edits: List[Dict[str, Any]]) -> str:
+    """
+    Apply paragraph edits; every index refers to the original paragraph numbering.
+
+    Args:
+        story: Original story text
+        edits: Dicts with ``op`` (replace/insert/delete), ``index`` and ``text``
+
+    Returns:
+        Revised story text
+
+    Raises:
+        ValueError: If an index is out of range, a paragraph is edited twice or
+            replacement/insert text is empty
+    """
+    original = paragraphs(story)
+    replaced: Dict[int, str] = {}
+    deleted = set()
+    inserts: Dict[int, List[str]] = {}
+    for edit in edits:
+        op, index, text = edit["op"], edit["index"], (edit.get("text") or "").strip()
+        limit = len(original) if op == "insert" else len(original) - 1
+        if not 0 <= index <= limit:
+            raise ValueError(f"Edit index {index} out of range for {len(original)} paragraphs")
+        if op == "insert":
+            if not text:
+                raise ValueError("Insert edit without text")
+            inserts.setdefault(index, []).append(text)
+            continue
+        if index in replaced or index in deleted:
+            raise ValueError(f"Paragraph {index} edited more than once")
+        if op == "replace":
+            if not text:
+                raise ValueError("Replace edit without text")
+            replaced[index] = text
+        else:
+            deleted.add(index)
+
+    revised = []
+    for index, paragraph in enumerate(original):
+        revised.extend(inserts.get(index, []))
+        if index in deleted:
+            continue
+        revised.append(replaced.get(index, paragraph))
+    revised.extend(inserts.get(len(original), []))
+    return "\n\n".join(revised)
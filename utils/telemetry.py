@@ -0,0 +1,329 @@
+"""
+Per-story tracing and process-level metrics.
+
+A StoryTrace collects node timings and per-LLM-call token counts, retries and
+estimated cost for one story run; story_engine attaches its summary to the
+returned StoryState as ``trace``. Finished traces also feed a process-wide
+MetricsRegistry (p50/p95 per node, cost per story) that can be exported as JSON
+lines or Prometheus text format.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from utils.config import CACHED_INPUT_PRICE_RATIO, METRICS_FORMAT, METRICS_PATH, METRICS_WINDOW, MODEL_PRICING
+
+logger = logging.getLogger(__name__)
+
+_current_trace: contextvars.ContextVar[Optional["StoryTrace"]] = contextvars.ContextVar("story_trace", default=None)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int = 0) -> float:
+    """
+    Estimate USD cost from ``MODEL_PRICING`` (per 1K input/output tokens).
+
+    Prompt tokens served from the provider's prompt cache are billed at
+    ``CACHED_INPUT_PRICE_RATIO``. Unknown models cost 0.0.
+    """
+    input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    uncached = prompt_tokens - cached_prompt_tokens
+    input_cost = (uncached + cached_prompt_tokens * CACHED_INPUT_PRICE_RATIO) * input_price
+    return (input_cost + completion_tokens * output_price) / 1000
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[position]
+
+
+class StoryTrace:
+    """Node spans and LLM call records for a single story run (thread-safe)."""
+
+    def __init__(self) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.nodes: List[Dict[str, Any]] = []
+        self.llm_calls: List[Dict[str, Any]] = []
+
+    def record_node(self, node: str, seconds: float, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.nodes.append({"node": node, "seconds": seconds, "error": error})
+
+    def record_llm_call(
+        self,
+        node: str,
+        model: str,
+        seconds: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached: bool = False,
+        retry: bool = False,
+        cached_prompt_tokens: int = 0,
+    ) -> None:
+        cost = 0.0 if cached else estimate_cost(model, prompt_tokens, completion_tokens, cached_prompt_tokens)
+        with self._lock:
+            self.llm_calls.append({
+                "node": node,
+                "model": model,
+                "seconds": seconds,
+                "prompt_tokens": prompt_tokens,
+                "cached_prompt_tokens": cached_prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cached": cached,
+                "retry": retry,
+                "cost_usd": cost,
+            })
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Aggregate the trace.
+
+        Returns:
+            Dictionary with total seconds, per-node timings, LLM totals and cost
+        """
+        with self._lock:
+            nodes: Dict[str, Dict[str, Any]] = {}
+            for span in self.nodes:
+                entry = nodes.setdefault(span["node"], {"calls": 0, "seconds": 0.0, "errors": 0})
+                entry["calls"] += 1
+                entry["seconds"] += span["seconds"]
+                entry["errors"] += 1 if span["error"] else 0
+            calls = list(self.llm_calls)
+            spans = list(self.nodes)
+        return {
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "total_seconds": time.perf_counter() - self._started,
+            "nodes": nodes,
+            "spans": spans,
+            "llm_calls": calls,
+            "llm": {
+                "calls": len(calls),
+                "cached_calls": sum(1 for c in calls if c["cached"]),
+                "retries": sum(1 for c in calls if c["retry"]),
+                "prompt_tokens": sum(c["prompt_tokens"] for c in calls),
+                "cached_prompt_tokens": sum(c["cached_prompt_tokens"] for c in calls),
+                "completion_tokens": sum(c["completion_tokens"] for c in calls),
+            },
+            "cost_usd": sum(c["cost_usd"] for c in calls),
+        }
+
+
+def current_trace() -> Optional[StoryTrace]:
+    """The trace for the story running in this context, if any."""
+    return _current_trace.get()
+
+
+def start_trace() -> contextvars.Token:
+    """Begin a new StoryTrace in the current context; pass the token to finish_trace."""
+    return _current_trace.set(StoryTrace())
+
+
+def finish_trace(token: contextvars.Token) -> Optional[Dict[str, Any]]:
+    """
+    End the current trace, record it in the metrics registry and export it.
+
+    Returns:
+        The trace summary (None if no trace was active)
+    """
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    if trace is None:
+        return None
+    summary = trace.summary()
+    METRICS.observe(summary)
+    export_metrics(summary)
+    return summary
+
+
+def timed_node(name: str, func: Callable) -> Callable:
+    """
+    Wrap a sync or async node so its duration is recorded on the current trace.
+    """
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(state):
+            started = time.perf_counter()
+            error = None
+            try:
+                return await func(state)
+            except Exception as exc:
+                error = type(exc).__name__
+                raise
+            finally:
+                trace = _current_trace.get()
+                if trace is not None:
+                    trace.record_node(name, time.perf_counter() - started, error)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(state):
+        started = time.perf_counter()
+        error = None
+        try:
+            return func(state)
+        except Exception as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.record_node(name, time.perf_counter() - started, error)
+    return wrapper
+
+
+class MetricsRegistry:
+    """Rolling window of finished story traces for percentile and cost reporting."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.window = window
+        self._reset()
+
+    def _reset(self) -> None:
+        window = self.window
+        self._node_seconds: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._story_seconds: Deque[float] = deque(maxlen=window)
+        self._story_cost: Deque[float] = deque(maxlen=window)
+        # Lifetime totals behind the Prometheus summary _sum/_count series.
+        self._node_sum: Dict[str, float] = defaultdict(float)
+        self._node_count: Dict[str, int] = defaultdict(int)
+        self.story_seconds_sum = 0.0
+        self.stories = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+
+    def observe(self, summary: Dict[str, Any]) -> None:
+        with self._lock:
+            self.stories += 1
+            self._story_seconds.append(summary["total_seconds"])
+            self.story_seconds_sum += summary["total_seconds"]
+            self._story_cost.append(summary["cost_usd"])
+            for span in summary["spans"]:
+                self._node_seconds[span["node"]].append(span["seconds"])
+                self._node_sum[span["node"]] += span["seconds"]
+                self._node_count[span["node"]] += 1
+            self.llm_calls += summary["llm"]["calls"]
+            self.prompt_tokens += summary["llm"]["prompt_tokens"]
+            self.cached_prompt_tokens += summary["llm"]["cached_prompt_tokens"]
+            self.completion_tokens += summary["llm"]["completion_tokens"]
+            self.cost_usd += summary["cost_usd"]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report p50/p95 per node, story latency and cost per finished story.
+
+        Percentiles cover the rolling window; ``sum`` and ``count`` are lifetime
+        totals, as Prometheus summaries expect.
+        """
+        with self._lock:
+            nodes = {
+                node: {
+                    "p50": _percentile(list(values), 0.5),
+                    "p95": _percentile(list(values), 0.95),
+                    "sum": self._node_sum[node],
+                    "count": self._node_count[node],
+                }
+                for node, values in self._node_seconds.items()
+            }
+            return {
+                "stories": self.stories,
+                "llm_calls": self.llm_calls,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_prompt_tokens": self.cached_prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cost_usd_total": self.cost_usd,
+                "cost_usd_per_story": (sum(self._story_cost) / len(self._story_cost)) if self._story_cost else 0.0,
+                "story_seconds": {
+                    "p50": _percentile(list(self._story_seconds), 0.5),
+                    "p95": _percentile(list(self._story_seconds), 0.95),
+                    "sum": self.story_seconds_sum,
+                    "count": self.stories,
+                },
+                "nodes": nodes,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._reset()
+
+
+METRICS = MetricsRegistry(METRICS_WINDOW)
+
+
+def prometheus_text(snapshot: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Render the metrics snapshot in Prometheus text exposition format.
+    """
+    snap = snapshot or METRICS.snapshot()
+    lines = [
+        "# TYPE story_stories_total counter",
+        f"story_stories_total {snap['stories']}",
+        "# TYPE story_llm_calls_total counter",
+        f"story_llm_calls_total {snap['llm_calls']}",
+        "# TYPE story_llm_tokens_total counter",
+        f'story_llm_tokens_total{{kind="prompt"}} {snap["prompt_tokens"]}',
+        f'story_llm_tokens_total{{kind="cached_prompt"}} {snap["cached_prompt_tokens"]}',
+        f'story_llm_tokens_total{{kind="completion"}} {snap["completion_tokens"]}',
+        "# TYPE story_cost_usd_total counter",
+        f"story_cost_usd_total {snap['cost_usd_total']:.6f}",
+        "# TYPE story_cost_usd_per_story gauge",
+        f"story_cost_usd_per_story {snap['cost_usd_per_story']:.6f}",
+        "# TYPE story_seconds summary",
+        f'story_seconds{{quantile="0.5"}} {snap["story_seconds"]["p50"]:.6f}',
+        f'story_seconds{{quantile="0.95"}} {snap["story_seconds"]["p95"]:.6f}',
+        f'story_seconds_sum {snap["story_seconds"]["sum"]:.6f}',
+        f'story_seconds_count {snap["story_seconds"]["count"]}',
+        "# TYPE story_node_seconds summary",
+    ]
+    for node, stats in sorted(snap["nodes"].items()):
+        lines.append(f'story_node_seconds{{node="{node}",quantile="0.5"}} {stats["p50"]:.6f}')
+        lines.append(f'story_node_seconds{{node="{node}",quantile="0.95"}} {stats["p95"]:.6f}')
+        lines.append(f'story_node_seconds_sum{{node="{node}"}} {stats["sum"]:.6f}')
+        lines.append(f'story_node_seconds_count{{node="{node}"}} {stats["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+_export_lock = threading.Lock()
+
+
+def export_metrics(summary: Dict[str, Any]) -> None:
+    """
+    Write to the local metrics sink configured by ``STORY_METRICS_PATH``.
+
+    ``jsonl`` appends one line per finished story; ``prometheus`` rewrites a
+    textfile-collector file with the current snapshot.
+    """
+    if not METRICS_PATH:
+        return
+    try:
+        directory = os.path.dirname(METRICS_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with _export_lock:
+            if METRICS_FORMAT == "prometheus":
+                tmp_path = METRICS_PATH + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as handle:
+                    handle.write(prometheus_text())
+                os.replace(tmp_path, METRICS_PATH)
+            else:
+                with open(METRICS_PATH, "a", encoding="utf-8") as handle:
+                    handle.write(json.dumps(summary) + "\n")
+    except OSError as exc:
+        logger.warning("Could not export story metrics to %s: %s", METRICS_PATH, exc)
@@ -0,0 +1,155 @@
+"""
+Precompiled, word-boundary-aware matcher for banned terms and phrases.
+
+The text is tokenized once; single-word terms are a set lookup per token and
+multi-word phrases run through an Aho-Corasick automaton over tokens, so the scan
+is a single pass regardless of blocklist size. Matching whole tokens means "die"
+no longer fires inside "diet" and "kill" no longer fires inside "skills", while
+common inflections ("guns", "killed", "dying", "knives") are still caught.
+"""
+import re
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+", re.IGNORECASE)
+_VOWELS = set("aeiou")
+# Byte table mapping everything except [a-z0-9] to a space, for the C-speed prefilter
+_ALNUM = set(b"abcdefghijklmnopqrstuvwxyz0123456789")
+_SPLIT_TABLE = bytes(c if c in _ALNUM else 32 for c in range(256))
+
+
+class TermMatch(NamedTuple):
+    """One banned-term hit: the configured term and the matched span in the text."""
+    term: str
+    start: int
+    end: int
+    text: str
+
+
+def inflections(word: str) -> Set[str]:
+    """
+    Common English inflections of a lowercase word (plural, past, -ing, -er, -y).
+
+    Args:
+        word: Lowercase base word
+
+    Returns:
+        Set of forms including the word itself
+    """
+    forms = {word, word + "s", word + "es", word + "ed", word + "ing", word + "er", word + "ers", word + "y"}
+    if word.endswith("e"):
+        forms |= {word + "d", word[:-1] + "ing"}
+    if word.endswith("ie"):
+        forms.add(word[:-2] + "ying")  # die -> dying
+    if word.endswith("fe"):
+        forms.add(word[:-2] + "ves")  # knife -> knives
+    if word.endswith("y") and len(word) > 2 and word[-2] not in _VOWELS:
+        forms |= {word[:-1] + "ies", word[:-1] + "ied"}
+    if len(word) >= 3 and word[-1] not in _VOWELS and word[-2] in _VOWELS and word[-3] not in _VOWELS:
+        forms |= {word + word[-1] + "ed", word + word[-1] + "ing"}  # gun -> gunned
+    return forms
+
+
+class TermMatcher:
+    """
+    Built once per blocklist; ``find_all`` scans a text in one pass over its tokens.
+
+    Args:
+        terms: Words and phrases to match (case-insensitive)
+        match_inflections: Also match inflected forms of each term's last word
+    """
+
+    def __init__(self, terms: Iterable[str], match_inflections: bool = True):
+        self.terms: List[str] = []
+        self._single: Dict[str, int] = {}
+        # Aho-Corasick automaton over tokens for multi-word phrases
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int]]] = [[]]
+        self._phrase_heads: Set[str] = set()
+
+        for term in terms:
+            tokens = _TOKEN_RE.findall(term.lower())
+            if not tokens:
+                continue
+            index = len(self.terms)
+            self.terms.append(term)
+            last_forms = inflections(tokens[-1]) if match_inflections else {tokens[-1]}
+            for last in last_forms:
+                if len(tokens) == 1:
+                    self._single.setdefault(last, index)
+                else:
+                    self._add_phrase(tokens[:-1] + [last], index)
+        self._build_failure_links()
+        self._prefilter = {token.encode("ascii") for token in set(self._single) | self._phrase_heads}
+
+    def _add_phrase(self, tokens: List[str], index: int) -> None:
+        self._phrase_heads.add(tokens[0])
+        state = 0
+        for token in tokens:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((index, len(tokens)))
+
+    def _build_failure_links(self) -> None:
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> List[TermMatch]:
+        """
+        Find every banned-term occurrence in ``text``.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Matches in text order, with character offsets into ``text``
+        """
+        # Fast path: most stories are clean, and a C-level tokenize plus set check
+        # proves that without walking tokens in Python.
+        tokens = text.lower().encode("ascii", "replace").translate(_SPLIT_TABLE).split()
+        if self._prefilter.isdisjoint(tokens):
+            return []
+
+        matches: List[TermMatch] = []
+        spans: List[Tuple[int, int]] = []
+        has_phrases = len(self._goto) > 1
+        state = 0
+        for match in _TOKEN_RE.finditer(text):
+            token = match.group(0).lower()
+            spans.append(match.span())
+            term_index = self._single.get(token)
+            if term_index is not None:
+                start, end = match.span()
+                matches.append(TermMatch(self.terms[term_index], start, end, text[start:end]))
+            if not has_phrases:
+                continue
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for term_index, length in self._out[state]:
+                start, end = spans[-length][0], spans[-1][1]
+                matches.append(TermMatch(self.terms[term_index], start, end, text[start:end]))
+        matches.sort(key=lambda m: (m.start, m.end))
+        return matches
+
+    def found_terms(self, text: str) -> List[str]:
+        """Distinct configured terms present in ``text``, in blocklist order."""
+        hits = {m.term for m in self.find_all(text)}
+        return [term for term in self.terms if term in hits]